@@ -0,0 +1,93 @@
+﻿# app/atomic_file.py
+# -*- coding: utf-8 -*-
+"""
+Crash-safe file replacement.
+
+Data is written to a temporary file in the target directory, flushed and
+fsynced, and only then moved over the target with os.replace. If the write
+fails or the process dies, the previous file is left untouched.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding=None, buffering=-1, backups=0):
+    """
+    Context manager yielding a file object opened on a temp file next to path.
+    On success the temp file replaces path; with backups > 0 the previous
+    versions are kept as path.1.bak ... path.N.bak (newest first).
+    """
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    if "b" in mode:
+        encoding = None
+    try:
+        with os.fdopen(fd, mode, buffering=buffering, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        _copy_mode(path, tmp_path)
+        if backups > 0:
+            rotate_backups(path, backups)
+        os.replace(tmp_path, path)
+        _fsync_dir(directory)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def backup_path(path, index):
+    return f"{path}.{index}.bak"
+
+
+def rotate_backups(path, count):
+    """Shift path.1.bak .. path.N.bak by one and keep the current path as .1.bak."""
+    if not os.path.exists(path):
+        return
+    for i in range(count - 1, 0, -1):
+        older = backup_path(path, i)
+        if os.path.exists(older):
+            os.replace(older, backup_path(path, i + 1))
+    newest = backup_path(path, 1)
+    if os.path.exists(newest):
+        os.unlink(newest)
+    try:
+        # A hard link keeps path in place until os.replace swaps it.
+        os.link(path, newest)
+    except OSError:
+        shutil.copy2(path, newest)
+
+
+def _copy_mode(src, dst):
+    """Keep the permissions of the file being replaced (mkstemp uses 0600)."""
+    try:
+        if os.path.exists(src):
+            shutil.copymode(src, dst)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(dst, 0o666 & ~umask)
+    except OSError:
+        pass
+
+
+def _fsync_dir(directory):
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,72 @@
+﻿# app/channel_store.py
+# -*- coding: utf-8 -*-
+"""
+Compact storage for channel records.
+
+Channels stay plain dicts: plugins, the dialogs and json.dump all rely on
+that. What the store adds is sharing: attribute names come from one interned
+table, values of low-cardinality fields (group-title, tvg-url, ...) are pooled
+so a million channels in the same group hold one string, and empty fields are
+not stored at all (every reader uses .get(field, "")).
+"""
+from sys import intern
+
+# Fields whose values repeat across many channels and are worth pooling.
+POOLED_FIELDS = frozenset({
+    "group-title", "tvg-url", "tvg-shift", "tvg-country", "tvg-language",
+    "radio", "catchup", "catchup-days", "catchup-source",
+    "user-agent", "http-referrer",
+})
+
+# Keys that are always present in a channel record.
+REQUIRED_FIELDS = ("name", "url", "group-title")
+
+
+class ChannelStore:
+    """Interning tables shared by every channel record of a playlist."""
+
+    def __init__(self):
+        self._values = {}
+
+    def intern_value(self, key, value):
+        if key in POOLED_FIELDS:
+            return self._values.setdefault(value, value)
+        return value
+
+    def make_channel(self, fields):
+        """Build a compact channel record from a mapping or (key, value) pairs."""
+        items = fields.items() if isinstance(fields, dict) else fields
+        channel = {"name": "", "url": "", "group-title": ""}
+        for key, value in items:
+            if value or key in REQUIRED_FIELDS:
+                key = intern(key)
+                channel[key] = self.intern_value(key, value) if isinstance(value, str) else value
+        return channel
+
+    def compact_channel(self, channel):
+        """Drop empty fields and pool the values of channel in place."""
+        for key in [k for k, v in channel.items() if not v and k not in REQUIRED_FIELDS]:
+            del channel[key]
+        for key in POOLED_FIELDS.intersection(channel):
+            value = channel[key]
+            if isinstance(value, str):
+                channel[key] = self._values.setdefault(value, value)
+        return channel
+
+    def compact_tree(self, tree):
+        """Compact every channel of a group tree (e.g. one loaded from JSON)."""
+        stack = [tree]
+        while stack:
+            ref = stack.pop()
+            if isinstance(ref, list):
+                channels, groups = ref, ()
+            elif isinstance(ref, dict):
+                channels = ref.get("_channels", ())
+                groups = [v for k, v in ref.items() if k != "_channels"]
+            else:
+                continue
+            for ch in channels:
+                if isinstance(ch, dict):
+                    self.compact_channel(ch)
+            stack.extend(groups)
+        return tree
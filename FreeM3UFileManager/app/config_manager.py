@@ -27,7 +27,15 @@ class ConfigManager:
         else:
             self.config["GENERAL"] = {
                 "last_file": "",
-                "dark_mode": "true"
+                "dark_mode": "true",
+                "parse_workers": "0",  # processes used to parse large M3U files (0 = sequential)
+                "save_backups": "0",   # previous versions kept as <file>.N.bak when saving
+                "undo_levels": "100",  # operations kept in the undo history
+                "undo_max_nodes": "2000000",  # nodes the undo history may keep alive
+                "cache_max_mb": "0",  # parsed playlist cache size (0 = disabled; when on, the first open also writes it)
+                "lazy_load": "false",  # map large M3U files and decode groups when opened
+                "json_indent": "0",  # spaces per level in saved JSON (0 = compact)
+                "search_index_on_load": "true"  # build the search index while loading (else on the first search)
             }
             self.config["PLUGINS"] = {
                 "enabled": ""  # list of plugin names separated by commas
@@ -42,6 +50,12 @@ class ConfigManager:
         val = self.get(key, str(default), section).lower()
         return val in ["1", "true", "yes"]
 
+    def get_int(self, key, default=0, section="GENERAL"):
+        try:
+            return int(self.get(key, str(default), section))
+        except ValueError:
+            return default
+
     def set(self, key, value, section="GENERAL"):
         if section not in self.config:
             self.config[section] = {}
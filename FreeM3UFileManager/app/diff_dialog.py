@@ -1,33 +1,56 @@
 ﻿# app/diff_dialog.py
 from kivy.uix.popup import Popup
 from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.scrollview import ScrollView
 from kivy.uix.treeview import TreeView, TreeViewLabel
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.clock import Clock
-from copy import deepcopy
+
+from app.tree_diff import (
+    diff_trees, summarize, group_changes,
+    ADDED, REMOVED, MODIFIED, MOVED, CHANNEL, GROUP
+)
+
+PAGE_SIZE = 200     # cambios añadidos al árbol cada vez
+
+MARKS = {ADDED: "✅ Nuevo", REMOVED: "❌ Eliminado", MODIFIED: "🟡 Modificado", MOVED: "↪ Movido"}
+
 
 class DiffDialog(Popup):
-    def __init__(self, old_data, new_data, **kwargs):
+    """
+    Muestra las diferencias entre old_data y new_data (ver app.tree_diff).
+    Los datos no se copian y los nodos del árbol se crean al expandir cada
+    grupo, de PAGE_SIZE en PAGE_SIZE cambios.
+    """
+
+    def __init__(self, old_data, new_data, key_field=None, **kwargs):
         super().__init__(**kwargs)
         self.title = "Comparar cambios"
         self.size_hint = (0.95, 0.95)
         self.auto_dismiss = False
         self.result = None  # "accept", "review", "cancel"
 
-        self.old_data = deepcopy(old_data)
-        self.new_data = deepcopy(new_data)
+        self.old_data = old_data
+        self.new_data = new_data
+        self.changes = diff_trees(old_data, new_data, key_field=key_field)
+        self._by_path, self._children = group_changes(self.changes)
 
         layout = BoxLayout(orientation="vertical", spacing=10, padding=10)
 
         title_label = Label(text="Comparación de listas de grupos y canales", size_hint_y=None, height=30)
         layout.add_widget(title_label)
+        summary_label = Label(text=self.summary_text(), size_hint_y=None, height=30)
+        layout.add_widget(summary_label)
 
         # Árbol de diferencias
-        self.tree = TreeView(hide_root=True)
-        layout.add_widget(self.tree)
+        self.tree = TreeView(hide_root=True, size_hint_y=None)
+        self.tree.bind(minimum_height=self.tree.setter("height"))
+        self.tree.bind(on_node_expand=lambda tree, node: self._expand(node))
+        scroll = ScrollView()
+        scroll.add_widget(self.tree)
+        layout.add_widget(scroll)
 
-        self.populate_tree("", self.old_data, self.new_data, parent_node=None)
+        self._fill(None, ())
 
         # Botones
         btn_layout = BoxLayout(size_hint_y=None, height=50, spacing=5)
@@ -51,59 +74,68 @@ class DiffDialog(Popup):
         self.result = action
         self.dismiss()
 
-    def populate_tree(self, path, old, new, parent_node):
-        """Rellena el árbol con grupos y canales"""
-
-        # Si ambos son listas → canales
-        if isinstance(old, list) or isinstance(new, list):
-            old_list = old if isinstance(old, list) else []
-            new_list = new if isinstance(new, list) else []
-            self.populate_channels(parent_node, old_list, new_list)
+    def summary_text(self):
+        counts = summarize(self.changes)
+        parts = []
+        for change_type in (ADDED, REMOVED, MODIFIED, MOVED):
+            channels = counts.get((change_type, CHANNEL), 0)
+            groups = counts.get((change_type, GROUP), 0)
+            if channels or groups:
+                parts.append(f"{MARKS[change_type]}: {channels} canales, {groups} grupos")
+        return " | ".join(parts) or "Sin cambios"
+
+    # -----------------------
+    # Árbol perezoso
+    # -----------------------
+    def _add(self, node, parent):
+        if parent is not None:
+            return self.tree.add_node(node, parent)
+        return self.tree.add_node(node)
+
+    def _fill(self, parent_node, path, start=0):
+        """Añade los subgrupos con cambios de path y una página de sus cambios."""
+        if start == 0:
+            for name in self._children.get(path, ()):
+                node = TreeViewLabel(text=name, is_leaf=False)
+                node.diff_path = path + (name,)
+                node.loaded = False
+                self._add(node, parent_node)
+
+        changes = self._by_path.get(path, ())
+        end = min(start + PAGE_SIZE, len(changes))
+        for change in changes[start:end]:
+            node = TreeViewLabel(text=self.change_text(change))
+            node.change = change
+            self._add(node, parent_node)
+        if end < len(changes):
+            more = TreeViewLabel(text=f"… {len(changes) - end} cambios más", is_leaf=False)
+            more.diff_path = path
+            more.next_start = end
+            more.loaded = False
+            self._add(more, parent_node)
+
+    def _expand(self, node):
+        if getattr(node, "loaded", True):
             return
-
-        # Si ambos son dicts → grupos
-        if isinstance(old, dict) or isinstance(new, dict):
-            old_keys = set(old.keys()) if isinstance(old, dict) else set()
-            new_keys = set(new.keys()) if isinstance(new, dict) else set()
-            all_keys = sorted(old_keys | new_keys)
-
-            for key in all_keys:
-                old_val = old.get(key) if isinstance(old, dict) else None
-                new_val = new.get(key) if isinstance(new, dict) else None
-
-                if key == "_channels":
-                    self.populate_tree(f"{path}/{key}", old_val, new_val, parent_node)
-                else:
-                    node = TreeViewLabel(text=key)
-                    node.old_val = old_val
-                    node.new_val = new_val
-                    if parent_node:
-                        self.tree.add_node(node, parent_node)
-                    else:
-                        self.tree.add_node(node)
-                    self.populate_tree(f"{path}/{key}", old_val, new_val, node)
-
-    def populate_channels(self, parent_node, old_channels, new_channels):
-        old_map = {c.get("name",""): c for c in old_channels if isinstance(c, dict)}
-        new_map = {c.get("name",""): c for c in new_channels if isinstance(c, dict)}
-        all_names = sorted(set(old_map.keys()) | set(new_map.keys()))
-
-        for name in all_names:
-            old_c = old_map.get(name)
-            new_c = new_map.get(name)
-            text = name
-            if old_c and not new_c:
-                text += " ❌ Eliminado"
-            elif new_c and not old_c:
-                text += " ✅ Nuevo"
-            else:
-                diffs = [f"{k}: {old_c.get(k)} → {new_c.get(k)}" for k in new_c.keys() if k != "name" and old_c.get(k)!=new_c.get(k)]
-                if diffs:
-                    text += " 🟡 Modificado"
-            node = TreeViewLabel(text=text)
-            node.channel_data = new_c or old_c
-            if parent_node:
-                self.tree.add_node(node, parent_node)
-            else:
-                self.tree.add_node(node)
-
+        node.loaded = True
+        if hasattr(node, "next_start"):
+            # "… N más": cargar la página siguiente en el mismo nivel
+            parent = node.parent_node if node.parent_node is not self.tree.root else None
+            self.tree.remove_node(node)
+            self._fill(parent, node.diff_path, node.next_start)
+        else:
+            self._fill(node, node.diff_path)
+
+    @staticmethod
+    def change_text(change):
+        if change.kind == GROUP:
+            path = change.new_path if change.new_path is not None else change.old_path
+            return f"[{path[-1]}] {MARKS[change.type]}"
+        channel = change.new if change.new is not None else change.old
+        text = f"{channel.get('name', '')} {MARKS[change.type]}"
+        if change.type == MOVED:
+            text += f" desde {'/'.join(change.old_path) or '/'}"
+        elif change.type == MODIFIED:
+            text += ": " + ", ".join(
+                f"{k}: {change.old.get(k, '')} → {change.new.get(k, '')}" for k in change.fields)
+        return text
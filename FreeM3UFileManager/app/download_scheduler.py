@@ -0,0 +1,151 @@
+﻿# app/download_scheduler.py
+# -*- coding: utf-8 -*-
+"""
+Bounded background downloads (channel logos, EPG icons...).
+
+DownloadScheduler owns a fixed pool of daemon threads fed by one queue and
+one requests.Session whose connection pool is sized to the workers, so a
+batch of thousands of URLs uses `workers` threads and keeps its connections
+alive instead of starting a thread and a connection per URL. The threads
+are daemons (like FileLoaderWorker's): closing the app never waits for the
+queued downloads, which a ThreadPoolExecutor would run at exit.
+
+download() returns a DownloadBatch. Workers only store their result; the
+callbacks run on the Kivy main thread (Clock.schedule_once), in the order
+of the URLs whatever order the downloads finish in:
+    result_callback(index, data)        data is the body, or None on any failure
+    progress_callback(done, total)      downloads finished so far
+    finished_callback()                 after the last result_callback
+Results finished between two frames are delivered by a single scheduled
+call, which stops after FLUSH_BUDGET seconds and goes on next frame so a
+burst of results does not freeze the UI. After DownloadBatch.cancel() the
+queued downloads are dropped and no callback is called.
+"""
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from kivy.clock import Clock
+
+DEFAULT_WORKERS = 8
+DOWNLOAD_TIMEOUT = 5
+FLUSH_BUDGET = 0.02         # seconds of result_callback per frame
+
+
+class DownloadBatch:
+    def __init__(self, total, result_callback=None, progress_callback=None, finished_callback=None):
+        self.total = total
+        self.done = 0
+        self.result_callback = result_callback
+        self.progress_callback = progress_callback
+        self.finished_callback = finished_callback
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._results = {}          # index -> data, finished but not delivered yet
+        self._next = 0              # next index to deliver
+        self._flush_pending = False
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self._next >= self.total
+
+    def cancel(self):
+        """Queued downloads of the batch are skipped by the workers."""
+        self._cancel.set()
+
+    def _complete(self, index, data):
+        """Store a result (any thread) and schedule its delivery."""
+        with self._lock:
+            self._results[index] = data
+            self.done += 1
+            if self._flush_pending:
+                return
+            self._flush_pending = True
+        Clock.schedule_once(self._flush)
+
+    def _flush(self, dt=None):
+        """Deliver the results that are next in order (main thread)."""
+        if self.cancelled:
+            return
+        deadline = time.perf_counter() + FLUSH_BUDGET
+        while True:
+            with self._lock:
+                if self._next not in self._results:
+                    self._flush_pending = False
+                    break
+                if time.perf_counter() >= deadline:
+                    # Keep _flush_pending: this call is rescheduled instead
+                    Clock.schedule_once(self._flush)
+                    break
+                index = self._next
+                data = self._results.pop(index)
+                self._next += 1
+            if self.result_callback:
+                self.result_callback(index, data)
+            if self.cancelled:
+                return
+        done = self.done
+        if self.progress_callback:
+            self.progress_callback(done, self.total)
+        if self.finished and self.finished_callback:
+            self.finished_callback()
+
+
+class DownloadScheduler:
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=DOWNLOAD_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, name=f"Download-{n}", daemon=True)
+                         for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def fetch(self, url):
+        """Body of url, or None if it cannot be downloaded."""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.content
+        except Exception:
+            pass
+        return None
+
+    def download(self, urls, result_callback=None, progress_callback=None, finished_callback=None):
+        """Queue urls (empty entries give None without a request); see the module docstring."""
+        batch = DownloadBatch(len(urls), result_callback, progress_callback, finished_callback)
+        if not urls:
+            Clock.schedule_once(batch._flush)
+        for index, url in enumerate(urls):
+            if url:
+                self._queue.put((batch, index, url))
+            else:
+                batch._complete(index, None)
+        return batch
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, index, url = item
+            if batch.cancelled or self._closed:
+                continue
+            batch._complete(index, self.fetch(url))
+
+    def shutdown(self):
+        """Stop the workers after their current download and close the session."""
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        self.session.close()
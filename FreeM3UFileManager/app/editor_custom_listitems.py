@@ -1,19 +1,28 @@
 ﻿# app/editor_custom_listitems.py
 # -*- coding: utf-8 -*-
+import os
 import string
+from sys import intern
 from functools import partial
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.image import AsyncImage, Image
 from kivy.uix.button import Button
 from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.properties import BooleanProperty, ObjectProperty, StringProperty, ListProperty
 from kivy.graphics import Color, Rectangle
 from kivy.clock import Clock
 from app.add_channel_dialog import AddChannelDialog
 from app.emw_items_utils import edit_channel, rename_group
+from app.playlist_model import PlaylistModel, channels_of, INSERTED, REMOVED, UPDATED, MOVED, CHANGED
+from app.search_index import SearchIndex
 
 ICON_PATH = "app/icons/"
+ROW_HEIGHT = 70
+SEARCH_LIMIT = 1000         # result rows shown at most
 
 FIELD_ICONS = {
     "radio": f"{ICON_PATH}radio.png",
@@ -26,124 +35,188 @@ FIELD_ICONS = {
     "tvg-chno": f"{ICON_PATH}chno.png",
     "url": f"{ICON_PATH}url.png",
 }
+# parse_extinf keeps every attribute: fields without an icon file get no indicator
+_ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+FIELD_ICONS = {field: path for field, path in FIELD_ICONS.items()
+               if os.path.exists(os.path.join(_ICON_DIR, os.path.basename(path)))}
+
+
+class ListItemModel:
+    """
+    One row of the list. Only the visible rows get a CustomListItem widget,
+    so the row itself (and its selection) lives here.
+    Keeps the attributes plugins use on list items: item_type, data, node,
+    selected and key_path. node_id is the integer ID of ref in the model
+    index (also available as data["_id"]).
+    """
+    __slots__ = ("item_type", "ref", "node_id", "group_title", "selected", "key_path", "_data")
+
+    def __init__(self, item_type, data=None, ref=None, node_id=None, group_title=""):
+        self.item_type = item_type
+        self.ref = ref                       # real node in editor_window.data (channel dict / group dict)
+        self.node_id = node_id
+        self.group_title = group_title       # derived from the level the row is shown in
+        self.selected = False
+        self.key_path = []
+        self._data = data
+
+    @property
+    def data(self):
+        # Channel rows build their display copy on first use only
+        if self._data is None:
+            self._data = {**self.ref, "group-title": self.group_title, "item_type": "channel", "_id": self.node_id}
+        return self._data
+
+    @property
+    def node(self):
+        return self.data
 
-class CustomListItem(BoxLayout):
+    def set_selected(self, style, value):
+        self.selected = value
+
+
+class CustomListItem(RecycleDataViewBehavior, BoxLayout):
+    """Recycled row widget: displays whatever ListItemModel it is given."""
     item_type = StringProperty("channel")  # "channel", "group", "back"
     selected = BooleanProperty(False)
-    data = ObjectProperty(None)           # Copy of the data to display
-    node = ObjectProperty(None)           # Reference to the original node (can be a dictionary)
-    key_path = ListProperty([])           # Path inside editor_window.data
-
-    def __init__(self, data=None, style=None, **kwargs):
-        super().__init__(orientation="horizontal", size_hint_y=None, height=70, **kwargs)
-        self.data = data or {}
-        self.node = data                     # Original node that needs to be modified
-        self.item_type = self.data.get("item_type", "channel")
-        self.style = style or {}
-        self.selected = False
-        self.key_path = []                   
+    model = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", size_hint_y=None, height=ROW_HEIGHT, **kwargs)
+        self.helper = None
+        self.style = {}
+
+        # Internal widgets, created once and reused for every row shown
+        self.icon_widget = AsyncImage(size_hint_x=None, width=70)
+        self.text_label = Label(halign="left", valign="middle")
+        self.count_label = Label(font_size=24, size_hint_x=None, width=180)
+        self.indicators_box = BoxLayout(orientation="horizontal", size_hint_x=None, width=150)
+        self.edit_btn = BorderedIconButton(f"{ICON_PATH}edit.png")
+        self.open_btn = BorderedIconButton(f"{ICON_PATH}open.png")
+        self.edit_btn.button.bind(on_release=self._on_edit)
+        self.open_btn.button.bind(on_release=self._on_open)
 
-        # Internal widgets
-        self.icon_widget = None
-        self.text_label = None
-        self.open_btn = None
-        self.edit_btn = None
-        self.count_label = None
-        self.indicators_box = None
+        self.add_widget(self.icon_widget)
+        self.add_widget(self.text_label)
 
+        with self.canvas.before:
+            self._bg_color = Color(0.15, 0.15, 0.15, 1)
+            self._bg_rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.helper = rv.helper
+        super().refresh_view_attrs(rv, index, data)
+        self.item_type = self.model.item_type
+        self.selected = self.model.selected
         self.build_ui()
-        Clock.schedule_once(lambda dt: self._update_background(self.style))
+        self.apply_style(self.helper.style)
 
     def build_ui(self):
-        self.clear_widgets()
+        for widget in (self.count_label, self.indicators_box, self.edit_btn, self.open_btn):
+            if widget.parent:
+                self.remove_widget(widget)
+
+        model = self.model
+        fields = model.ref if self.item_type == "channel" else model.data
 
         # --- Main Icon ---
         if self.item_type == "channel":
-            logo_url = self.data.get("tvg-logo") or self.data.get("logo")
-            if logo_url:
-                self.icon_widget = AsyncImage(source=logo_url, size_hint_x=None, width=70)
-            else:
-                self.icon_widget = Image(source=f"{ICON_PATH}channel.png", size_hint_x=None, width=70)
+            logo_url = fields.get("tvg-logo") or fields.get("logo")
+            self.icon_widget.source = logo_url or f"{ICON_PATH}channel.png"
         elif self.item_type == "group":
-            self.icon_widget = Image(source=f"{ICON_PATH}folder.png", size_hint_x=None, width=70)
+            self.icon_widget.source = f"{ICON_PATH}folder.png"
         elif self.item_type == "back":
-            self.icon_widget = Image(source=f"{ICON_PATH}back.png", size_hint_x=None, width=70)
+            self.icon_widget.source = f"{ICON_PATH}back.png"
         else:
-            self.icon_widget = Image(source=f"{ICON_PATH}unknown.png", size_hint_x=None, width=70)
-        self.add_widget(self.icon_widget)
+            self.icon_widget.source = f"{ICON_PATH}unknown.png"
 
         # --- Main text ---
-        self.text_label = Label(text=self.data.get("name", "Unnamed"), halign="left", valign="middle")
-        self.add_widget(self.text_label)
+        self.text_label.text = fields.get("name", "Unnamed")
 
         # --- Group: counter + buttons ---
         if self.item_type == "group":
-            children = self.data.get("children", {})
+            children = fields.get("children", {})
             channel_count = 0
             if isinstance(children, dict) and "_channels" in children:
                 channel_count = len(children["_channels"])
             elif isinstance(children, list):
                 channel_count = len(children)
-
-            self.count_label = Label(text="Channels:"+str(channel_count)+"  ",  
-                                     font_size=24, 
-                                     color=self.style.get("label").get("color", (1, 1, 1, 1)),
-                                     size_hint_x=None, 
-                                     width=180)
+            self.count_label.text = "Channels:" + str(channel_count) + "  "
             self.add_widget(self.count_label)
-
-            self.edit_btn = BorderedIconButton(f"{ICON_PATH}edit.png", self.style)
-            self.open_btn = BorderedIconButton(f"{ICON_PATH}open.png", self.style)
             self.add_widget(self.edit_btn)
             self.add_widget(self.open_btn)
 
         # --- Channel: indicators + edit ---
         elif self.item_type == "channel":
-            self.indicators_box = BoxLayout(orientation="horizontal", size_hint_x=None, width=150)
+            self.indicators_box.clear_widgets()
             for field, icon_path in FIELD_ICONS.items():
-                if self.data.get(field):
+                if fields.get(field):
                     img = Image(source=icon_path, size_hint_x=None, width=24)
-                    if field == "tvg-logo" and not self.data.get("logo_valid", True):
+                    if field == "tvg-logo" and not fields.get("logo_valid", True):
                         img.color = (1, 0, 0, 1)
                     self.indicators_box.add_widget(img)
             self.add_widget(self.indicators_box)
-
-            self.edit_btn = BorderedIconButton(f"{ICON_PATH}edit.png", self.style)
             self.add_widget(self.edit_btn)
 
-        self.apply_style(self.style)
-
     def apply_style(self, style):
         self.style = style
         label_style = style.get("label", {})
 
-        if self.text_label:
-            self.text_label.color = label_style.get("color", (1, 1, 1, 1))
-            self.text_label.font_size = label_style.get("font_size", 16)
-
-        button_style = style.get("label", {})
+        self.text_label.color = label_style.get("color", (1, 1, 1, 1))
+        self.text_label.font_size = label_style.get("font_size", 16)
+        self.count_label.color = label_style.get("color", (1, 1, 1, 1))
+        self.edit_btn.apply_style(style)
+        self.open_btn.apply_style(style)
 
         self._update_background(style)
 
     def _update_background(self, style, *args):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            if self.selected:
-                Color(0.3, 0.5, 0.9, 0.3)
-            else:
-                bg = style.get("background", (0.15, 0.15, 0.15, 1))
-                Color(*bg)
-            Rectangle(pos=self.pos, size=self.size)
-        self.bind(pos=lambda *_: self._update_background(self.style),
-                  size=lambda *_: self._update_background(self.style))
+        if self.selected:
+            self._bg_color.rgba = (0.3, 0.5, 0.9, 0.3)
+        else:
+            self._bg_color.rgba = style.get("background", (0.15, 0.15, 0.15, 1))
+
+    def _update_rect(self, *args):
+        self._bg_rect.pos = self.pos
+        self._bg_rect.size = self.size
 
     def set_selected(self, style, value):
         self.selected = value
+        if self.model is not None:
+            self.model.selected = value
         self._update_background(self.style)
 
+    # -----------------------
+    # Touch / buttons
+    # -----------------------
+    def on_touch_down(self, touch):
+        if not self.collide_point(*touch.pos) or self.model is None:
+            return False
+        if touch.is_mouse_scrolling:
+            return False
+        if self.item_type == "back":
+            self.helper.go_back()
+            return True
+        for btn in (self.open_btn, self.edit_btn):
+            if btn.parent and btn.collide_point(*touch.pos):
+                return super().on_touch_down(touch)
+        self.set_selected(self.style, not self.selected)
+        return True
+
+    def _on_edit(self, *args):
+        if self.item_type == "group":
+            rename_group(self.helper, self.model.data)
+        elif self.item_type == "channel":
+            edit_channel(self.helper, self.model.ref)
+
+    def _on_open(self, *args):
+        if self.item_type == "group":
+            self.helper.open_group(self.model.data)
+
 
 class BorderedIconButton(BoxLayout):
-    def __init__(self, icon_path, style, **kwargs):
+    def __init__(self, icon_path, style=None, **kwargs):
         super().__init__(**kwargs)
         self.size_hint = (None, None)
         self.width = 70
@@ -152,7 +225,7 @@ class BorderedIconButton(BoxLayout):
 
         # Fondo gris detrás
         with self.canvas.before:
-            Color(*style.get("button").get("background_normal"))
+            self.bg_color = Color(0.2, 0.2, 0.2, 1)
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._update_bg, size=self._update_bg)
 
@@ -160,11 +233,17 @@ class BorderedIconButton(BoxLayout):
         self.button = Button(
             background_normal=icon_path,
             background_down=icon_path,
-            background_color=style.get("button").get("text_color"),
             border=(0, 0, 0, 0),
             size_hint=(.9, .9)
         )
         self.add_widget(self.button)
+        if style:
+            self.apply_style(style)
+
+    def apply_style(self, style):
+        button_style = style.get("button", {})
+        self.bg_color.rgba = button_style.get("background_normal", (0.2, 0.2, 0.2, 1))
+        self.button.background_color = button_style.get("text_color", (1, 1, 1, 1))
 
     def _update_bg(self, *args):
         margin = 5
@@ -172,29 +251,57 @@ class BorderedIconButton(BoxLayout):
         self.bg_rect.size = (self.width - 2*margin, self.height - 2*margin)
 
 
+class EditorRecycleView(RecycleView):
+    """RecycleView of CustomListItem rows; only the visible rows exist as widgets."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.helper = None
+        self.viewclass = CustomListItem
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            size_hint_y=None,
+            spacing=5,
+            default_size=(None, ROW_HEIGHT),
+            default_size_hint=(1, None)
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+
+
 class EditorCustomQListItems:
-    """Helper to populate a BoxLayout within a ScrollView with custom items from a JSON dictionary/list"""
+    """
+    Helper to fill an EditorRecycleView with the rows of the current level of a JSON dictionary/list.
+    Changes made through self.model patch only the rows involved.
+    With a search query (set_search) the rows are the matching channels of
+    the whole tree instead of the current level.
+    """
     def __init__(self, container, style=None, parent=None):
         self.container = container
+        self.container.helper = self
         self.parent = parent
         self.items = []
-        self.data_root = {}
+        self.model = PlaylistModel()
+        self.search_index = SearchIndex(self.model)
+        self.model.add_listener(self._on_model_change)
+        self.search_query = None
         self.current_path = []
         self.style = style or {}
 
+    @property
+    def data_root(self):
+        return self.model.root
+
     def set_style(self, style):
         """Change style at runtime"""
         self.style = style
-        for item in self.items:
-            item.apply_style(style)
+        self.refresh_rows()
 
     # -----------------------
     # Load and display data
     # -----------------------
     def load_data(self, data):
-        self.data_root = data
         self.current_path = []
-        self.populate_list()
+        self.model.set_root(data)
 
     def get_current_data(self):
         ref = self.data_root
@@ -202,78 +309,216 @@ class EditorCustomQListItems:
             ref = ref.get(key, {})
         return ref
 
+    def show_partial_data(self, data, lazy=None):
+        """Replace the tree keeping the current level if it exists in data (loading)."""
+        self.trim_current_path(data)
+        self.model.set_root(data, lazy)
+
+    def trim_current_path(self, root=None):
+        """
+        Drop the end of current_path if those groups no longer exist (e.g.
+        after an undo). Returns True if the path changed.
+        """
+        ref = self.data_root if root is None else root
+        for depth, key in enumerate(self.current_path):
+            child = ref.get(key) if isinstance(ref, dict) else None
+            if not isinstance(child, dict):
+                del self.current_path[depth:]
+                return True
+            ref = child
+        return False
+
     def populate_list(self):
         # Save current selection
-        selected_ids = {item.data.get("_unique_id") for item in self.items if item.selected}
+        selected_keys = {self._selection_key(item) for item in self.items if item.selected}
+
+        if self.search_query:
+            items = self._search_rows()
+        else:
+            items = self._level_rows()
 
-        self.container.clear_widgets()
-        self.items.clear()
+        # Restore selection
+        if selected_keys:
+            for item in items:
+                if self._selection_key(item) in selected_keys:
+                    item.selected = True
+
+        self._set_rows(items)
+
+    def _level_rows(self):
+        items = []
         data = self.get_current_data()
+        index = self.model.index
+        # Lazily loaded playlists decode the channels of a group when it is opened
+        self.model.materialize(data)
+        if data not in index:
+            # Level created outside the model (e.g. by a plugin)
+            index.build(self.data_root)
+        index.sync_level(data)
 
         # --- Back ---
         if self.current_path:
-            back_item = CustomListItem(
-                data={"name": "Back", "item_type": "back", "_unique_id": "back", "_display_name": "Back"},
-                style=self.style
-            )
-            back_item.bind(on_touch_down=lambda i, t: self.go_back() if back_item.collide_point(*t.pos) else False)
             # Back is never selected.
-            self.items.append(back_item)
-            self.container.add_widget(back_item)
+            items.append(ListItemModel(
+                "back",
+                data={"name": "Back", "item_type": "back", "_display_name": "Back"}
+            ))
 
         # --- Groups ---
         if isinstance(data, dict):
             for k, v in data.items():
                 if k == "_channels":
                     continue
-                group_data = {
-                    "name": k,
-                    "item_type": "group",
-                    "children": v,
-                    "key": k,
-                    "_unique_id": f"{self.current_path}::{k}",
-                    "_display_name": k
-                }
-                group_item = CustomListItem(data=group_data, style=self.style)
-                # Restore selection
-                if group_data["_unique_id"] in selected_ids:
-                    group_item.set_selected(self.style, True)
-
-                if group_item.open_btn:
-                    group_item.open_btn.button.bind(on_release=lambda btn, gd=group_data: self.open_group(gd))
-                    group_item.open_btn.button.bind(on_touch_down=self._on_item_touch)
-                    
-                if group_item.edit_btn:
-                    group_item.edit_btn.button.bind(on_release=lambda btn, gd=group_data: rename_group(self, gd))
-                    group_item.edit_btn.button.bind(on_touch_down=self._on_item_touch)
-
-                self.items.append(group_item)
-                self.container.add_widget(group_item)
+                items.append(self._group_row(k, v))
 
         # --- Channels ---
-        channels = []
-        if isinstance(data, dict) and "_channels" in data:
-            channels = data["_channels"]
-        elif isinstance(data, list):
-            channels = data
-
-        for ch in channels:
-            # Add identifiers and display name
-            full_path = "::".join(self.current_path)
-            ch["_unique_id"] = f'{full_path}::{ch.get("name","Unknown")}::{ch.get("url","")}'
-            ch["_display_name"] = ch.get("name", "Unknown")
-
-        for ch in channels:
-            ch_item = CustomListItem(data={**ch, "item_type": "channel"}, style=self.style)
-            # Restore selection
-            if ch["_unique_id"] in selected_ids:
-                ch_item.set_selected(self.style, True)
-
-            if ch_item.edit_btn:
-                ch_item.edit_btn.button.bind(on_release=lambda instance, ch=ch: edit_channel(self, ch))
-            ch_item.bind(on_touch_down=self._on_item_touch)
-            self.items.append(ch_item)
-            self.container.add_widget(ch_item)
+        items.extend(self._channel_rows(channels_of(data)))
+        return items
+
+    def _search_rows(self):
+        result = self.search_index.search(self.search_query, SEARCH_LIMIT)
+        shown = f" (first {len(result.matches)})" if result.total > len(result.matches) else ""
+        label = f"Back - {result.total} channels match '{self.search_query}'{shown}"
+        items = [ListItemModel("back", data={"name": label, "item_type": "back", "_display_name": label})]
+        index = self.model.index
+        id_of = index.id_of
+        group_title_of = self.model.group_title_of
+        for ch, group in result.matches:
+            # Node IDs for the selection (channels are indexed per group)
+            index.load_channels(group)
+            items.append(ListItemModel("channel", ref=ch, node_id=id_of(ch), group_title=group_title_of(ch) or ""))
+        return items
+
+    def _group_row(self, key, group):
+        node_id = self.model.index.id_of(group)
+        group_data = {
+            "name": key,
+            "item_type": "group",
+            "children": group,
+            "key": key,
+            "_id": node_id,
+            "_display_name": key
+        }
+        return ListItemModel("group", data=group_data, ref=group, node_id=node_id)
+
+    def _channel_rows(self, channels):
+        id_of = self.model.index.id_of
+        title = intern("/".join(self.current_path))
+        return [ListItemModel("channel", ref=ch, node_id=id_of(ch), group_title=title) for ch in channels]
+
+    def get_node(self, item):
+        """
+        Real node of a row: accepts a list item, a row data dict (with "_id")
+        or an integer node ID. O(1); None if unknown.
+        """
+        if isinstance(item, ListItemModel):
+            return item.ref if item.item_type != "back" else None
+        if isinstance(item, dict):
+            item = item.get("_id")
+        if item is None:
+            return None
+        return self.model.get_node(item)
+
+    def refresh_rows(self):
+        """Redraw the visible rows from their models."""
+        self.container.refresh_from_data()
+
+    def _set_rows(self, items):
+        self.items[:] = items
+        self.container.data = [{"model": item} for item in items]
+
+    def _first_channel_row(self):
+        index = 0
+        for item in self.items:
+            if item.item_type == "channel":
+                break
+            index += 1
+        return index
+
+    # -----------------------
+    # Model notifications
+    # -----------------------
+    def _on_model_change(self, event):
+        if self.search_query:
+            # The index is patched first (it listens before): run the query again
+            self.trim_current_path()
+            self.populate_list()
+            return
+        if event.type not in (INSERTED, REMOVED, UPDATED, MOVED, CHANGED):
+            self.populate_list()
+            return
+
+        current = self.get_current_data()
+        if event.type == REMOVED and event.parent is None:
+            # Removal spread over several groups
+            self._rows_removed(event)
+            self.refresh_rows()
+            return
+        if event.parent is not current:
+            # Only the channel counters of the visible groups can change
+            if any(item.ref is event.parent for item in self.items if item.item_type == "group"):
+                self.refresh_rows()
+            return
+
+        if event.type == INSERTED:
+            self._rows_inserted(event)
+        elif event.type == REMOVED:
+            self._rows_removed(event)
+        elif event.type == UPDATED:
+            self._rows_updated(event)
+        else:
+            # MOVED or CHANGED: rebuild the level keeping the row models
+            self._rows_moved(event)
+
+    def _rows_inserted(self, event):
+        if event.keys:
+            pos = self._first_channel_row()
+            rows = [self._group_row(k, event.parent[k]) for k in event.keys]
+            self.items[pos:pos] = rows
+            self.container.data[pos:pos] = [{"model": item} for item in rows]
+        if event.channels:
+            pos = self._first_channel_row() + event.index
+            rows = self._channel_rows(event.channels)
+            self.items[pos:pos] = rows
+            self.container.data[pos:pos] = [{"model": item} for item in rows]
+
+    def _rows_removed(self, event):
+        removed = {id(node) for node in event.channels}
+        removed.update(id(group) for group in event.groups)
+        rows = [item for item in self.items if item.item_type == "back" or id(item.ref) not in removed]
+        if len(rows) != len(self.items):
+            self._set_rows(rows)
+
+    def _rows_updated(self, event):
+        updated = {id(ch) for ch in event.channels}
+        renamed = dict(event.renamed)
+        for index, item in enumerate(self.items):
+            if item.item_type == "channel" and id(item.ref) in updated:
+                item._data = None
+            elif item.item_type == "group" and item.data.get("key") in renamed:
+                new_key = renamed[item.data["key"]]
+                row = self._group_row(new_key, event.parent[new_key])
+                row.selected = item.selected
+                self.items[index] = row
+                self.container.data[index] = {"model": row}
+        self.refresh_rows()
+
+    def _rows_moved(self, event):
+        # Reuse the existing row models so the selection is kept
+        rows = {item.node_id: item for item in self.items if item.node_id is not None}
+        id_of = self.model.index.id_of
+        items = [item for item in self.items if item.item_type == "back"]
+        for k, v in event.parent.items():
+            if k != "_channels":
+                row = rows.get(id_of(v))
+                items.append(row if row and row.data.get("key") == k else self._group_row(k, v))
+        for ch in channels_of(event.parent):
+            row = rows.get(id_of(ch))
+            items.extend([row] if row else self._channel_rows([ch]))
+        self._set_rows(items)
+
+    def _selection_key(self, item):
+        return (item.item_type, item.node_id if item.node_id is not None else id(item.ref))
 
     # -----------------------
     # Navigation
@@ -281,8 +526,21 @@ class EditorCustomQListItems:
     def open_group(self, group_data, _=None):
         self.current_path.append(group_data["key"])
         self.populate_list()
+        self.container.scroll_y = 1
+
+    def set_search(self, query):
+        """Show the channels matching query (None or "" goes back to the current level)."""
+        self.search_query = query or None
+        self.populate_list()
+        self.container.scroll_y = 1
 
     def go_back(self):
+        if self.search_query:
+            if self.parent is not None:
+                # Clearing the search field ends the search (see EditorMainWindow)
+                self.parent.search_input.text = ""
+            self.set_search(None)
+            return
         if self.current_path:
             self.current_path.pop()
             self.populate_list()
@@ -290,30 +548,10 @@ class EditorCustomQListItems:
     # -----------------------
     # Selección
     # -----------------------
-    def _on_item_touch(self, instance, touch):
-        # If the instance is a child button, navigate up to the CustomListItem container.
-        if not isinstance(instance, CustomListItem):
-            instance = instance.parent
-            while instance and not isinstance(instance, CustomListItem):
-                instance = instance.parent
-            if instance is None:
-                return False
-
-        if not instance.collide_point(*touch.pos):
-            return False
-        if getattr(instance, "open_btn", None) and instance.open_btn.collide_point(*touch.pos):
-            return False
-        if getattr(instance, "edit_btn", None) and instance.edit_btn.collide_point(*touch.pos):
-            return False
-        if instance.data.get("item_type") == "back":
-            return False
-
-        instance.set_selected(self.style, not instance.selected)
-        return True
-
     def clear_selection(self):
         for item in self.items:
             item.set_selected(self.style, False)
+        self.refresh_rows()
 
     def get_selected_items(self):
         return [item.data for item in self.items if item.selected]
@@ -330,35 +568,32 @@ class EditorCustomQListItems:
                     item.set_selected(self.style, select_value)
                 if items_type == "group" and item.item_type == "group":
                     item.set_selected(self.style, select_value)
+        self.refresh_rows()
 
     # -----------------------
     # Data modification
     # -----------------------
     def add_item(self, data):
-        """Add a new item (channel or group) while respecting the _unique_id and _display_name."""
+        """Add a row (channel or group) for data without changing the tree."""
         # Si es canal
         if data.get("item_type") == "channel":
-            data["_unique_id"] = f'{data.get("name","Unknown")}::{data.get("url","")}'
-            data["_display_name"] = data.get("name", "Unknown")
+            item = ListItemModel("channel", ref=data, node_id=self.model.index.id_of(data))
         # Si es grupo
-        elif data.get("item_type") == "group":
-            data["_unique_id"] = f'{self.current_path}::{data.get("name","Unnamed")}'
+        else:
             data["_display_name"] = data.get("name","Unnamed")
+            children = data.get("children")
+            item = ListItemModel(data.get("item_type", "group"), data=data, ref=children,
+                                 node_id=self.model.index.id_of(children))
 
-        item = CustomListItem(data=data, style=self.style)
-        item.bind(on_touch_down=self._on_item_touch)
         self.items.append(item)
-        self.container.add_widget(item)
+        self.container.data.append({"model": item})
 
     def remove_item(self, data):
-        to_remove = None
-        for item in self.items:
+        for index, item in enumerate(self.items):
             if item.data == data:
-                to_remove = item
+                del self.items[index]
+                del self.container.data[index]
                 break
-        if to_remove:
-            self.items.remove(to_remove)
-            self.container.remove_widget(to_remove)
 
     def get_all_items_flat(self):
         return [item.data for item in self.items]
@@ -15,19 +15,24 @@ from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.image import Image
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.spinner import Spinner
 from kivy.uix.textinput import TextInput
+from kivy.uix.checkbox import CheckBox
+from kivy.uix.progressbar import ProgressBar
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.graphics import Color, Rectangle
 
 from app.themed_screen import ThemedScreen
-from app.editor_custom_listitems import EditorCustomQListItems
+from app.editor_custom_listitems import EditorCustomQListItems, EditorRecycleView
 from app.add_channel_dialog import AddChannelDialog
 from app.group_selector import GroupSelector
 from app.dropdown_menu_popup import DropDownMenuPopup
 from app.style_manager import style_manager
+from app.reorder import reorder, MOVE_TOP, MOVE_BOTTOM, MOVE_TO_INDEX
+from app.undo_journal import DEFAULT_MAX_STEPS, DEFAULT_MAX_COST
+from app.file_loader import FileLoaderWorker
+from app.lazy_playlist import LazyPlaylist
 from app.emw_icon_button import IconButton
 from app.file_dialog import FileDialog
 from app.emw_file_utils import *
@@ -35,12 +40,17 @@ from app.emw_items_utils import (
     add_channel, add_group,
     remove_channel, remove_group,
     remove_channel_recursive, remove_group_recursive,
-    collect_items, select_destination_group,
+    select_destination_group,
     copy_items, move_items,
     update_group_title_recursive
 )
 
 
+M3U_EXTENSIONS = (".m3u", ".m3u8", ".m3u.gz", ".m3u8.gz")
+JSON_EXTENSIONS = (".json", ".json.gz")
+SEARCH_DELAY = 0.3          # seconds without typing before searching
+
+
 class EditorMainWindow(ThemedScreen):
     def __init__(self, file_path, is_new, config, plugin_manager, **kwargs):
         super().__init__(**kwargs)
@@ -56,7 +66,18 @@ class EditorMainWindow(ThemedScreen):
         self.style = style_manager.get_style()
 
         # data load
-        self.data = load_file(self.file_path, is_new)
+        self.parse_workers = self.config.get_int("parse_workers", 0) if self.config else 0
+        self.save_backups = self.config.get_int("save_backups", 0) if self.config else 0
+        self.undo_levels = self.config.get_int("undo_levels", DEFAULT_MAX_STEPS) if self.config else DEFAULT_MAX_STEPS
+        self.undo_max_nodes = self.config.get_int("undo_max_nodes", DEFAULT_MAX_COST) if self.config else DEFAULT_MAX_COST
+        self.cache_max_mb = self.config.get_int("cache_max_mb", 0) if self.config else 0
+        self.lazy_load = self.config.get_bool("lazy_load", False) if self.config else False
+        json_indent = self.config.get_int("json_indent", 0) if self.config else 0
+        self.json_indent = json_indent or None     # 0 = compact JSON
+        self.search_on_load = self.config.get_bool("search_index_on_load", True) if self.config else True
+        self._search_event = None
+        self.data = {}
+        self.loader = None
 
         # UI main container
         self.main_layout = BoxLayout(spacing=5, padding=5)
@@ -72,6 +93,10 @@ class EditorMainWindow(ThemedScreen):
         # Optimización resize
         self._resize_event = None
         Window.bind(on_resize=self.on_window_resize)
+        Window.bind(on_key_down=self.on_key_down)
+
+        # The file is parsed on a worker thread (see app.file_loader)
+        self.start_loading()
 
     # -----------------------
     # Resize Window
@@ -84,14 +109,13 @@ class EditorMainWindow(ThemedScreen):
     def finish_resize(self, *args):
         self.update_layout_orientation()
         self.set_theme()
-        if hasattr(self, "editor_helper"):
-            self.editor_helper.populate_list()
 
     def update_layout_orientation(self):
         """Reorganiza layout según orientación de ventana"""
         self.main_layout.clear_widgets()
 
-        top_buttons_list = [self.add_btn, self.remove_btn, self.copy_move_btn, self.select_menu_btn, self.move_items_up_btn, self.move_items_down_btn]
+        top_buttons_list = [self.add_btn, self.remove_btn, self.copy_move_btn, self.select_menu_btn, self.move_items_up_btn, self.move_items_down_btn,
+                            self.undo_btn, self.redo_btn]
         bottom_buttons_list = [self.toggle_theme_btn, self.plugins_btn, self.import_btn, self.save_btn]
 
         for btn in top_buttons_list + bottom_buttons_list:
@@ -100,8 +124,8 @@ class EditorMainWindow(ThemedScreen):
 
         if Window.width > Window.height:  # Horizontal → botones a la derecha
             self.main_layout.orientation = "horizontal"
-            self.scroll.size_hint = (0.95, 1)
-            self.main_layout.add_widget(self.scroll)
+            self.list_panel.size_hint = (0.95, 1)
+            self.main_layout.add_widget(self.list_panel)
 
             self.button_panel.clear_widgets()
             self.button_panel.orientation = "vertical"
@@ -127,8 +151,8 @@ class EditorMainWindow(ThemedScreen):
 
         else:  # Vertical → botones abajo
             self.main_layout.orientation = "vertical"
-            self.scroll.size_hint = (1, 0.9)
-            self.main_layout.add_widget(self.scroll)
+            self.list_panel.size_hint = (1, 0.9)
+            self.main_layout.add_widget(self.list_panel)
 
             self.button_panel.clear_widgets()
             self.button_panel.orientation = "horizontal"
@@ -138,6 +162,115 @@ class EditorMainWindow(ThemedScreen):
                 self.button_panel.add_widget(btn)
             self.main_layout.add_widget(self.button_panel)
 
+    # -----------------------
+    # Loading
+    # -----------------------
+    def start_loading(self):
+        """
+        Parse the file in the background. The groups parsed so far can be
+        browsed meanwhile; editing stays disabled until the load finishes.
+        """
+        if self.is_new or not os.path.exists(self.file_path):
+            return
+        self.loading_label = Label(text="Loading...", size_hint_x=0.3)
+        self.loading_progress = ProgressBar(max=1, value=0)
+        cancel_btn = Button(text="Cancel", size_hint_x=0.15)
+        cancel_btn.bind(on_release=lambda x: self.cancel_loading())
+        self.loading_bar = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        self.loading_bar.add_widget(self.loading_label)
+        self.loading_bar.add_widget(self.loading_progress)
+        self.loading_bar.add_widget(cancel_btn)
+        self.list_panel.add_widget(self.loading_bar, index=len(self.list_panel.children))
+        self.set_editing_enabled(False)
+
+        self.loader = FileLoaderWorker(
+            self.file_path, workers=self.parse_workers, cache_max_bytes=self.cache_max_mb * 1024 * 1024,
+            lazy=self.lazy_load,
+            search_index=self.editor_helper.search_index if self.search_on_load else None,
+            progress_callback=self._on_load_progress,
+            partial_callback=self.editor_helper.show_partial_data,
+            finished_callback=self._on_load_finished,
+            error_callback=self._on_load_error,
+            cancelled_callback=self.close_editor
+        )
+        self.loader.start()
+
+    def cancel_loading(self):
+        if self.loader:
+            self.loading_label.text = "Cancelling..."
+            self.loader.cancel()
+
+    def _on_load_progress(self, read_bytes, total_bytes):
+        if total_bytes:
+            self.loading_progress.max = total_bytes
+            self.loading_progress.value = min(read_bytes, total_bytes)
+            self.loading_label.text = f"Loading... {read_bytes * 100 // total_bytes}%"
+
+    def _on_load_finished(self, data):
+        self._end_loading()
+        lazy = None
+        if isinstance(data, LazyPlaylist):
+            # Channels are decoded group by group as they are opened
+            lazy, data = data, data.root
+        self.data = data
+        self.editor_helper.show_partial_data(data, lazy)
+        self.editor_helper.model.journal.clear()
+
+    def _on_load_error(self, error):
+        self._end_loading()
+        self.show_popup("Error", str(error))
+        self.close_editor()
+
+    def _end_loading(self):
+        self.loader = None
+        self.list_panel.remove_widget(self.loading_bar)
+        self.set_editing_enabled(True)
+
+    def set_editing_enabled(self, enabled):
+        for btn in [self.add_btn, self.remove_btn, self.copy_move_btn, self.move_items_up_btn, self.move_items_down_btn,
+                    self.undo_btn, self.redo_btn,
+                    self.plugins_btn, self.import_btn, self.save_btn, self.search_input]:
+            btn.disabled = not enabled
+
+    def close_editor(self):
+        """Go back to the start window (cancelled or failed load)."""
+        self.loader = None
+        Window.unbind(on_resize=self.on_window_resize)
+        Window.unbind(on_key_down=self.on_key_down)
+        manager = self.manager
+        if manager:
+            manager.current = "start_window"
+            manager.remove_widget(self)
+
+    # -----------------------
+    # Keyboard
+    # -----------------------
+    def on_key_down(self, window, key, scancode, codepoint, modifiers):
+        if not self.manager or self.manager.current != self.name or "ctrl" not in modifiers or self.loader:
+            return False
+        if codepoint == "z" and "shift" in modifiers or codepoint == "y":
+            self.redo()
+            return True
+        if codepoint == "z":
+            self.undo()
+            return True
+        return False
+
+    # -----------------------
+    # Search
+    # -----------------------
+    def _on_search_text(self, instance, text):
+        if self._search_event:
+            self._search_event.cancel()
+        self._search_event = Clock.schedule_once(lambda dt: self.run_search(), SEARCH_DELAY)
+
+    def run_search(self):
+        """Show the channels of the whole tree matching the search field (see app.search_index)."""
+        self._search_event = None
+        query = self.search_input.text.strip()
+        if query != (self.editor_helper.search_query or ""):
+            self.editor_helper.set_search(query)
+
     # -----------------------
     # Theme
     # -----------------------
@@ -150,12 +283,11 @@ class EditorMainWindow(ThemedScreen):
         btn_bg = self.style["button"].get("background_normal", (0.2, 0.2, 0.2, 1))
 
         for btn in [self.add_btn, self.remove_btn, self.copy_move_btn, self.select_menu_btn, self.move_items_up_btn, self.move_items_down_btn,
-                    self.toggle_theme_btn, self.plugins_btn, self.import_btn, self.save_btn]:
+                    self.undo_btn, self.redo_btn, self.toggle_theme_btn, self.plugins_btn, self.import_btn, self.save_btn]:
             btn.set_background_color(btn_bg)
             btn.set_icon_color(text_color)
 
-        self.editor_helper.style = self.style
-        self.editor_helper.populate_list()
+        self.editor_helper.set_style(self.style)
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -166,10 +298,13 @@ class EditorMainWindow(ThemedScreen):
     # UI
     # -----------------------
     def setup_ui(self):
-        self.scroll = ScrollView()
-        self.list_content = BoxLayout(orientation="vertical", size_hint_y=None, spacing=5)
-        self.list_content.bind(minimum_height=self.list_content.setter('height'))
-        self.scroll.add_widget(self.list_content)
+        self.scroll = EditorRecycleView()
+        self.search_input = TextInput(hint_text="Search channels (name, tvg-id, tvg-name, group)", multiline=False,
+                                      size_hint_y=None, height=40)
+        self.search_input.bind(text=self._on_search_text)
+        self.list_panel = BoxLayout(orientation="vertical", spacing=5)
+        self.list_panel.add_widget(self.search_input)
+        self.list_panel.add_widget(self.scroll)
 
         self.button_panel = BoxLayout(spacing=5, padding=5)
 
@@ -180,6 +315,8 @@ class EditorMainWindow(ThemedScreen):
         self.select_menu_btn = IconButton("app/icons/select.png")
         self.move_items_up_btn = IconButton("app/icons/icon_up.png")
         self.move_items_down_btn = IconButton("app/icons/icon_down.png")
+        self.undo_btn = IconButton("app/icons/undo.png")
+        self.redo_btn = IconButton("app/icons/redo.png")
         #self.print_btn = IconButton("app/icons/icon_down.png")
         self.toggle_theme_btn = IconButton("app/icons/theme.png")
         self.plugins_btn = IconButton("app/icons/plugins.png")
@@ -193,6 +330,8 @@ class EditorMainWindow(ThemedScreen):
         self.select_menu_btn.bind(on_release=lambda x: self.select_dialog())
         self.move_items_up_btn.bind(on_release=lambda x: self.reorder_selected_items("up"))
         self.move_items_down_btn.bind(on_release=lambda x: self.reorder_selected_items("down"))
+        self.undo_btn.bind(on_release=lambda x: self.undo())       # also Ctrl+Z
+        self.redo_btn.bind(on_release=lambda x: self.redo())       # also Ctrl+Y / Ctrl+Shift+Z
         #self.print_btn.bind(on_release=lambda x: self.print_json_data())
 
         self.toggle_theme_btn.bind(on_release=lambda x: self.toggle_theme())
@@ -201,7 +340,8 @@ class EditorMainWindow(ThemedScreen):
         self.save_btn.bind(on_release=lambda x: self.save_btn_action())
 
         self.top_buttons = BoxLayout(orientation='vertical', spacing=5, size_hint_y=None)
-        for btn in [self.add_btn, self.remove_btn, self.copy_move_btn, self.select_menu_btn, self.move_items_up_btn, self.move_items_down_btn]:
+        for btn in [self.add_btn, self.remove_btn, self.copy_move_btn, self.select_menu_btn, self.move_items_up_btn, self.move_items_down_btn,
+                    self.undo_btn, self.redo_btn]:
             btn.height = 60
             self.top_buttons.add_widget(btn)
 
@@ -213,11 +353,14 @@ class EditorMainWindow(ThemedScreen):
         self.update_layout_orientation()
 
         self.editor_helper = EditorCustomQListItems(
-            container=self.list_content,
+            container=self.scroll,
             style=self.style,
             parent=self
         )
         self.editor_helper.load_data(self.data)
+        journal = self.editor_helper.model.journal
+        journal.max_steps = self.undo_levels
+        journal.max_cost = self.undo_max_nodes
 
 
     # -----------------------
@@ -261,144 +404,110 @@ class EditorMainWindow(ThemedScreen):
             self.show_popup("Notice", "No items selected.")
             return
 
-        for item in selected_items:
-            data = item.data
-            if data.get("item_type") == "channel":
-                remove_channel(self.editor_helper, data)
-            elif data.get("item_type") == "group":
-                remove_group(self.editor_helper, data.get("key"))
-        self.editor_helper.populate_list()
+        # A single removal (and list update) for the whole selection
+        self.editor_helper.model.remove_nodes({item.node_id for item in selected_items if item.node_id is not None})
+
+
+    def undo(self):
+        if self.editor_helper.model.undo() is None:
+            self.show_popup("Notice", "Nothing to undo.")
+        elif self.editor_helper.trim_current_path():
+            self.editor_helper.populate_list()
 
+    def redo(self):
+        if self.editor_helper.model.redo() is None:
+            self.show_popup("Notice", "Nothing to redo.")
+        elif self.editor_helper.trim_current_path():
+            self.editor_helper.populate_list()
 
-    def reorder_selected_items(self, direction="up"):
+    def reorder_selected_items(self, direction="up", index=0):
         """
         Reorder the selected elements (channels or groups) within the current level as a block, while maintaining their relative order.
-        direction = "up" or "down"
+        direction = "up", "down", "top", "bottom" or "index" (move the block to position index
+        among the channels, or among the groups: the selection must be of one kind)
         """
         selected_items = [item for item in self.editor_helper.items if item.selected]
         if not selected_items:
             self.show_popup("Notice", "No items selected.")
             return
+        if direction == MOVE_TO_INDEX and len(self._selected_kinds(selected_items)) > 1:
+            self.show_popup("Notice", "Select only channels or only groups to move them to a position.")
+            return
 
         current_data = self.editor_helper.get_current_data()
+        if not isinstance(current_data, dict):
+            return
 
         # --- CHANNELS ---
-        if isinstance(current_data, dict) and "_channels" in current_data:
-            channels = current_data["_channels"]
-
-            # locate indices of selected items
-            selected_indices = [
-                i for i, ch in enumerate(channels)
-                if any(ch.get("_unique_id") == item.data.get("_unique_id") for item in selected_items if item.data.get("item_type") == "channel")
-            ]
-            if selected_indices:
-                if direction == "up":
-                    if min(selected_indices) > 0:
-                        for i in selected_indices:
-                            channels[i - 1], channels[i] = channels[i], channels[i - 1]
-                elif direction == "down":
-                    if max(selected_indices) < len(channels) - 1:
-                        for i in reversed(selected_indices):
-                            channels[i + 1], channels[i] = channels[i], channels[i + 1]
+        selected_ids = {item.node_id for item in selected_items if item.item_type == "channel"} - {None}
+        channel_order = reorder(current_data.get("_channels", []), selected_ids, direction, index,
+                                key=self.editor_helper.model.index.id_of)
 
         # --- GROUPS ---
-        if isinstance(current_data, dict):
-            keys = list(current_data.keys())
-            # remove _channels because it's not a group
-            if "_channels" in keys:
-                keys.remove("_channels")
-
-            selected_keys = [
-                item.data.get("key")
-                for item in selected_items if item.data.get("item_type") == "group"
-            ]
-            selected_indices = [i for i, k in enumerate(keys) if k in selected_keys]
-
-            if selected_indices:
-                if direction == "up":
-                    if min(selected_indices) > 0:
-                        for i in selected_indices:
-                            keys[i - 1], keys[i] = keys[i], keys[i - 1]
-                elif direction == "down":
-                    if max(selected_indices) < len(keys) - 1:
-                        for i in reversed(selected_indices):
-                            keys[i + 1], keys[i] = keys[i], keys[i + 1]
-
-                # rebuild dictionary with new order
-                reordered = {}
-                if "_channels" in current_data:  # # keep the channels clear first
-                    reordered["_channels"] = current_data["_channels"]
-                for k in keys:
-                    reordered[k] = current_data[k]
-
-                current_data.clear()
-                current_data.update(reordered)
-
-        self.editor_helper.populate_list()
-
-    def _move_channel(self, current_data, channel_data, direction):
-        """
-        Move a channel in the _channels list of current_data.
-        """
-        if not isinstance(current_data, dict):
-            return
-        channels = current_data.get("_channels")
-        if not isinstance(channels, list):
-            return
-
-        # localizar índice
-        idx = None
-        for i, ch in enumerate(channels):
-            if ch is channel_data or (
-                isinstance(ch, dict) and ch.get("_unique_id") == channel_data.get("_unique_id")
-            ):
-                idx = i
-                break
+        selected_keys = {item.data.get("key") for item in selected_items if item.item_type == "group"}
+        keys = [k for k in current_data if k != "_channels"]
+        group_order = reorder(keys, selected_keys, direction, index)
 
-        if idx is None:
-            return
+        if channel_order is not None or group_order is not None:
+            self.editor_helper.model.set_order(current_data, channels=channel_order, keys=group_order)
 
-        # mover
-        if direction == "up" and idx > 0:
-            channels[idx - 1], channels[idx] = channels[idx], channels[idx - 1]
-        elif direction == "down" and idx < len(channels) - 1:
-            channels[idx + 1], channels[idx] = channels[idx], channels[idx + 1]
+    @staticmethod
+    def _selected_kinds(selected_items):
+        return {item.item_type for item in selected_items if item.item_type in ("channel", "group")}
 
-    def _move_group(self, current_data, group_key, direction):
-        """
-        Move a group within the current_data dictionary.
-        """
-        if not isinstance(current_data, dict) or not group_key in current_data:
+    def move_selected_to_index(self):
+        """Ask for a position and move the selected block there."""
+        selected_items = [item for item in self.editor_helper.items if item.selected]
+        kinds = self._selected_kinds(selected_items)
+        if not kinds:
+            self.show_popup("Notice", "No items selected.")
+            return
+        if len(kinds) > 1:
+            # One index cannot mean the same place in the group list and in the channel list
+            self.show_popup("Notice", "Select only channels or only groups to move them to a position.")
             return
+        kind = "channels" if "channel" in kinds else "groups"
 
-        keys = list(current_data.keys())
-        idx = keys.index(group_key)
+        content = BoxLayout(orientation="vertical", spacing=10, padding=10)
+        input_field = TextInput(hint_text=f"Position among the {kind} (1 = first)", multiline=False,
+                                input_filter="int", size_hint_y=None, height=40)
+        content.add_widget(input_field)
+        btn_layout = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        ok_btn = Button(text="OK")
+        cancel_btn = Button(text="Cancel")
+        btn_layout.add_widget(ok_btn)
+        btn_layout.add_widget(cancel_btn)
+        content.add_widget(btn_layout)
 
-        if direction == "up" and idx > 0:
-            keys[idx - 1], keys[idx] = keys[idx], keys[idx - 1]
-        elif direction == "down" and idx < len(keys) - 1:
-            keys[idx + 1], keys[idx] = keys[idx], keys[idx + 1]
-        else:
-            return
+        popup = Popup(title="Move to position", content=content, size_hint=(0.4, 0.4))
 
-        # rebuild the dictionary in the new order
-        reordered = {k: current_data[k] for k in keys}
-        current_data.clear()
-        current_data.update(reordered)
+        def on_ok(*args):
+            popup.dismiss()
+            if input_field.text.strip():
+                self.reorder_selected_items(MOVE_TO_INDEX, int(input_field.text) - 1)
 
+        ok_btn.bind(on_release=on_ok)
+        cancel_btn.bind(on_release=lambda *_: popup.dismiss())
+        popup.open()
 
     def open_copy_move_menu(self):
         menu_dict = {
                 "Copy": lambda: copy_items(self.editor_helper, self),
                 "Move": lambda: move_items(self.editor_helper, self),
+                "Move to top": lambda: self.reorder_selected_items(MOVE_TOP),
+                "Move to bottom": lambda: self.reorder_selected_items(MOVE_BOTTOM),
+                "Move to position...": lambda: self.move_selected_to_index(),
             }
-        DropDownMenuPopup(menu_dict, title="Plugins").open()
+        DropDownMenuPopup(menu_dict, title="Copy / Move").open()
 
 
     # -----------------------
     # Plugins
     # -----------------------
     def open_plugins_menu(self):
+        # Plugins walk the whole tree and may change it outside the model
+        self.editor_helper.model.materialize_all()
+        self.editor_helper.search_index.invalidate()
         menu_dict = self.populate_plugins_structure(self.plugin_manager, parent_instance=self)
         DropDownMenuPopup(menu_dict, title="Plugins").open()
 
@@ -469,20 +578,42 @@ class EditorMainWindow(ThemedScreen):
     # -----------------------
     # Import / Export
     # -----------------------
-    def merge_data_with_recure_names(self, imported_data, current_data):
-        """Merge sin sobrescribir grupos, añade sufijos si hay duplicados."""
-        for group_name, group_channels in imported_data.items():
-            if group_name not in current_data:
-                current_data[group_name] = group_channels
-            else:
-                suffix = 1
-                new_name = f"{group_name}_{suffix}"
-                while new_name in current_data:
-                    suffix += 1
-                    new_name = f"{group_name}_{suffix}"
-                current_data[new_name] = group_channels
-        return current_data
+    def merge_dialog(self, imported_data):
+        """Ask how to merge imported_data into the current level and merge it."""
+        content = BoxLayout(orientation="vertical", spacing=10, padding=10)
+        content.add_widget(Label(text="Match channels by:"))
+        key_spinner = Spinner(text="URL", values=["URL", "tvg-id"], size_hint_y=None, height=44)
+        content.add_widget(key_spinner)
+        drop_row = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        drop_cb = CheckBox(active=False, size_hint_x=0.2)
+        drop_row.add_widget(drop_cb)
+        drop_row.add_widget(Label(text="Remove channels missing from the imported file"))
+        content.add_widget(drop_row)
+        btn_layout = BoxLayout(size_hint_y=None, height=40, spacing=5)
+        ok_btn = Button(text="Merge")
+        cancel_btn = Button(text="Cancel")
+        btn_layout.add_widget(ok_btn)
+        btn_layout.add_widget(cancel_btn)
+        content.add_widget(btn_layout)
 
+        popup = Popup(title="Import", content=content, size_hint=(0.5, 0.5))
+
+        def on_ok(*_):
+            popup.dismiss()
+            key_field = "tvg-id" if key_spinner.text == "tvg-id" else None
+            summary = self.editor_helper.model.merge(
+                self.editor_helper.get_current_data(), imported_data,
+                key_field=key_field, drop_missing=drop_cb.active)
+            self.show_popup("Import", (
+                f"Groups added: {summary.groups_added}\n"
+                f"Channels added: {summary.channels_added}\n"
+                f"Channels updated: {summary.channels_updated}\n"
+                f"Channels removed: {summary.channels_removed}\n"
+                f"Channels unchanged: {summary.channels_unchanged}"))
+
+        ok_btn.bind(on_release=on_ok)
+        cancel_btn.bind(on_release=lambda x: popup.dismiss())
+        popup.open()
 
     def import_dialog(self):
         """Use FileDialog to import correspondence without overwriting existing data."""
@@ -491,12 +622,8 @@ class EditorMainWindow(ThemedScreen):
                 _, ext = os.path.splitext(path)
                 ext = ext.lower()
 
-                if ext == ".json":
-                    with open(path, "r", encoding="utf-8") as f:
-                        imported_data = json.load(f)
-
-                elif ext == ".m3u" or ext == ".m3u8":
-                    imported_data = load_file(path, is_new=False)
+                if path.lower().endswith(M3U_EXTENSIONS + JSON_EXTENSIONS):
+                    imported_data = load_file(path, is_new=False, workers=self.parse_workers)
 
                 else:
                     self.show_popup("Error", f"Unsupported file type: {ext}")
@@ -506,29 +633,20 @@ class EditorMainWindow(ThemedScreen):
                     self.show_popup("Error", "Invalid file structure.")
                     return
 
-                current_data = self.editor_helper.get_current_data()
-                if current_data is None:
-                    current_data = {}
-
-                # Merge without overwriting
-                updated = self.merge_data_with_recure_names(imported_data, current_data)
-
-                print(updated)
-
-                # Save changes to the helper
-                self.data = updated
-
-                # Refresh list in the UI
-                self.editor_helper.populate_list()
+                # Groups are matched by path and channels by key (see app.playlist_merge)
+                self.merge_dialog(imported_data)
 
             except Exception as e:
                 print(f"Error importing data: {e}")
 
         # Open the FileDialog in "open" mode
-        file_dialog = FileDialog(mode="open", file_types=["*.m3u", "*.m3u8", "*.json"], callback=on_file_chosen)
+        file_dialog = FileDialog(mode="open", file_types=["*.m3u", "*.m3u8", "*.m3u.gz", "*.json", "*.json.gz"], callback=on_file_chosen)
         file_dialog.open()
 
     def save_btn_action(self, *args):
+        # Also releases the mapping of a lazily loaded file before it is replaced
+        self.editor_helper.model.materialize_all()
+
         def on_file_selected(full_path):
             # We obtain the filter from the dialog box that opened.
             selected_filter = file_dialog.filter_spinner.text if file_dialog.filter_spinner else "*.m3u"
@@ -544,13 +662,10 @@ class EditorMainWindow(ThemedScreen):
                     full_path += ext
 
             try:
-                if ext.lower() == ".m3u":
-                    with open(full_path, "w", encoding="utf-8") as f:
-                        f.write("#EXTM3U\n")
-                        write_m3u_recursive(self.data, f)
-                elif ext.lower() == ".json":
-                    with open(full_path, "w", encoding="utf-8") as f:
-                        json.dump(self.data, f, indent=4, ensure_ascii=False)
+                if full_path.lower().endswith(M3U_EXTENSIONS):
+                    write_m3u_file(self.data, full_path, self.save_backups)
+                elif full_path.lower().endswith(JSON_EXTENSIONS):
+                    write_json_file(self.data, full_path, self.save_backups, self.json_indent)
                 else:
                     self.show_popup("Error", f"Unsupported extension: {ext}")
                     return
@@ -563,6 +678,7 @@ class EditorMainWindow(ThemedScreen):
         file_dialog = FileDialog(
             mode="save",
             title="Save File",
+            file_types=["*.m3u", "*.m3u8", "*.m3u.gz", "*.json", "*.json.gz"],
             callback=on_file_selected,
             default_path=os.getcwd()
         )
@@ -571,9 +687,7 @@ class EditorMainWindow(ThemedScreen):
     def export_m3u(self, out_file):
         """Export data in M3U format."""
         try:
-            with open(out_file, "w", encoding="utf-8") as f:
-                f.write("#EXTM3U\n")
-                write_m3u_recursive(self.data, f)
+            write_m3u_file(self.data, out_file, self.save_backups)
 
             self.config.set("last_file", out_file, "[GENERAL]")
 
@@ -584,8 +698,7 @@ class EditorMainWindow(ThemedScreen):
     def export_json(self, out_file):
         """Export data in JSON format."""
         try:
-            with open(out_file, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=4, ensure_ascii=False)
+            write_json_file(self.data, out_file, self.save_backups, self.json_indent)
             self.show_popup("Success", f"File saved to:\n{out_file}")
         except Exception as e:
             self.show_popup("Error", str(e))
@@ -1,77 +1,58 @@
 ﻿# app/emw_file_utils.py
 # -*- coding: utf-8 -*-
-import os, json, re
+import os, gzip
+from app.m3u_parser import detect_format, is_gzip_file, content_size, parse_m3u_to_dict, FORMAT_JSON, LoadCancelled
+from app.m3u_writer import write_m3u_file, is_gzip_path
+from app.atomic_file import atomic_write
+from app.playlist_cache import load_cached, store_cached
+from app.playlist_model import set_group_titles
+from app.json_stream import read_json_stream, write_json_stream
 
-def load_file(file_path, is_new):
+JSON_BUFFER_SIZE = 1024 * 1024
+
+def load_file(file_path, is_new, progress_callback=None, workers=0, tree=None, cache_max_bytes=0):
+    """
+    Load a playlist (M3U or JSON, optionally gzip-compressed). With
+    cache_max_bytes > 0 the parsed tree is cached (see app.playlist_cache)
+    and an unchanged file is read back from the cache.
+    """
     if os.path.exists(file_path) and not is_new:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content.startswith("{"):
-                    return json.loads(content)
-                else:
-                    return parse_m3u_to_dict(file_path)
+            if cache_max_bytes > 0:
+                cached = load_cached(file_path)
+                if cached is not None:
+                    return cached
+            if detect_format(file_path) == FORMAT_JSON:
+                opener = gzip.open if is_gzip_file(file_path) else open
+                with opener(file_path, "rt", encoding="utf-8-sig") as f:
+                    data = read_json_stream(f, progress_callback, content_size(file_path), tree=tree)
+            else:
+                data = parse_m3u_to_dict(file_path, progress_callback, workers, tree)
+            if cache_max_bytes > 0:
+                try:
+                    store_cached(file_path, data, max_bytes=cache_max_bytes)
+                except OSError:
+                    # The cache only speeds up the next open; the load itself succeeded
+                    pass
+            return data
+        except LoadCancelled:
+            raise
         except Exception as e:
             raise RuntimeError(f"Error loading file: {e}")
     return {}
 
-def parse_m3u_to_dict(file_path):
-    tree = {}
-    current_channel = None
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("#EXTINF:"):
-                attrs = dict(re.findall(r'([\w-]+)="(.*?)"', line))
-                group_title = attrs.get("group-title", "") or ""
-                name = line.rsplit(",", 1)[-1].strip() if "," in line else attrs.get("tvg-id", "") or "Unknown"
-                current_channel = {
-                    "name": name,
-                    "group-title": group_title,
-                    "url": "",
-                    "tvg-id": attrs.get("tvg-id", ""),
-                    "tvg-name": attrs.get("tvg-name", ""),
-                    "tvg-logo": attrs.get("tvg-logo", ""),
-                    "tvg-shift": attrs.get("tvg-shift", ""),
-                    "tvg-url": attrs.get("tvg-url", ""),
-                    "radio": attrs.get("radio", ""),
-                    "catchup": attrs.get("catchup", ""),
-                    "catchup-source": attrs.get("catchup-source", ""),
-                    "catchup-days": attrs.get("catchup-days", ""),
-                }
-            elif current_channel:
-                current_channel["url"] = line
-                if current_channel["group-title"] == "":
-                    tree.setdefault("_channels", []).append(current_channel)
-                else:
-                    parts = current_channel["group-title"].split("/")
-                    ref = tree
-                    for part in parts:
-                        if part not in ref:
-                            ref[part] = {"_channels": []}
-                        ref = ref[part]
-                    ref["_channels"].append(current_channel)
-                current_channel = None
-    return tree
-
-def write_m3u_recursive(ref, f):
-    if isinstance(ref, dict):
-        for k, v in ref.items():
-            if k == "_channels":
-                for ch in v:
-                    f.write(channel_to_extinf(ch) + "\n")
-                    f.write(ch.get("url", "") + "\n")
-            else:
-                write_m3u_recursive(v, f)
-    elif isinstance(ref, list):
-        for ch in ref:
-            f.write(channel_to_extinf(ch) + "\n")
-            f.write(ch.get("url", "") + "\n")
-
-def channel_to_extinf(ch):
-    attrs = []
-    for key in ["tvg-id", "tvg-name", "tvg-logo", "tvg-url", "tvg-shift", "radio", "catchup", "catchup-source", "catchup-days", "group-title"]:
-        val = ch.get(key)
-        if val:
-            attrs.append(f'{key}="{val}"')
-    return f'#EXTINF:-1 {" ".join(attrs)},{ch.get("name","")}'
+def write_json_file(data, path, backups=0, indent=None):
+    """
+    Save the tree as JSON (compact unless indent is given) in streamed
+    blocks; a .gz suffix writes it gzip-compressed.
+    """
+    # The stored group-title of moved/renamed groups is stale: refresh it from the path
+    if isinstance(data, dict):
+        set_group_titles(data, [])
+    if is_gzip_path(path):
+        with atomic_write(path, "wb", backups=backups) as raw:
+            with gzip.open(raw, "wt", encoding="utf-8") as f:
+                write_json_stream(data, f, indent)
+    else:
+        with atomic_write(path, "w", encoding="utf-8", buffering=JSON_BUFFER_SIZE, backups=backups) as f:
+            write_json_stream(data, f, indent)
@@ -7,36 +7,25 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.popup import Popup
 from app.add_channel_dialog import AddChannelDialog
 from app.group_selector import GroupSelector
-import copy
+from app.playlist_model import set_group_titles
 
 def add_channel(editor_helper):
     def on_save(new_data, old_data=None):
         current_data = editor_helper.get_current_data()
         new_data['group-title'] = "/".join(editor_helper.current_path) if editor_helper.current_path else ""
-        if isinstance(current_data, dict):
-            if "_channels" not in current_data:
-                current_data["_channels"] = []
-            current_data["_channels"].append(new_data)
-        elif isinstance(current_data, list):
-            current_data.append(new_data)
-        editor_helper.populate_list()
+        editor_helper.model.insert_channels(current_data, [new_data])
 
     dlg = AddChannelDialog(channel_data=None, on_save=on_save)
     dlg.open()
 
 def edit_channel(editor_helper, channel):
     def on_save(new_data, old_data):
-            if old_data:  # Edit existing
-                old_data.update(new_data)  # Update the data in the dict
+            data_ref = editor_helper.get_current_data()
+            if old_data:  # Edit existing (search results come from any group)
+                parent = editor_helper.model.parent_of(old_data) or data_ref
+                editor_helper.model.update_channel(parent, old_data, new_data)
             else:  # Create new
-                data_ref = editor_helper.get_current_data()
-                if isinstance(data_ref, dict):
-                    if "_channels" not in data_ref:
-                        data_ref["_channels"] = []
-                    data_ref["_channels"].append(new_data)
-                elif isinstance(data_ref, list):
-                    data_ref.append(new_data)
-            editor_helper.populate_list()  # Refresh UI
+                editor_helper.model.insert_channels(data_ref, [new_data])
 
     dlg = AddChannelDialog(channel_data=channel, on_save=on_save)
     dlg.open()
@@ -64,10 +53,10 @@ def add_group(editor_helper):
         current_data = editor_helper.get_current_data()
         if isinstance(current_data, dict):
             if name not in current_data:
-                current_data[name] = {"_channels": []}
+                editor_helper.model.insert_group(current_data, name)
         elif isinstance(current_data, list):
             current_data.append({name: {"_channels": []}})
-        editor_helper.populate_list()
+            editor_helper.populate_list()
         popup.dismiss()
 
     ok_btn.bind(on_release=on_ok)
@@ -98,14 +87,8 @@ def rename_group(editor_helper, group_dict):
             popup.dismiss()
             return
 
-        # Rename key in parent dict
-        parent_ref[new_name] = parent_ref.pop(old_key)
-
-        # Update all group-title of subchannels
-        full_path = (editor_helper.current_path if editor_helper.current_path else []) + [new_name]
-        update_group_title_recursive(parent_ref[new_name], full_path)
-
-        editor_helper.populate_list()
+        # Rename key in parent dict (group-title of the subchannels is derived from the path)
+        editor_helper.model.rename_group(parent_ref, old_key, new_name)
         popup.dismiss()
 
     save_button.bind(on_release=save_and_close)
@@ -119,29 +102,13 @@ def rename_group(editor_helper, group_dict):
     popup.open()
 
 
-
-
-def _ensure_unique_group_name(parent_dict, desired_name):
-    """
-    Ensure that the group name is unique in parent_dict.
-    """
-    if desired_name not in parent_dict:
-        return desired_name
-    i = 1
-    new_name = f"{desired_name} ({i})"
-    while new_name in parent_dict:
-        i += 1
-        new_name = f"{desired_name} ({i})"
-    return new_name
-
-
 # ---------------------------
 # REMOVE FUNCTIONS
 # ---------------------------
 def remove_channel(editor_helper, channel_data):
     """
     Remove a channel from the current level.
-    Search by identity, _unique_id or (name, url)
+    Search by node ID, identity or (name, url)
     """
     current_data = editor_helper.get_current_data()
     if not isinstance(current_data, dict):
@@ -150,29 +117,25 @@ def remove_channel(editor_helper, channel_data):
     if not isinstance(channels, list):
         return
 
+    match = editor_helper.get_node(channel_data) if isinstance(channel_data, dict) else None
+    if match is None or editor_helper.model.parent_of(match) is not current_data:
+        match = _find_channel(channels, channel_data)
+    if match is not None:
+        editor_helper.model.remove_channels(current_data, [match])
+
+
+def _find_channel(channels, channel_data):
     # 1) search by identity
-    for i, ch in enumerate(channels):
+    for ch in channels:
         if ch is channel_data:
-            channels.pop(i)
-            editor_helper.populate_list()
-            return
+            return ch
 
-    # 2) search by _unique_id
-    uid = channel_data.get("_unique_id") if isinstance(channel_data, dict) else None
-    if uid:
-        for i, ch in enumerate(channels):
-            if isinstance(ch, dict) and ch.get("_unique_id") == uid:
-                channels.pop(i)
-                editor_helper.populate_list()
-                return
-
-    # 3) fallback: by (name, url)
+    # 2) fallback: by (name, url)
     name, url = channel_data.get("name"), channel_data.get("url")
-    for i, ch in enumerate(channels):
+    for ch in channels:
         if ch.get("name") == name and ch.get("url") == url:
-            channels.pop(i)
-            editor_helper.populate_list()
-            return
+            return ch
+    return None
 
 
 def remove_group(editor_helper, group_key):
@@ -183,8 +146,7 @@ def remove_group(editor_helper, group_key):
     if not isinstance(current_data, dict):
         return
     if group_key in current_data:
-        current_data.pop(group_key, None)
-        editor_helper.populate_list()
+        editor_helper.model.remove_groups(current_data, [group_key])
 
 
 def remove_channel_recursive(editor_helper, channel_data):
@@ -227,37 +189,14 @@ def remove_group_recursive(editor_helper, group_key):
 # -----------------------
 # Helper functions
 # -----------------------
-def collect_items(selected_items):
+def update_group_title_recursive(group_dict, path_so_far):
     """
-    Return a list of tuples (type, data) of the items to process.
-    type: "channel" or "group"
-    data: channel dict or (key, group dict)
+    Write the group-title of every channel below group_dict. Exports derive
+    the title from the path; this only refreshes the stored values.
     """
-    items = []
-    for item in selected_items:
-        node = getattr(item, 'node', None)
-        if not node:
-            continue
-        if getattr(item, 'item_type', None) == "channel":
-            items.append(("channel", item.data))
-        elif getattr(item, 'item_type', None) == "group":
-            items.append(("group", item.data))
-    return items
-
-
-def update_group_title_recursive(group_dict, path_so_far):
     if not isinstance(group_dict, dict):
         return
-
-    # update direct channels
-    for ch in group_dict.get("_channels", []):
-        if isinstance(ch, dict):
-            ch['group-title'] = "/".join(path_so_far) if path_so_far else ""
-
-    # walk subgroups
-    for k, v in group_dict.items():
-        if k != "_channels" and isinstance(v, dict):
-            update_group_title_recursive(v, path_so_far + [k])
+    set_group_titles(group_dict, list(path_so_far))
 
 
 # -----------------------
@@ -326,32 +265,10 @@ def copy_items(editor_helper, editor_main_window=None):
         if target_info is None:
             return
 
-        target_ref = target_info["ref"]
-        parent_path = target_info["parent_path"]
-        current_name = target_info["current_name"]
-
-        items_to_process = collect_items(selected_items)
-
-        for item_type, data in items_to_process:
-            if item_type == "channel":
-                path = list(filter(None, [parent_path, current_name]))
-                data['group-title'] = "/".join(path) if path else ""
-                target_ref["_channels"].append(data.copy())
-            elif item_type == "group":
-                key = data['name']
-                children = data['children']
-                # ensure unique name
-                new_key = _ensure_unique_group_name(target_ref, key) if editor_main_window else key
-                target_ref[new_key] = copy.deepcopy(children)
-
-                full_path = list(filter(None, parent_path.split("/")))
-                if current_name:
-                    full_path.append(current_name)
-                full_path.append(new_key)
-
-                update_group_title_recursive(target_ref[new_key], full_path)
-
-        editor_helper.populate_list()
+        # Channels and group subtrees are copied sharing their values,
+        # with the group-title of the copies set on the way
+        node_ids = [i.node_id for i in selected_items if getattr(i, 'node_id', None) is not None]
+        editor_helper.model.copy_nodes(node_ids, target_info["ref"])
 
     select_destination_group(process_copy, editor_helper, editor_main_window.data)
 
@@ -372,32 +289,8 @@ def move_items(editor_helper, editor_main_window=None):
         if target_info is None:
             return
 
-        target_ref = target_info["ref"]
-        parent_path = target_info["parent_path"]
-        current_name = target_info["current_name"]
-
-        items_to_process = collect_items(selected_items)
-
-        for item_type, data in items_to_process:
-            if item_type == "channel":
-                path = list(filter(None, [parent_path, current_name]))
-                data['group-title'] = "/".join(path) if path else ""
-                target_ref["_channels"].append(data)
-                remove_channel(editor_helper, data)
-            elif item_type == "group":
-                key = data['name']
-                value = data['children']
-                new_key = _ensure_unique_group_name(target_ref, key) if editor_main_window else key
-                target_ref[new_key] = copy.deepcopy(value)
-                remove_group(editor_helper, key)
-
-                full_path = list(filter(None, parent_path.split("/")))
-                if current_name:
-                    full_path.append(current_name)
-                full_path.append(new_key)
-
-                update_group_title_recursive(target_ref[new_key], full_path)
-
-        editor_helper.populate_list()
+        # Relink the nodes: nothing is copied
+        node_ids = [i.node_id for i in selected_items if getattr(i, 'node_id', None) is not None]
+        editor_helper.model.move_nodes(node_ids, target_info["ref"])
 
     select_destination_group(process_move, editor_helper, editor_main_window.data)
@@ -0,0 +1,182 @@
+﻿# app/epg_cache.py
+# -*- coding: utf-8 -*-
+"""
+Disk cache of the channel tables parsed from XMLTV guides.
+
+The channel records of a guide (see app.xmltv) are pickled (protocol 5) to
+get_cache_dir()/epg/<sha1 of the source>.pickle after a small header
+(format version, source, validators) that is read on its own first.
+
+Validators decide whether an entry still matches its source:
+
+* local files: size and mtime_ns, compared on every load (one stat);
+* URLs: the ETag and Last-Modified headers of the response. The entry
+  mtime is the time of the last check: within the TTL the entry is used
+  as is, after it a conditional GET (If-None-Match / If-Modified-Since)
+  is sent and a 304 only touches the entry, nothing is downloaded or
+  parsed. If the server cannot be reached, or sends a guide that cannot
+  be parsed (truncated or not XML), the stale entry is used.
+
+The directory is bounded in bytes like the playlist cache.
+"""
+import hashlib
+import os
+import pickle
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import requests
+
+from app.atomic_file import atomic_write
+from app.paths_module import get_cache_dir, ensure_dir
+from app.playlist_cache import evict
+from app.xmltv import REQUEST_TIMEOUT, is_url, read_xmltv_channels, response_stream, load_xmltv_channels
+
+CACHE_FORMAT = 1                        # bump when the channel records change
+CACHE_SUFFIX = ".pickle"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 6 * 3600                  # seconds before a URL is checked again
+IO_BUFFER_SIZE = 1024 * 1024
+
+# Status returned with the channels
+CACHED = "cached"                       # entry used without contacting the source
+NOT_MODIFIED = "not-modified"           # the server answered 304
+LOADED = "loaded"                       # source read and parsed, entry written
+STALE = "stale"                         # source unreachable, old entry used
+
+
+def epg_cache_dir():
+    return get_cache_dir() / "epg"
+
+
+def cache_entry_path(source, cache_dir=None):
+    cache_dir = cache_dir or epg_cache_dir()
+    key = source if is_url(source) else os.path.abspath(source)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest + CACHE_SUFFIX)
+
+
+def _file_validators(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _response_validators(response):
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def _read_header(entry, source):
+    """Validators stored in entry for source, or None if missing or unreadable."""
+    try:
+        with open(entry, "rb") as f:
+            fmt, cached_source, validators = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        _unlink(entry)
+        return None
+    if fmt != CACHE_FORMAT or cached_source != source:
+        return None
+    return validators
+
+
+def _read_channels(entry):
+    try:
+        with open(entry, "rb", buffering=IO_BUFFER_SIZE) as f:
+            pickle.load(f)
+            return pickle.load(f)
+    except Exception:
+        _unlink(entry)
+        return None
+
+
+def _store(entry, source, validators, channels, max_bytes):
+    cache_dir = ensure_dir(Path(os.path.dirname(entry)))
+    with atomic_write(entry, "wb", buffering=IO_BUFFER_SIZE) as f:
+        pickle.dump((CACHE_FORMAT, source, validators), f, protocol=5)
+        pickle.dump(channels, f, protocol=5)
+    evict(cache_dir, max_bytes)
+
+
+def _touch(entry):
+    try:
+        os.utime(entry)     # checked now
+    except OSError:
+        pass
+
+
+def load_epg_channels(source, ttl=DEFAULT_TTL, force=False, progress_callback=None,
+                      timeout=REQUEST_TIMEOUT, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Channel records of the guide at source (path or URL) and how they were
+    obtained (CACHED, NOT_MODIFIED, LOADED or STALE). force skips the TTL,
+    not the validators: an unchanged guide is still not downloaded again.
+    """
+    entry = cache_entry_path(source, cache_dir)
+    validators = _read_header(entry, source)
+
+    if not is_url(source):
+        current = _file_validators(source)
+        if validators == current:
+            channels = _read_channels(entry)
+            if channels is not None:
+                return channels, CACHED
+        channels = load_xmltv_channels(source, progress_callback)
+        _store(entry, source, current, channels, max_bytes)
+        return channels, LOADED
+
+    if validators is not None and not force:
+        try:
+            age = time.time() - os.stat(entry).st_mtime
+        except OSError:
+            age = None
+        if age is not None and 0 <= age < ttl:
+            channels = _read_channels(entry)
+            if channels is not None:
+                return channels, CACHED
+
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        with requests.get(source, stream=True, timeout=timeout, headers=headers) as response:
+            if response.status_code == 304 and validators is not None:
+                channels = _read_channels(entry)
+                if channels is not None:
+                    _touch(entry)
+                    return channels, NOT_MODIFIED
+            if response.status_code == 304 and headers:
+                # Entry lost since its header was read: ask again without validators
+                return load_epg_channels(source, ttl, True, progress_callback, timeout,
+                                         cache_dir, max_bytes)
+            response.raise_for_status()
+            with response_stream(response) as stream:
+                channels = read_xmltv_channels(stream, progress_callback)
+            current = _response_validators(response)
+    except (requests.RequestException, ET.ParseError, EOFError):
+        # EOFError: gzip data cut short
+        if validators is not None:
+            channels = _read_channels(entry)
+            if channels is not None:
+                return channels, STALE
+        raise
+    _store(entry, source, current, channels, max_bytes)
+    return channels, LOADED
+
+
+def clear_cache(cache_dir=None):
+    evict(cache_dir or epg_cache_dir(), 0)
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
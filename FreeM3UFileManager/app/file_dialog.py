@@ -60,7 +60,7 @@ def save_recent_path(path):
         json.dump(paths, f)
 
 class FileDialog(Popup):
-    def __init__(self, mode="open", file_types=["*.m3u", "*.m3u8", "*.json"], title="Select File", default_path="", callback=None, **kwargs):
+    def __init__(self, mode="open", file_types=["*.m3u", "*.m3u8", "*.m3u.gz", "*.json"], title="Select File", default_path="", callback=None, **kwargs):
         super().__init__(title=title, size_hint=(0.95, 0.95), **kwargs)
         self.mode = mode
         self.callback = callback
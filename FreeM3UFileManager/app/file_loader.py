@@ -0,0 +1,120 @@
+﻿# app/file_loader.py
+# -*- coding: utf-8 -*-
+"""
+Background loading of playlists.
+
+FileLoaderWorker parses a file on a daemon thread so the Kivy main thread
+keeps drawing. Every callback runs on the main thread (Clock.schedule_once):
+    progress_callback(read_bytes, total_bytes)
+    partial_callback(tree)      groups parsed so far, at most every PARTIAL_INTERVAL s
+    finished_callback(data)     a tree, or a LazyPlaylist with lazy=True
+    error_callback(exception)
+    cancelled_callback()
+The parser fills a tree only the worker touches; partial views are
+snapshots (new dicts and lists sharing the channel dicts), so the UI never
+iterates a container that is still growing. A SearchIndex passed in is
+built over the finished tree before finished_callback.
+"""
+import threading
+import time
+
+from kivy.clock import Clock
+
+from app.m3u_parser import LoadCancelled
+from app.emw_file_utils import load_file
+from app.lazy_playlist import LazyPlaylist, can_open_lazy
+
+PARTIAL_INTERVAL = 1.0      # seconds between partial views
+
+
+def snapshot_tree(tree):
+    """Copy the dicts and channel lists of tree; channel dicts are shared."""
+    root = {}
+    stack = [(tree, root)]
+    while stack:
+        source, target = stack.pop()
+        for key, value in source.items():
+            if isinstance(value, list):
+                target[key] = list(value)
+            elif isinstance(value, dict):
+                target[key] = {}
+                stack.append((value, target[key]))
+    return root
+
+
+class FileLoaderWorker:
+    def __init__(self, file_path, is_new=False, workers=0, progress_callback=None, partial_callback=None,
+                 finished_callback=None, error_callback=None, cancelled_callback=None, cache_max_bytes=0,
+                 lazy=False, search_index=None):
+        self.file_path = file_path
+        self.is_new = is_new
+        self.workers = workers
+        self.cache_max_bytes = cache_max_bytes
+        self.lazy = lazy        # deliver a LazyPlaylist when the file can be mapped
+        self.search_index = search_index
+        self.progress_callback = progress_callback
+        self.partial_callback = partial_callback
+        self.finished_callback = finished_callback
+        self.error_callback = error_callback
+        self.cancelled_callback = cancelled_callback
+        self._cancel = threading.Event()
+        self._thread = None
+        self._tree = {}
+        self._next_partial = 0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="FileLoaderWorker", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop at the next progress step; only cancelled_callback is called after this."""
+        self._cancel.set()
+
+    def run(self):
+        self._next_partial = time.monotonic() + PARTIAL_INTERVAL
+        try:
+            if self.lazy and not self.is_new and can_open_lazy(self.file_path):
+                data = LazyPlaylist(self.file_path, self._on_progress, self.cache_max_bytes)
+            else:
+                data = load_file(self.file_path, self.is_new, progress_callback=self._on_progress,
+                                 workers=self.workers, tree=self._tree, cache_max_bytes=self.cache_max_bytes)
+                if self.search_index is not None and isinstance(data, dict) and not self.cancelled:
+                    # The UI only sees the tree after finished_callback
+                    self.search_index.build(data)
+        except LoadCancelled:
+            data = None
+        except Exception as e:
+            if not self.cancelled:
+                self._post(self.error_callback, e)
+                return
+            data = None
+        if self.cancelled:
+            if isinstance(data, LazyPlaylist):
+                data.close()
+            self._post(self.cancelled_callback)
+        else:
+            self._post(self.finished_callback, data)
+
+    def _on_progress(self, read_bytes, total_bytes):
+        if self.cancelled:
+            raise LoadCancelled()
+        self._post(self.progress_callback, read_bytes, total_bytes)
+        if self.partial_callback and time.monotonic() >= self._next_partial:
+            self._post(self.partial_callback, snapshot_tree(self._tree))
+            self._next_partial = time.monotonic() + PARTIAL_INTERVAL
+
+    def _post(self, callback, *args):
+        if callback is None:
+            return
+
+        def deliver(dt):
+            # A result that arrives after cancel() is dropped
+            if self.cancelled and callback is not self.cancelled_callback:
+                return
+            callback(*args)
+
+        Clock.schedule_once(deliver)
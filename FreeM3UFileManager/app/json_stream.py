@@ -0,0 +1,273 @@
+﻿# app/json_stream.py
+# -*- coding: utf-8 -*-
+"""
+Streaming JSON writer and reader for the group tree.
+
+The writer walks the tree iteratively and encodes channel lists in
+batches with the C encoder, yielding text blocks; the output is compact
+unless an indent is given and json.load reads it back unchanged.
+
+The reader decodes a file in READ_CHUNK_SIZE blocks. Group objects are
+handled by a small state machine and every other value (a channel, a
+string...) is decoded by json's C scanner from the current block, so
+the raw text of the whole file and the tree are never in memory at the
+same time. Channels are compacted by a ChannelStore as they are read.
+"""
+import json
+import re
+from json.decoder import scanstring
+
+from app.channel_store import ChannelStore
+
+WRITE_BATCH_SIZE = 4096                 # channels encoded per call
+READ_CHUNK_SIZE = 1024 * 1024           # characters read per block
+PROGRESS_STEP = 4 * 1024 * 1024         # characters between progress callbacks
+
+CHANNELS_KEY = "_channels"
+
+WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+
+
+# -----------------------
+# Writing
+# -----------------------
+def iter_json_chunks(data, indent=None, batch_size=WRITE_BATCH_SIZE):
+    """Yield the JSON text of data (a group tree or any JSON value) in blocks."""
+    if indent is not None and not isinstance(indent, str):
+        indent = " " * indent
+    separators = (",", ": ") if indent is not None else (",", ":")
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=separators)
+
+    def newline(level):
+        return "" if indent is None else "\n" + indent * level
+
+    def encode_items(values, level):
+        """Elements of a list, without the brackets, in batches."""
+        for start in range(0, len(values), batch_size):
+            text = encoder.encode(values[start:start + batch_size])[1:-1]
+            if indent is not None:
+                # The encoder indents from level 1: shift it to level
+                text = text.rstrip().replace("\n", "\n" + indent * (level - 1))
+            yield ("," if start else "") + text
+
+    def encode_value(value, level):
+        text = encoder.encode(value)
+        if indent is not None and level:
+            text = text.replace("\n", "\n" + indent * level)
+        return text
+
+    if not isinstance(data, (dict, list)):
+        yield encode_value(data, 0)
+        return
+    # Stack of (iterator over the items of a dict, level)
+    stack = []
+
+    def open_container(value, level):
+        if isinstance(value, dict):
+            if not value:
+                return "{}"
+            stack.append((iter(value.items()), level))
+            return "{"
+        # list
+        if not value:
+            return "[]"
+        return "[" + "".join(encode_items(value, level + 1)) + newline(level) + "]"
+
+    yield open_container(data, 0)
+    first = True
+    while stack:
+        items, level = stack[-1]
+        entry = next(items, None)
+        if entry is None:
+            stack.pop()
+            yield newline(level) + "}"
+            first = False
+            continue
+        key, value = entry
+        head = ("" if first else ",") + newline(level + 1) + encoder.encode(str(key)) + separators[1]
+        if isinstance(value, dict):
+            if value:
+                yield head + "{"
+                stack.append((iter(value.items()), level + 1))
+                first = True
+                continue
+            yield head + "{}"
+        elif isinstance(value, list):
+            if not value:
+                yield head + "[]"
+            else:
+                yield head + "["
+                yield from encode_items(value, level + 2)
+                yield newline(level + 1) + "]"
+        else:
+            yield head + encode_value(value, level + 1)
+        first = False
+
+
+def write_json_stream(data, f, indent=None):
+    for chunk in iter_json_chunks(data, indent):
+        f.write(chunk)
+
+
+# -----------------------
+# Reading
+# -----------------------
+class _Reader:
+    """Block buffer over a text file with helpers that refill it on demand."""
+
+    def __init__(self, f, progress_callback=None, total_size=0):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.read_chars = 0
+        self.total_size = total_size
+        self.progress_callback = progress_callback
+        self.next_report = PROGRESS_STEP
+        self.decoder = json.JSONDecoder()
+
+    def refill(self):
+        """Append the next block to the unread part of the buffer. False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.read_chars += len(chunk)
+        if self.progress_callback and self.read_chars >= self.next_report:
+            self.progress_callback(self.read_chars, self.total_size)
+            self.next_report = self.read_chars + PROGRESS_STEP
+        return True
+
+    def peek(self):
+        """Next non blank character ("" at EOF), without consuming it."""
+        while True:
+            self.pos = WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.refill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            self.error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next value with the C decoder, refilling until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.refill():
+                    continue
+                raise
+            if end >= len(self.buf) and self.refill():
+                # A number may continue in the next block
+                continue
+            self.pos = end
+            return value
+
+    def string(self):
+        self.expect('"')
+        while True:
+            try:
+                value, end = scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.refill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+    def error(self, message):
+        raise json.JSONDecodeError(message, self.buf, self.pos)
+
+
+def read_json_stream(f, progress_callback=None, total_size=0, store=None, tree=None):
+    """
+    Decode a JSON document from the text file f. Objects are built by the
+    state machine below, other values by raw_decode; dicts in "_channels"
+    lists are compacted with store. A top-level object is built in tree
+    when given.
+    """
+    store = store or ChannelStore()
+    reader = _Reader(f, progress_callback, total_size)
+    if reader.peek() != "{":
+        value = reader.value()
+        if reader.peek():
+            reader.error("Extra data")
+        return value
+
+    root = tree if tree is not None else {}
+    reader.expect("{")
+    stack = [root]
+    first = True
+    while stack:
+        obj = stack[-1]
+        char = reader.peek()
+        if char == "}":
+            reader.pos += 1
+            stack.pop()
+            first = False
+            continue
+        if not first:
+            reader.expect(",")
+        key = reader.string()
+        reader.expect(":")
+        char = reader.peek()
+        if char == "{":
+            reader.pos += 1
+            obj[key] = child = {}
+            stack.append(child)
+            first = True
+            continue
+        if char == "[" and key == CHANNELS_KEY:
+            obj[key] = _read_channels(reader, store)
+        else:
+            obj[key] = reader.value()
+        first = False
+    if reader.peek():
+        reader.error("Extra data")
+    if reader.progress_callback:
+        reader.progress_callback(reader.read_chars, total_size)
+    return root
+
+
+def _read_channels(reader, store):
+    """Read a "_channels" array; the fast path decodes one element per scan_once call."""
+    reader.expect("[")
+    channels = []
+    append = channels.append
+    compact = store.compact_channel
+    scan = reader.decoder.scan_once
+    skip = WHITESPACE_RE.match
+    if reader.peek() == "]":
+        reader.pos += 1
+        return channels
+    while True:
+        buf = reader.buf
+        pos = skip(buf, reader.pos).end()
+        try:
+            value, end = scan(buf, pos)
+            end = skip(buf, end).end()
+        except (StopIteration, json.JSONDecodeError):
+            end = len(buf)      # incomplete (or invalid) element
+        if end >= len(buf):
+            # The element or its delimiter is not in the buffer yet
+            reader.pos = pos
+            if reader.refill():
+                continue
+            reader.error("Expecting value")
+        append(compact(value) if isinstance(value, dict) else value)
+        char = buf[end]
+        reader.pos = end + 1
+        if char == "]":
+            return channels
+        if char != ",":
+            reader.pos = end
+            reader.error("Expecting ',' delimiter")
@@ -0,0 +1,230 @@
+﻿# app/lazy_playlist.py
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped lazy backend for browsing large M3U files.
+
+Opening a file only builds the group skeleton of the tree plus a block
+index: the file is split in BLOCK_SIZE blocks at #EXTINF boundaries and
+each group-title maps to the blocks holding its channels. That scan is
+one re.findall per block and its result is cached next to the parsed
+playlists (see app.playlist_cache), so reopening an unchanged file only
+reads the index.
+
+The first open still scans the whole file before the skeleton is shown.
+The scan runs on the loader thread with a progress bar and is faster than
+a full parse, but its time still grows with the file size. Only reopens
+skip it, and only with the cache enabled (cache_max_mb > 0).
+
+The _channels lists of the skeleton start empty. materialize(group) fills
+one of them by decoding just the blocks of that group, so the pages of the
+other groups are never touched; materialize_all() decodes everything in
+one parse of the file (before saving, running plugins...). The records are
+identical to the ones of m3u_parser.parse_m3u_to_dict.
+"""
+import mmap
+import os
+import re
+from array import array
+
+from app.channel_store import ChannelStore
+from app.m3u_parser import parse_extinf, parse_m3u_to_dict, is_gzip_file, LoadCancelled, UTF8_BOM
+from app.playlist_cache import load_cached, store_cached
+from app.paths_module import get_cache_dir
+
+BLOCK_SIZE = 1024 * 1024
+INDEX_FORMAT = 3                # bump when the index changes, cached ones are rebuilt
+
+GROUP_TITLE_RE = re.compile(rb'group-title="([^"\r\n]*)"')
+# Start of an #EXTINF line; the first line of the file may follow a BOM
+EXTINF_START = rb'^(?:' + re.escape(UTF8_BOM) + rb')?#EXTINF:'
+# Every #EXTINF line; group 1 is its group-title, if any
+EXTINF_LINE_RE = re.compile(EXTINF_START + rb'(?:[^\n]*?group-title="([^"\r\n]*)")?', re.M)
+
+
+def lazy_index_dir():
+    return get_cache_dir() / "lazy_index"
+
+
+def can_open_lazy(file_path):
+    """Only plain (not compressed) M3U files can be memory-mapped."""
+    try:
+        if os.path.getsize(file_path) == 0 or is_gzip_file(file_path):
+            return False
+        with open(file_path, "rb") as f:
+            head = f.read(64)
+    except OSError:
+        return False
+    if head.startswith(UTF8_BOM):
+        head = head[len(UTF8_BOM):]
+    return not head.lstrip().startswith(b"{")
+
+
+def build_block_index(mm, progress_callback=None):
+    """
+    Return (bounds, titles): bounds is an array of block start offsets plus
+    the file size, titles maps each group-title (bytes) to the array of the
+    numbers of the blocks where it appears, in order of first appearance.
+    """
+    size = len(mm)
+    bounds = array("q", [0])
+    titles = {}
+    pos = 0
+    block = 0
+    while pos < size:
+        end = min(pos + BLOCK_SIZE, size)
+        if end < size:
+            found = mm.find(b"\n#EXTINF", end)
+            end = size if found < 0 else found + 1
+        chunk = mm[pos:end]
+        found_titles = GROUP_TITLE_RE.findall(chunk)
+        if len(found_titles) < chunk.count(b"#EXTINF:"):
+            # Channels without group-title: list every line's title (b"" for
+            # those) so the root channels keep their place among the groups
+            found_titles = EXTINF_LINE_RE.findall(chunk)
+        for title in dict.fromkeys(found_titles):
+            blocks = titles.get(title)
+            if blocks is None:
+                blocks = titles[title] = array("l")
+            blocks.append(block)
+        bounds.append(end)
+        pos = end
+        block += 1
+        if progress_callback:
+            progress_callback(pos, size)
+    return bounds, titles
+
+
+class LazyPlaylist:
+    def __init__(self, file_path, progress_callback=None, cache_max_bytes=0):
+        self.file_path = file_path
+        self.store = ChannelStore()
+        self._file = open(file_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index = load_cached(file_path, lazy_index_dir()) if cache_max_bytes > 0 else None
+        if index is None or index[0] != INDEX_FORMAT:
+            try:
+                bounds, titles = build_block_index(self._mm, progress_callback)
+            except LoadCancelled:
+                self.close()
+                raise
+            if cache_max_bytes > 0:
+                try:
+                    store_cached(file_path, (INDEX_FORMAT, bounds, titles), lazy_index_dir(), cache_max_bytes)
+                except OSError:
+                    pass        # the index is rebuilt next time
+        else:
+            _, bounds, titles = index
+        self._bounds = bounds
+
+        # Group skeleton, in the order m3u_parser creates the groups
+        self.root = {}
+        self._pending = {}      # id(group) -> (group, title, blocks)
+        for raw_title, blocks in titles.items():
+            title = raw_title.decode("utf-8", "replace")
+            group = self._group_for(title)
+            if id(group) not in self._pending:
+                self._pending[id(group)] = (group, title, blocks)
+
+    def _group_for(self, title):
+        if title == "":
+            self.root.setdefault("_channels", [])
+            return self.root
+        ref = self.root
+        for part in title.split("/"):
+            if part not in ref:
+                ref[part] = {"_channels": []}
+            ref = ref[part]
+        return ref
+
+    # -----------------------
+    # Decoding
+    # -----------------------
+    def is_pending(self, group):
+        return id(group) in self._pending
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def materialize(self, group):
+        """Decode the channels of group (once). Returns the decoded channels."""
+        entry = self._pending.pop(id(group), None)
+        if entry is None:
+            return []
+        _, title, blocks = entry
+        raw_title = title.encode("utf-8")
+        if raw_title:
+            pattern = re.compile(EXTINF_START + rb'[^\n]*group-title="' + re.escape(raw_title) + rb'"', re.M)
+        else:
+            pattern = EXTINF_LINE_RE
+        decoded = []
+        for block in blocks:
+            for match in pattern.finditer(self._mm, self._bounds[block], self._bounds[block + 1]):
+                if not raw_title and match.group(1):
+                    continue
+                ch = self._decode(match.start())
+                if ch is not None and ch["group-title"] == title:
+                    decoded.append(ch)
+        self._prepend(group, decoded)
+        return decoded
+
+    def materialize_all(self):
+        """
+        Decode every pending group with one sequential parse of the file.
+        Returns [(group, channels)] for the groups that were pending.
+        """
+        if not self._pending:
+            return []
+        tree = parse_m3u_to_dict(self.file_path)
+        result = []
+        for group, title, _ in self._pending.values():
+            ref = tree
+            for part in (title.split("/") if title else ()):
+                ref = ref.get(part, {})
+            result.append((group, ref.get("_channels", [])))
+        self._pending.clear()
+        for group, channels in result:
+            self._prepend(group, channels)
+        self.close()
+        return result
+
+    def _prepend(self, group, channels):
+        # Channels added while the group was pending stay after the decoded ones
+        group.setdefault("_channels", [])[:0] = channels
+        if not self._pending:
+            self.close()
+
+    def _decode(self, offset):
+        """Channel record of the #EXTINF line at offset, None if it has no url."""
+        mm = self._mm
+        size = len(mm)
+        line_end = mm.find(b"\n", offset)
+        if line_end < 0:
+            line_end = size
+        # utf-8-sig: the first line of the file may start with a BOM
+        channel = parse_extinf(mm[offset:line_end].decode("utf-8-sig", "replace").strip(), self.store)
+        pos = line_end + 1
+        while pos < size:
+            line_end = mm.find(b"\n", pos)
+            if line_end < 0:
+                line_end = size
+            line = mm[pos:line_end].strip()
+            pos = line_end + 1
+            if not line:
+                continue
+            if line.startswith(b"#"):
+                if line.startswith(b"#EXTINF:"):
+                    return None
+                continue
+            channel["url"] = line.decode("utf-8", "replace")
+            return channel
+        return None
+
+    def close(self):
+        """Release the mapping (the file can then be replaced, e.g. on Windows)."""
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._file = None
@@ -0,0 +1,266 @@
+﻿# app/m3u_parser.py
+# -*- coding: utf-8 -*-
+"""
+Streaming M3U parser.
+
+The playlist is read once from a buffered binary reader and the group tree is
+built while reading, so peak memory is the tree itself and not the raw text.
+Only the first bytes of a file are inspected to tell JSON from M3U.
+"""
+import gzip
+import os
+import re
+import struct
+from sys import intern
+from concurrent.futures import ProcessPoolExecutor
+from app.channel_store import ChannelStore
+
+READ_BUFFER_SIZE = 1024 * 1024          # buffered reader size
+PROGRESS_STEP = 4 * 1024 * 1024         # bytes between progress callbacks
+PEEK_SIZE = 64                          # bytes read to detect the format
+SCAN_BLOCK_SIZE = 64 * 1024             # block size when looking for chunk boundaries
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024    # smaller files are always parsed sequentially
+
+UTF8_BOM = b"\xef\xbb\xbf"
+GZIP_MAGIC = b"\x1f\x8b"
+
+FORMAT_JSON = "json"
+FORMAT_M3U = "m3u"
+
+# Attribute token (key="value") or the ",title" that ends the #EXTINF header.
+EXTINF_TOKEN_RE = re.compile(r'([\w-]+)="([^"]*)"|,([^\r\n]*)')
+EXTINF_PREFIX_LEN = len("#EXTINF:")
+
+
+class LoadCancelled(Exception):
+    """Raised by a progress callback to stop parsing (see app.file_loader)."""
+
+
+# -----------------------
+# Format detection
+# -----------------------
+def detect_format(file_path):
+    """
+    Return FORMAT_JSON or FORMAT_M3U looking only at the first non blank bytes
+    (of the decompressed stream for gzip files).
+    """
+    with open_m3u_binary(file_path) as f:
+        head = f.read(PEEK_SIZE).lstrip()
+        while not head:
+            chunk = f.read(PEEK_SIZE)
+            if not chunk:
+                break
+            head = chunk.lstrip()
+    return FORMAT_JSON if head.startswith(b"{") else FORMAT_M3U
+
+
+def is_gzip_file(file_path):
+    with open(file_path, "rb") as f:
+        return f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def content_size(file_path):
+    """Size of the playlist text: the gzip trailer size for .gz files (mod 4 GB)."""
+    size = os.path.getsize(file_path)
+    if size >= 18 and is_gzip_file(file_path):
+        with open(file_path, "rb") as f:
+            f.seek(-4, os.SEEK_END)
+            return struct.unpack("<I", f.read(4))[0]
+    return size
+
+
+def open_m3u_binary(file_path):
+    """
+    Open file_path as a buffered binary reader positioned after the BOM, if
+    any. Gzip-compressed files are decompressed on the fly.
+    """
+    if is_gzip_file(file_path):
+        f = gzip.open(file_path, "rb")
+    else:
+        f = open(file_path, "rb", buffering=READ_BUFFER_SIZE)
+    if f.read(len(UTF8_BOM)) != UTF8_BOM:
+        f.seek(0)
+    return f
+
+
+# -----------------------
+# Parsing
+# -----------------------
+def parse_m3u_to_dict(file_path, progress_callback=None, workers=0, tree=None):
+    """
+    Parse an M3U file into the group tree used by the editor.
+    progress_callback(read_bytes, total_bytes) is called while reading; it
+    may raise LoadCancelled to stop. The tree is built in tree (a new dict
+    by default), so the caller can look at the groups parsed so far from
+    the callback.
+    With workers > 1 large files are parsed in chunks by a process pool; the
+    resulting tree is identical to the sequential one.
+    """
+    total_size = content_size(file_path)
+    if workers and workers > 1 and total_size >= PARALLEL_MIN_SIZE and not is_gzip_file(file_path):
+        return parse_m3u_parallel(file_path, workers, progress_callback, tree)
+    with open_m3u_binary(file_path) as f:
+        return parse_m3u_stream(f, total_size, progress_callback, tree=tree)
+
+
+def parse_m3u_stream(stream, total_size=0, progress_callback=None, store=None, tree=None):
+    """
+    Build the group tree from a binary line iterator in a single pass.
+    Channel records are built by store (a new ChannelStore by default).
+    """
+    store = store or ChannelStore()
+    tree = tree if tree is not None else {}
+    groups = {}                 # group-title -> _channels list of that group
+    current_channel = None
+    read_bytes = 0
+    next_report = PROGRESS_STEP
+
+    for raw in stream:
+        read_bytes += len(raw)
+        if progress_callback and read_bytes >= next_report:
+            progress_callback(read_bytes, total_size)
+            next_report = read_bytes + PROGRESS_STEP
+
+        line = raw.decode("utf-8", "replace").strip()
+        if not line:
+            continue
+
+        if line.startswith("#EXTINF:"):
+            current_channel = parse_extinf(line, store)
+        elif current_channel is not None and not line.startswith("#"):
+            current_channel["url"] = line
+            group_title = current_channel["group-title"]
+            channels = groups.get(group_title)
+            if channels is None:
+                channels = _group_channels(tree, group_title)
+                groups[group_title] = channels
+            channels.append(current_channel)
+            current_channel = None
+
+    if progress_callback:
+        progress_callback(read_bytes, total_size)
+    return tree
+
+
+# -----------------------
+# Parallel parsing
+# -----------------------
+def parse_m3u_parallel(file_path, workers, progress_callback=None, tree=None):
+    """
+    Split the file at #EXTINF boundaries and parse the byte ranges in a
+    ProcessPoolExecutor. Partial trees are merged in file order.
+    """
+    total_size = os.path.getsize(file_path)
+    ranges = split_m3u_ranges(file_path, workers)
+    tree = tree if tree is not None else {}
+    done_bytes = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_m3u_range, file_path, start, end) for start, end in ranges]
+        try:
+            for (start, end), future in zip(ranges, futures):
+                merge_group_trees(tree, future.result())
+                done_bytes += end - start
+                if progress_callback:
+                    progress_callback(done_bytes, total_size)
+        except LoadCancelled:
+            pool.shutdown(cancel_futures=True)
+            raise
+    return tree
+
+
+def split_m3u_ranges(file_path, parts):
+    """
+    Return [(start, end), ...] byte ranges covering the file. Every range but
+    the first starts at the beginning of an #EXTINF line.
+    """
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, "rb") as f:
+        for i in range(1, parts):
+            pos = _next_extinf_offset(f, max(size * i // parts, bounds[-1]))
+            if pos is None:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _next_extinf_offset(f, pos):
+    """Offset of the first #EXTINF line starting after pos, or None."""
+    marker = b"\n#EXTINF"
+    f.seek(pos)
+    tail = b""
+    block_start = pos
+    while True:
+        block = f.read(SCAN_BLOCK_SIZE)
+        if not block:
+            return None
+        data = tail + block
+        idx = data.find(marker)
+        if idx >= 0:
+            return block_start - len(tail) + idx + 1
+        tail = data[-(len(marker) - 1):]
+        block_start += len(block)
+
+
+def _parse_m3u_range(file_path, start, end):
+    """Process pool worker: parse the byte range [start, end) of file_path."""
+    with open_m3u_binary(file_path) as f:
+        if start:
+            f.seek(start)
+        return parse_m3u_stream(_iter_range_lines(f, end - f.tell()))
+
+
+def _iter_range_lines(f, length):
+    for raw in f:
+        if length <= 0:
+            break
+        length -= len(raw)
+        yield raw
+
+
+def merge_group_trees(target, part):
+    """Append the groups and channels of part to target, keeping first-seen order."""
+    for key, value in part.items():
+        if key == "_channels":
+            target.setdefault("_channels", []).extend(value)
+        elif key in target:
+            merge_group_trees(target[key], value)
+        else:
+            target[key] = value
+
+
+def _group_channels(tree, group_title):
+    """Return the _channels list for group_title, creating the groups on the way."""
+    if group_title == "":
+        return tree.setdefault("_channels", [])
+    ref = tree
+    for part in group_title.split("/"):
+        if part not in ref:
+            ref[part] = {"_channels": []}
+        ref = ref[part]
+    return ref["_channels"]
+
+
+def parse_extinf(line, store):
+    """
+    Tokenize an #EXTINF line into a compact channel record with a single regex
+    scan. Every non empty attribute is kept, known or not, in the order it
+    appears in the line.
+    """
+    channel = {"name": "", "url": "", "group-title": ""}
+    intern_value = store.intern_value
+    title = None
+    for key, value, rest in EXTINF_TOKEN_RE.findall(line, EXTINF_PREFIX_LEN):
+        if key:
+            if value:
+                key = intern(key)
+                channel[key] = intern_value(key, value)
+        else:
+            title = rest
+    if title is not None:
+        channel["name"] = title.strip()
+    else:
+        channel["name"] = channel.get("tvg-id") or "Unknown"
+    return channel
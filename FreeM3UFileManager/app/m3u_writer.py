@@ -0,0 +1,192 @@
+﻿# app/m3u_writer.py
+# -*- coding: utf-8 -*-
+"""
+Buffered M3U writer.
+
+Channels are rendered in batches into a reused list buffer and written as
+large blocks to a temp file that atomically replaces the target. The same
+renderer is exposed as generators (text or bytes, optionally
+gzip-compressed) so an export can be piped anywhere.
+
+The group-title written for a channel is derived from the group it sits in
+("/".join of the keys from the root), not read from the channel dict, so
+renaming or moving a group never has to rewrite its descendants.
+"""
+import gzip
+import zlib
+from operator import itemgetter
+from sys import intern
+from app.atomic_file import atomic_write
+
+WRITE_BATCH_SIZE = 4096                 # channels rendered per block
+WRITE_BUFFER_SIZE = 1024 * 1024         # file buffer size
+GZIP_LEVEL = 6
+MAX_LAYOUTS = 1024                      # cached channel key layouts
+
+M3U_HEADER = "#EXTM3U\n"
+
+# Keys of a channel dict that are not #EXTINF attributes
+NON_ATTRIBUTE_KEYS = frozenset({"name", "url", "group-title", "item_type", "logo_valid"})
+
+
+# -----------------------
+# Rendering
+# -----------------------
+def iter_channels(ref):
+    """Yield the channels of a group tree (or channel list) in file order."""
+    stack = [iter((ref,))]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, list):
+            yield from node
+        elif isinstance(node, dict):
+            stack.append(iter(node.values()))
+
+
+def iter_group_channels(ref):
+    """
+    Yield (group_title, channels) for every channel list of a group tree in
+    file order; group_title is derived from the path and interned. For a
+    bare channel list group_title is None (each channel keeps its own).
+    """
+    if isinstance(ref, list):
+        yield None, ref
+        return
+    stack = [((), iter(ref.items()))]
+    while stack:
+        path, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        key, node = entry
+        if isinstance(node, list):
+            yield intern("/".join(path)), node
+        elif isinstance(node, dict):
+            stack.append((path + (key,), iter(node.items())))
+
+
+def channel_to_extinf(ch, group_title=None):
+    """#EXTINF line of ch; group_title overrides the one stored in ch."""
+    attrs = [f' {key}="{val}"' for key, val in ch.items()
+             if val and key not in NON_ATTRIBUTE_KEYS and key[:1] != "_"]
+    if group_title is None:
+        group_title = ch.get("group-title")
+    if group_title:
+        attrs.append(f' group-title="{group_title}"')
+    return f'#EXTINF:-1{"".join(attrs)},{ch.get("name", "")}'
+
+
+_layouts = {}
+
+def _channel_layout(keys):
+    """
+    Attribute format prefix and value getter shared by every channel whose
+    dict has exactly these keys, in this order. None if the keys lack name
+    or url.
+    """
+    layout = _layouts.get(keys)
+    if layout is None:
+        if "name" not in keys or "url" not in keys:
+            return None
+        attrs = [k for k in keys if k not in NON_ATTRIBUTE_KEYS and k[:1] != "_"]
+        prefix = "#EXTINF:-1" + "".join(f' {k.replace("%", "%%")}="%s"' for k in attrs)
+        layout = (prefix, itemgetter(*attrs, "name", "url"), len(attrs))
+        if len(_layouts) < MAX_LAYOUTS:
+            _layouts[keys] = layout
+    return layout
+
+
+def _title_suffix(group_title):
+    """End of the format string of a layout for channels of group_title."""
+    if group_title:
+        return f' group-title="{group_title.replace("%", "%%")}",%s\n%s\n'
+    return ",%s\n%s\n"
+
+
+def render_channel(ch, group_title=None):
+    """Return the #EXTINF and url lines of a channel (see channel_to_extinf)."""
+    if group_title is None:
+        group_title = ch.get("group-title", "")
+    layout = _channel_layout(tuple(ch))
+    if layout is not None:
+        prefix, get_values, attr_count = layout
+        values = get_values(ch)
+        if all(values[:attr_count]):
+            return (prefix + _title_suffix(group_title)) % values
+    return f'{channel_to_extinf(ch, group_title)}\n{ch.get("url", "")}\n'
+
+
+def iter_m3u_chunks(data, batch_size=WRITE_BATCH_SIZE, header=True):
+    """Yield the M3U text of data in blocks of batch_size channels."""
+    buf = [M3U_HEADER] if header else []
+    append = buf.append
+    pending = 0
+    for group_title, channels in iter_group_channels(data):
+        formats = {}            # layout -> full format string for this group
+        for ch in channels:
+            if not isinstance(ch, dict):
+                continue
+            title = group_title if group_title is not None else ch.get("group-title", "")
+            layout = _channel_layout(tuple(ch))
+            if layout is not None and group_title is not None:
+                values = layout[1](ch)
+                if all(values[:layout[2]]):
+                    fmt = formats.get(layout)
+                    if fmt is None:
+                        fmt = formats[layout] = layout[0] + _title_suffix(title)
+                    append(fmt % values)
+                else:
+                    append(f'{channel_to_extinf(ch, title)}\n{ch.get("url", "")}\n')
+            else:
+                append(render_channel(ch, title))
+            pending += 1
+            if pending >= batch_size:
+                yield "".join(buf)
+                buf.clear()
+                pending = 0
+    if buf:
+        yield "".join(buf)
+
+
+def iter_m3u_bytes(data, compress=False, batch_size=WRITE_BATCH_SIZE):
+    """Yield the UTF-8 encoded export of data, gzip-compressed if compress is True."""
+    if not compress:
+        for chunk in iter_m3u_chunks(data, batch_size):
+            yield chunk.encode("utf-8")
+        return
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # 31 = gzip container
+    for chunk in iter_m3u_chunks(data, batch_size):
+        block = compressor.compress(chunk.encode("utf-8"))
+        if block:
+            yield block
+    yield compressor.flush()
+
+
+# -----------------------
+# Files
+# -----------------------
+def is_gzip_path(path):
+    return str(path).lower().endswith(".gz")
+
+
+def write_m3u_stream(data, f, header=True):
+    """Write data to an open text file in large blocks."""
+    for chunk in iter_m3u_chunks(data, header=header):
+        f.write(chunk)
+
+
+def write_m3u_file(data, path, backups=0):
+    """
+    Export data to path atomically; a .gz suffix writes a gzip-compressed
+    playlist. See atomic_write for backups.
+    """
+    if is_gzip_path(path):
+        with atomic_write(path, "wb", backups=backups) as raw:
+            with gzip.open(raw, "wt", encoding="utf-8", compresslevel=GZIP_LEVEL) as f:
+                write_m3u_stream(data, f)
+    else:
+        with atomic_write(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE, backups=backups) as f:
+            write_m3u_stream(data, f)
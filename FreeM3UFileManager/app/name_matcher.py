@@ -0,0 +1,146 @@
+﻿# app/name_matcher.py
+# -*- coding: utf-8 -*-
+"""
+Fuzzy matching of channel names against candidate names (EPG display-names).
+
+Names are normalized first: casefolded, accents and punctuation removed,
+bracketed notes and quality / timeshift tags (HD, FHD, 4K, +1...) dropped.
+NameMatcher cuts every candidate name in character n-grams of the padded
+name and keeps an inverted index n-gram -> candidate numbers. match()
+counts the n-grams shared with every candidate in one Counter.update over
+the postings (a C loop), skipping the n-grams found in too many names, and
+scores the best counts exactly with the Dice coefficient of the n-gram
+sets: 2 |A & B| / (|A| + |B|). A name equal to a candidate after
+normalization scores 1.0 without counting. match_many() normalizes a batch
+and matches each distinct normalized name once.
+
+The timeshift tag is dropped from the n-grams but compared on its own:
+"Antena 3 +1" and "Antena 3" are different channels, so a match between
+names with different tags scores at most TIMESHIFT_MAX_SCORE and is never
+an exact match.
+"""
+import heapq
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+NGRAM_SIZE = 3
+CANDIDATES = 20             # best n-gram counts scored exactly
+COMMON_NGRAM_RATIO = 0.05   # n-grams in more names than this are not used to find candidates
+MIN_COMMON_NGRAM = 50
+TIMESHIFT_MAX_SCORE = 0.5   # names with different timeshift tags: below the auto-accept scores
+
+# Tags that do not tell channels apart
+QUALITY_TAGS = frozenset({"hd", "fhd", "uhd", "sd", "hq", "lq", "4k", "8k", "1080p", "1080i", "720p",
+                          "576p", "480p", "hevc", "h264", "h265", "backup", "alt"})
+BRACKETS_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]|\{[^}]*\}")
+TIMESHIFT_RE = re.compile(r"\+\d{1,2}h?\b")
+WORD_RE = re.compile(r"[^\W_]+")
+
+# score: 0..1; entry: the candidate; name: which of its names matched
+Match = namedtuple("Match", "score entry name")
+
+
+def normalize_name(name):
+    """Comparable form of a channel name: "Canal+ Acción HD (ES)" -> "canal accion"."""
+    text = BRACKETS_RE.sub(" ", name.casefold())
+    text = TIMESHIFT_RE.sub(" ", text)
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    words = [w for w in WORD_RE.findall(text) if w not in QUALITY_TAGS]
+    return " ".join(words)
+
+
+def timeshift(name):
+    """Timeshift tag of a channel name: "Antena 3 +1h" -> "+1", "" if none."""
+    return " ".join(tag.rstrip("h") for tag in TIMESHIFT_RE.findall(name.casefold()))
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """Set of the character n-grams of text padded with one space on each side."""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def epg_names(entry):
+    """Names of an EPG channel record (see app.xmltv): its display-names and id."""
+    return (entry.get("display-names") or [entry.get("tvg-name") or ""]) + [entry.get("tvg-id") or ""]
+
+
+class NameMatcher:
+    def __init__(self, entries, names=epg_names, n=NGRAM_SIZE):
+        """
+        entries: the candidates; names(entry) returns the names each one can
+        be matched by (e.g. every display-name of an EPG channel).
+        """
+        self.entries = entries
+        self.n = n
+        self._keys = []             # candidate number -> (entry, name, n-gram set, timeshift)
+        self._exact = {}            # (normalized name, timeshift) -> candidate number
+        postings = {}
+        for entry in entries:
+            for name in names(entry):
+                key = normalize_name(name) if name else ""
+                shift = timeshift(name) if key else ""
+                if not key or (key, shift) in self._exact and self._keys[self._exact[key, shift]][0] is entry:
+                    continue
+                number = len(self._keys)
+                grams = ngrams(key, n)
+                self._keys.append((entry, name, grams, shift))
+                self._exact.setdefault((key, shift), number)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(number)
+        limit = max(MIN_COMMON_NGRAM, int(len(self._keys) * COMMON_NGRAM_RATIO))
+        self._postings = postings
+        self._common = {gram for gram, numbers in postings.items() if len(numbers) > limit}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def match(self, name, limit=3, min_score=0.0):
+        """Best candidates for name as Match tuples, best first."""
+        return self._match_key(normalize_name(name), timeshift(name), limit, min_score)
+
+    def match_many(self, names, min_score=0.0):
+        """Best Match (or None) for every name, in order."""
+        best = {}
+        results = []
+        for name in names:
+            key = normalize_name(name), timeshift(name)
+            if key not in best:
+                found = self._match_key(*key, 1, min_score)
+                best[key] = found[0] if found else None
+            results.append(best[key])
+        return results
+
+    def _match_key(self, key, shift, limit, min_score):
+        if not key:
+            return []
+        number = self._exact.get((key, shift))
+        if number is not None and limit == 1:
+            entry, matched, _, _ = self._keys[number]
+            return [Match(1.0, entry, matched)]
+
+        grams = ngrams(key, self.n)
+        postings = self._postings
+        usable = [gram for gram in grams if gram in postings and gram not in self._common]
+        if not usable:
+            # Only frequent n-grams (very short or generic names)
+            usable = [gram for gram in grams if gram in postings]
+        counts = Counter()
+        for gram in usable:
+            counts.update(postings[gram])
+
+        keys = self._keys
+        size = len(grams)
+        scored = {}
+        for number, _ in counts.most_common(max(CANDIDATES, limit)):
+            entry, matched, other, other_shift = keys[number]
+            score = 2 * len(grams & other) / (size + len(other))
+            if other_shift != shift:
+                score = min(score, TIMESHIFT_MAX_SCORE)
+            if score >= min_score and (id(entry) not in scored or scored[id(entry)].score < score):
+                scored[id(entry)] = Match(score, entry, matched)
+        return heapq.nlargest(limit, scored.values(), key=lambda m: m.score)
@@ -0,0 +1,183 @@
+﻿# app/node_index.py
+# -*- coding: utf-8 -*-
+"""
+Stable integer IDs for the nodes of the playlist tree.
+
+Every group dict and channel dict gets an int ID that does not change while
+the node stays in the tree (moves and renames included), with O(1) lookups
+id -> node, node -> id and id -> parent group.
+
+Groups are indexed when the tree is loaded. The channels of a group are
+indexed the first time the group is used (load_channels), so a playlist with
+a million channels only pays for the levels that are actually opened.
+"""
+
+CHANNELS_KEY = "_channels"
+
+
+class NodeIndex:
+    def __init__(self, root=None):
+        self.clear()
+        if root is not None:
+            self.build(root)
+
+    def clear(self):
+        self._ids = {}          # id(node) -> ID
+        self._nodes = {}        # ID -> node
+        self._parents = {}      # ID -> parent group dict (None for the root)
+        self._loaded = set()    # IDs of the groups whose channels are indexed
+        self._groups = set()    # IDs of the group nodes
+        self._next_id = 1
+
+    def build(self, root):
+        """Index root and all its groups."""
+        self.clear()
+        self._groups.add(self._add(root, None))
+        self.add_group(None, root, include_root=False)
+
+    # -----------------------
+    # Lookups
+    # -----------------------
+    def id_of(self, node):
+        return self._ids.get(id(node))
+
+    def node(self, node_id):
+        return self._nodes.get(node_id)
+
+    def parent(self, node_id):
+        return self._parents.get(node_id)
+
+    def is_group(self, node_id):
+        return node_id in self._groups
+
+    def parent_of(self, node):
+        return self._parents.get(self._ids.get(id(node)))
+
+    def path_of(self, group):
+        """Keys from the root down to group, or None if group is not indexed."""
+        node_id = self._ids.get(id(group))
+        if node_id is None:
+            return None
+        path = []
+        parent = self._parents[node_id]
+        while parent is not None:
+            key = next((k for k, v in parent.items() if v is group), None)
+            if key is None:
+                return None
+            path.append(key)
+            group = parent
+            parent = self._parents[self._ids[id(group)]]
+        path.reverse()
+        return path
+
+    def __contains__(self, node):
+        return id(node) in self._ids
+
+    def __len__(self):
+        return len(self._nodes)
+
+    # -----------------------
+    # Maintenance
+    # -----------------------
+    def _add(self, node, parent):
+        node_id = self._ids.get(id(node))
+        if node_id is None:
+            node_id = self._next_id
+            self._next_id += 1
+            self._ids[id(node)] = node_id
+            self._nodes[node_id] = node
+        self._parents[node_id] = parent
+        return node_id
+
+    def _drop(self, node):
+        node_id = self._ids.pop(id(node), None)
+        if node_id is not None:
+            del self._nodes[node_id]
+            del self._parents[node_id]
+            self._loaded.discard(node_id)
+            self._groups.discard(node_id)
+
+    def add_group(self, parent, group, include_root=True):
+        """Index group (under parent) and its subgroups; channels stay lazy."""
+        if include_root:
+            self._groups.add(self._add(group, parent))
+        stack = [group]
+        while stack:
+            ref = stack.pop()
+            if not isinstance(ref, dict):
+                continue
+            for key, child in ref.items():
+                if key != CHANNELS_KEY and isinstance(child, dict):
+                    self._groups.add(self._add(child, ref))
+                    stack.append(child)
+            if self._ids[id(ref)] in self._loaded:
+                self._add_channel_list(ref)
+
+    def load_channels(self, group):
+        """Make sure the channels of group (and group itself) are indexed."""
+        group_id = self._ids.get(id(group))
+        if group_id is None:
+            return
+        if group_id not in self._loaded:
+            self._loaded.add(group_id)
+            self._add_channel_list(group)
+
+    def sync_level(self, group):
+        """
+        Index the subgroups and channels of group again, picking up nodes
+        added to the tree without going through the model (plugins).
+        """
+        group_id = self._ids.get(id(group))
+        if group_id is None or not isinstance(group, dict):
+            return
+        self._loaded.add(group_id)
+        for key, child in group.items():
+            if key == CHANNELS_KEY or not isinstance(child, dict):
+                continue
+            if id(child) in self._ids:
+                self._parents[self._ids[id(child)]] = group
+            else:
+                self.add_group(group, child)
+        self._add_channel_list(group)
+
+    def _add_channel_list(self, group):
+        channels = group.get(CHANNELS_KEY, ()) if isinstance(group, dict) else group
+        for ch in channels:
+            self._add(ch, group)
+
+    def set_parent(self, node, parent):
+        """Record that node (already indexed) now lives in parent. Returns its ID."""
+        node_id = self._ids.get(id(node))
+        if node_id is not None:
+            self._parents[node_id] = parent
+        return node_id
+
+    def add_channels(self, parent, channels):
+        """Index channels inserted in parent (if parent's channels are indexed)."""
+        parent_id = self._ids.get(id(parent))
+        if parent_id in self._loaded:
+            for ch in channels:
+                self._add(ch, parent)
+        else:
+            # Keep the IDs of channels moved to a group not indexed yet
+            for ch in channels:
+                node_id = self._ids.get(id(ch))
+                if node_id is not None:
+                    self._parents[node_id] = parent
+
+    def remove_channels(self, channels):
+        for ch in channels:
+            self._drop(ch)
+
+    def remove_group(self, group):
+        """Forget group, its subgroups and their channels."""
+        stack = [group]
+        while stack:
+            ref = stack.pop()
+            if isinstance(ref, dict):
+                for key, child in ref.items():
+                    if key == CHANNELS_KEY:
+                        self.remove_channels(child)
+                    else:
+                        stack.append(child)
+            self._drop(ref)
@@ -0,0 +1,104 @@
+﻿# app/playlist_cache.py
+# -*- coding: utf-8 -*-
+"""
+Parsed-tree cache for reopening large playlists.
+
+The tree of a loaded file is pickled (protocol 5) to
+get_cache_dir()/playlists/<sha1 of the path>.pickle. Pickle memoizes
+objects by identity, so the values pooled by ChannelStore and the
+interned keys are written once and stay shared after loading. A small
+header pickled first (format version, path, size, mtime_ns) is checked
+before the tree is read: a file that changed on disk is parsed again.
+
+The directory is bounded in bytes; reading an entry touches its mtime and
+the least recently used entries are deleted first.
+"""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from app.atomic_file import atomic_write
+from app.paths_module import get_cache_dir, ensure_dir
+
+CACHE_FORMAT = 1                        # bump when the tree layout changes
+CACHE_SUFFIX = ".pickle"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+IO_BUFFER_SIZE = 1024 * 1024
+
+
+def playlist_cache_dir():
+    return get_cache_dir() / "playlists"
+
+
+def cache_entry_path(file_path, cache_dir=None):
+    cache_dir = cache_dir or playlist_cache_dir()
+    digest = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest + CACHE_SUFFIX)
+
+
+def _header(file_path):
+    st = os.stat(file_path)
+    return (CACHE_FORMAT, os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+
+
+def load_cached(file_path, cache_dir=None):
+    """Return the cached tree of file_path, or None if missing or stale."""
+    entry = cache_entry_path(file_path, cache_dir)
+    try:
+        with open(entry, "rb", buffering=IO_BUFFER_SIZE) as f:
+            if pickle.load(f) != _header(file_path):
+                return None
+            tree = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Truncated or unreadable entry
+        _unlink(entry)
+        return None
+    try:
+        os.utime(entry)     # most recently used
+    except OSError:
+        pass
+    return tree
+
+
+def store_cached(file_path, tree, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Write the tree of file_path to the cache and evict old entries."""
+    cache_dir = ensure_dir(Path(cache_dir) if cache_dir else playlist_cache_dir())
+    entry = cache_entry_path(file_path, cache_dir)
+    with atomic_write(entry, "wb", buffering=IO_BUFFER_SIZE) as f:
+        pickle.dump(_header(file_path), f, protocol=5)
+        pickle.dump(tree, f, protocol=5)
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Delete the least recently used entries until the cache fits in max_bytes."""
+    cache_dir = cache_dir or playlist_cache_dir()
+    entries = []
+    try:
+        with os.scandir(cache_dir) as it:
+            for e in it:
+                if e.name.endswith(CACHE_SUFFIX) and e.is_file():
+                    st = e.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+    except FileNotFoundError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _unlink(path)
+        total -= size
+
+
+def clear_cache(cache_dir=None):
+    evict(cache_dir, 0)
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
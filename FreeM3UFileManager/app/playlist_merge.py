@@ -0,0 +1,102 @@
+﻿# app/playlist_merge.py
+# -*- coding: utf-8 -*-
+"""
+Merge of an imported playlist into an existing group tree.
+
+Groups are matched by path and channels by key (url plus occurrence
+number, or tvg-id; see app.tree_diff.channel_keys) through one dict built
+over the target, so a merge is O(n + m). A matched channel keeps its place
+(even if the user moved it to another group) and gets the non empty fields
+of the imported one; unmatched channels are appended to the group with
+the same path, created if needed. With drop_missing, target channels that
+are not in the import are removed.
+
+plan_merge only computes the changes; PlaylistModel.merge applies them as
+one undoable step and apply_merge applies them to a bare tree.
+"""
+from collections import namedtuple
+
+from app.tree_diff import channel_keys, changed_fields, iter_tree, CHANNELS_KEY
+
+MergeSummary = namedtuple(
+    "MergeSummary", "groups_added channels_added channels_updated channels_removed channels_unchanged")
+
+# updates:   [(channel, {field: new value})]
+# additions: {path: [channels]}, path relative to the target; groups that do
+#            not exist yet are listed parents first and must be created
+# removals:  [(group, [channels])]
+MergePlan = namedtuple("MergePlan", "updates additions removals summary")
+
+
+def plan_merge(target, incoming, key_field=None, drop_missing=False):
+    """Compute the MergePlan of incoming into target without changing either."""
+    existing = {key: (group, ch) for key, _, group, ch in channel_keys(target, key_field)}
+    existing_groups = {path for path, _, _ in iter_tree(target)}
+
+    additions = {path: [] for path, _, _ in iter_tree(incoming) if path not in existing_groups}
+    groups_added = len(additions)
+
+    updates = []
+    added = unchanged = 0
+    pop = existing.pop
+    for key, path, _, ch in channel_keys(incoming, key_field):
+        match = pop(key, None)
+        if match is None:
+            additions.setdefault(path, []).append(ch)
+            added += 1
+            continue
+        current = match[1]
+        fields = {k: ch[k] for k in changed_fields(current, ch) if ch.get(k)}
+        if fields:
+            updates.append((current, fields))
+        else:
+            unchanged += 1
+
+    removals = []
+    if drop_missing and existing:
+        by_group = {}
+        for group, ch in existing.values():
+            entry = by_group.get(id(group))
+            if entry is None:
+                entry = by_group[id(group)] = (group, [])
+                removals.append(entry)
+            entry[1].append(ch)
+
+    summary = MergeSummary(groups_added, added, len(updates),
+                           sum(len(chs) for _, chs in removals), unchanged)
+    return MergePlan(updates, additions, removals, summary)
+
+
+def ensure_group(target, path, created=None):
+    """
+    Return the group at path under target, creating the missing ones.
+    Created groups are appended to created as (parent, key, group).
+    """
+    ref = target
+    for key in path:
+        child = ref.get(key)
+        if not isinstance(child, dict):
+            child = ref[key] = {CHANNELS_KEY: []}
+            if created is not None:
+                created.append((ref, key, child))
+        ref = child
+    return ref
+
+
+def apply_merge(target, plan):
+    """Apply plan to the tree target directly (no model, no undo)."""
+    for ch, fields in plan.updates:
+        ch.update(fields)
+    for group, channels in plan.removals:
+        removed = {id(ch) for ch in channels}
+        group[CHANNELS_KEY][:] = [ch for ch in group[CHANNELS_KEY] if id(ch) not in removed]
+    for path, channels in plan.additions.items():
+        group = ensure_group(target, path)
+        if channels:
+            group.setdefault(CHANNELS_KEY, []).extend(channels)
+    return plan.summary
+
+
+def merge_trees(target, incoming, key_field=None, drop_missing=False):
+    """Merge incoming into target in place. Returns a MergeSummary."""
+    return apply_merge(target, plan_merge(target, incoming, key_field, drop_missing))
@@ -0,0 +1,714 @@
+﻿# app/playlist_model.py
+# -*- coding: utf-8 -*-
+"""
+Change notifications for the playlist tree.
+
+The tree stays the plain dict structure used everywhere (group name -> dict,
+"_channels" -> list of channel dicts). The group-title of a channel is its
+position in that tree: group_title_of derives it (the writers do the same),
+so the "group-title" stored in a channel dict may be stale after a rename or
+a move and is only refreshed when the tree is exported as JSON.
+
+Editor operations mutate the tree through PlaylistModel, which applies the
+change and then notifies its listeners with one ChangeEvent, so the list
+view can patch the rows involved instead of rebuilding the whole level.
+
+Event types:
+    INSERTED  channels were inserted in parent["_channels"] at index and/or
+              groups (keys) were appended to parent
+    REMOVED   channels and/or groups (keys, and the group dicts in groups) were
+              removed from parent; parent is None when they came from
+              several groups (remove_nodes)
+    UPDATED   fields of channels changed and/or groups were renamed
+              (renamed: [(old_key, new_key), ...])
+    MOVED     the order of the channels or groups of parent changed
+    CHANGED   the channels and/or groups of parent changed in several places
+              at once (undo/redo)
+    RESET     anything else: the tree was replaced or changed outside the model
+"""
+from collections import namedtuple
+from sys import intern
+from app.node_index import NodeIndex
+from app.undo_journal import UndoJournal
+from app.playlist_merge import plan_merge, ensure_group
+
+CHANNELS_KEY = "_channels"
+
+INSERTED = "inserted"
+REMOVED = "removed"
+UPDATED = "updated"
+MOVED = "moved"
+CHANGED = "changed"
+RESET = "reset"
+
+ChangeEvent = namedtuple("ChangeEvent", "type parent channels keys index renamed groups")
+
+
+def channels_of(parent, create=False):
+    """The channel list of a group dict (or the list itself)."""
+    if isinstance(parent, list):
+        return parent
+    if create:
+        return parent.setdefault(CHANNELS_KEY, [])
+    return parent.get(CHANNELS_KEY, [])
+
+
+def group_keys(parent):
+    if not isinstance(parent, dict):
+        return []
+    return [k for k in parent if k != CHANNELS_KEY]
+
+
+def unique_group_name(parent_dict, desired_name):
+    """
+    Ensure that the group name is unique in parent_dict.
+    """
+    if desired_name not in parent_dict:
+        return desired_name
+    i = 1
+    new_name = f"{desired_name} ({i})"
+    while new_name in parent_dict:
+        i += 1
+        new_name = f"{desired_name} ({i})"
+    return new_name
+
+
+def copy_channel(channel, group_title):
+    """New channel dict sharing the values of channel, placed in group_title."""
+    new = channel.copy()
+    new["group-title"] = group_title
+    return new
+
+
+def copy_group(group, path):
+    """
+    Copy a group subtree placed at path: new group dicts and channel dicts,
+    values shared with the original, group-title set while copying.
+    """
+    new_root = {}
+    stack = [(group, new_root, path)]
+    while stack:
+        src, dst, src_path = stack.pop()
+        for key, value in src.items():
+            if key == CHANNELS_KEY:
+                title = "/".join(src_path)
+                dst[key] = [copy_channel(ch, title) if isinstance(ch, dict) else ch for ch in value]
+            elif isinstance(value, dict):
+                dst[key] = {}
+                stack.append((value, dst[key], src_path + [key]))
+            else:
+                dst[key] = value
+    return new_root
+
+
+def merge_positions(current, positioned):
+    """
+    Put back items removed from a sequence: positioned is [(index, item)]
+    sorted by index (indexes in the sequence before the removal). Linear.
+    """
+    result = []
+    append = result.append
+    rest = iter(current)
+    for index, item in positioned:
+        while len(result) < index:
+            nxt = next(rest, _MISSING)
+            if nxt is _MISSING:
+                break
+            append(nxt)
+        append(item)
+    result.extend(rest)
+    return result
+
+
+def set_group_titles(group, path):
+    """Set the group-title of every channel below group (placed at path)."""
+    stack = [(group, path)]
+    while stack:
+        ref, ref_path = stack.pop()
+        title = "/".join(ref_path)
+        for key, value in ref.items():
+            if key == CHANNELS_KEY:
+                for ch in value:
+                    if isinstance(ch, dict):
+                        ch["group-title"] = title
+            elif isinstance(value, dict):
+                stack.append((value, ref_path + [key]))
+
+
+_MISSING = object()
+
+
+def _set_fields(channel, values):
+    """Write values into channel; _MISSING removes the field."""
+    for k, v in values.items():
+        if v is _MISSING:
+            channel.pop(k, None)
+        else:
+            channel[k] = v
+
+
+class PlaylistModel:
+    """
+    Applies editor mutations to the tree and notifies listeners.
+    self.index keeps the integer node IDs in sync with the changes and
+    self.journal records the inverse of every operation (undo/redo).
+    With a lazily loaded playlist (self.lazy, see app.lazy_playlist) the
+    channels of a group are decoded before anything reads or changes them.
+    """
+
+    def __init__(self, root=None, journal=None):
+        self.root = root if root is not None else {}
+        self.index = NodeIndex(self.root)
+        self.journal = journal or UndoJournal()
+        self.lazy = None
+        self._titles = {}       # id(group) -> interned group-title of its channels
+        self._listeners = []
+
+    # -----------------------
+    # Listeners
+    # -----------------------
+    def add_listener(self, callback):
+        """callback(event) is called after every change."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, type, parent=None, channels=(), keys=(), index=0, renamed=(), groups=()):
+        if type in (RESET, REMOVED, MOVED, CHANGED) or renamed or groups:
+            # Group paths may have changed
+            self._titles.clear()
+        event = ChangeEvent(type, parent, channels, keys, index, renamed, groups)
+        for callback in list(self._listeners):
+            callback(event)
+
+    def set_root(self, root, lazy=None):
+        self.root = root
+        self.lazy = lazy
+        self.index.build(root)
+        self.journal.clear()
+        self._notify(RESET)
+
+    # -----------------------
+    # Lazy loading
+    # -----------------------
+    def materialize(self, group):
+        """Decode the channels of group if they are still in the mapped file."""
+        if self.lazy is not None and self.lazy.is_pending(group):
+            self.index.add_channels(group, self.lazy.materialize(group))
+
+    def materialize_tree(self, group):
+        """Decode the channels of group and of all its subgroups."""
+        if self.lazy is None:
+            return
+        if group is self.root:
+            self.materialize_all()
+            return
+        stack = [group]
+        while stack:
+            ref = stack.pop()
+            self.materialize(ref)
+            stack.extend(v for k, v in ref.items() if k != CHANNELS_KEY and isinstance(v, dict))
+
+    def materialize_all(self):
+        """Decode every channel (before saving, running plugins...)."""
+        if self.lazy is None:
+            return
+        for group, channels in self.lazy.materialize_all():
+            self.index.add_channels(group, channels)
+        self.lazy = None
+
+    def get_node(self, node_id):
+        return self.index.node(node_id)
+
+    def parent_of(self, node):
+        return self.index.parent_of(node)
+
+    def group_title_of(self, node):
+        """
+        group-title of a channel (or of the channels of a group), derived
+        from its position in the tree. None if node is not in the tree.
+        """
+        node_id = self.index.id_of(node)
+        if node_id is None:
+            return None
+        group = node if self.index.is_group(node_id) else self.index.parent(node_id)
+        title = self._titles.get(id(group))
+        if title is None:
+            path = self.index.path_of(group)
+            if path is None:
+                return None
+            title = self._titles[id(group)] = intern("/".join(path))
+        return title
+
+    def reset(self):
+        """Tell listeners the tree was changed outside the model."""
+        self._notify(RESET)
+
+    # -----------------------
+    # Undo / redo
+    # -----------------------
+    def undo(self):
+        """Revert the last operation. Returns its label or None."""
+        return self.journal.undo()
+
+    def redo(self):
+        return self.journal.redo()
+
+    def _record(self, label, undo, redo, cost=1):
+        self.journal.record(label, undo, redo, cost)
+
+    def _record_insert(self, label, target, channels, groups, channel_index):
+        """Record the insertion of channels (at channel_index) and groups in target."""
+        if self.journal.replaying or not (channels or groups):
+            return
+        items = list(target.items()) if isinstance(target, dict) else []
+        group_ids = {id(g) for g in groups}
+        group_positions = [(i, k, v) for i, (k, v) in enumerate(items) if id(v) in group_ids]
+        channel_positions = [(channel_index + i, ch) for i, ch in enumerate(channels)]
+        records = [(target, channel_positions, group_positions)]
+        self._record(label,
+                     lambda: self._replay_remove(target, channels, groups),
+                     lambda: self._replay_restore(records),
+                     len(channels) + len(groups))
+
+    def _replay_remove(self, parent, channels=(), groups=(), forget=True):
+        removed = self._remove_from(parent, {id(ch) for ch in channels}, {id(g) for g in groups}, forget)
+        self._notify(REMOVED, parent, channels=removed[0], keys=removed[1], groups=removed[2])
+
+    def _replay_restore(self, records):
+        for parent, channel_positions, group_positions in records:
+            self._restore(parent, channel_positions, group_positions)
+            self._notify(CHANGED, parent)
+
+    def _replay_items(self, parent, items):
+        """Give parent exactly these (key, value) items, in this order."""
+        parent.clear()
+        parent.update(items)
+        for key, value in items:
+            if key != CHANNELS_KEY and isinstance(value, dict) and self.index.set_parent(value, parent) is None:
+                self.index.add_group(parent, value)
+        self._notify(CHANGED, parent)
+
+    def _restore(self, parent, channel_positions, group_positions):
+        """Put removed channels and groups back at their previous positions."""
+        if channel_positions:
+            target = channels_of(parent, create=True)
+            target[:] = merge_positions(target, channel_positions)
+            self.index.add_channels(parent, [ch for _, ch in channel_positions])
+        if group_positions:
+            positioned = []
+            for position, key, group in group_positions:
+                if key in parent:
+                    key = unique_group_name(parent, key)
+                positioned.append((position, (key, group)))
+            items = merge_positions(list(parent.items()), positioned)
+            parent.clear()
+            parent.update(items)
+            for _, _, group in group_positions:
+                if self.index.set_parent(group, parent) is None:
+                    self.index.add_group(parent, group)
+
+    # -----------------------
+    # Channels
+    # -----------------------
+    def insert_channels(self, parent, channels, index=None):
+        """Insert channels in parent at index (appended by default)."""
+        channels = list(channels)
+        if not channels:
+            return
+        self.materialize(parent)
+        target = channels_of(parent, create=True)
+        if index is None or index >= len(target):
+            index = len(target)
+            target.extend(channels)
+        else:
+            target[index:index] = channels
+        self.index.add_channels(parent, channels)
+        self._record_insert("Add channels", parent, channels, (), index)
+        self._notify(INSERTED, parent, channels=channels, index=index)
+
+    def remove_channels(self, parent, channels):
+        """Remove the given channel dicts (by identity) in one pass."""
+        return self.remove_items(parent, channels=channels)[0]
+
+    def update_channel(self, parent, channel, fields):
+        old = {k: channel.get(k, _MISSING) for k in fields}
+        new = dict(fields)
+
+        def apply(values):
+            _set_fields(channel, values)
+            self._notify(UPDATED, parent, channels=[channel])
+
+        apply(new)
+        self._record("Edit channel", lambda: apply(old), lambda: apply(new))
+
+    def update_channels(self, updates, label="Edit channels"):
+        """
+        Apply [(channel, {field: value})] (channels of any group) as one
+        undoable step, with one UPDATED event per parent group.
+        """
+        old = [(ch, {k: ch.get(k, _MISSING) for k in fields}) for ch, fields in updates]
+        new = [(ch, dict(fields)) for ch, fields in updates]
+
+        def apply(values):
+            by_parent = {}
+            for ch, fields in values:
+                _set_fields(ch, fields)
+                parent = self.index.parent_of(ch)
+                by_parent.setdefault(id(parent), (parent, []))[1].append(ch)
+            for parent, channels in by_parent.values():
+                self._notify(UPDATED, parent, channels=channels)
+
+        if updates:
+            apply(new)
+            self._record(label, lambda: apply(old), lambda: apply(new), len(updates))
+        return len(updates)
+
+    # -----------------------
+    # Groups
+    # -----------------------
+    def insert_group(self, parent, key, group=None):
+        """Append group (an empty group by default) to parent as key."""
+        if group is None:
+            group = {CHANNELS_KEY: []}
+        parent[key] = group
+        self.index.add_group(parent, group)
+        self._record_insert("Add group", parent, (), [group], 0)
+        self._notify(INSERTED, parent, keys=[key], groups=[group])
+        return group
+
+    def remove_groups(self, parent, keys):
+        return self.remove_items(parent, keys=keys)[1]
+
+    def rename_group(self, parent, old_key, new_key):
+        """
+        Rename a group keeping its position among its siblings. A name a
+        sibling already has gets a suffix (see unique_group_name) instead of
+        replacing that sibling. Returns the new key, None if nothing changed.
+        """
+        if old_key not in parent or old_key == new_key:
+            return None
+        if new_key == CHANNELS_KEY or new_key in parent:
+            new_key = unique_group_name(parent.keys() | {CHANNELS_KEY}, new_key)
+        before = list(parent.items())
+        items = [(new_key if k == old_key else k, v) for k, v in before]
+        parent.clear()
+        parent.update(items)
+        self._record("Rename group",
+                     lambda: self._replay_items(parent, before),
+                     lambda: self._replay_items(parent, items),
+                     len(before))
+        self._notify(UPDATED, parent, renamed=[(old_key, new_key)])
+        return new_key
+
+    # -----------------------
+    # Batches
+    # -----------------------
+    def remove_items(self, parent, channels=(), keys=()):
+        """
+        Remove channels (by identity) and group keys from parent with a
+        single notification. Returns (removed_channels, removed_keys).
+        """
+        group_ids = {id(parent[k]) for k in keys if k != CHANNELS_KEY and k in parent}
+        removed_channels, removed_keys, removed_groups, record = self._remove_from(
+            parent, {id(ch) for ch in channels}, group_ids)
+        if removed_channels or removed_keys:
+            self._record_removal("Remove", [record])
+            self._notify(REMOVED, parent, channels=removed_channels, keys=removed_keys, groups=removed_groups)
+        return removed_channels, removed_keys
+
+    def remove_nodes(self, node_ids):
+        """
+        Remove the channels and groups with the given node IDs, wherever
+        they are. Each affected channel list is rebuilt once and listeners
+        get a single notification. Returns the number of removed nodes.
+        """
+        channels, keys, groups, records = self._take_nodes(self._group_by_parent(node_ids))
+        if channels or groups:
+            self._record_removal("Remove", records)
+            single = records[0][0] if len(records) == 1 else None
+            self._notify(REMOVED, single, channels=channels, keys=keys, groups=groups)
+        return len(channels) + len(groups)
+
+    def _record_removal(self, label, records):
+        if self.journal.replaying:
+            return
+
+        def redo():
+            for parent, channel_positions, group_positions in records:
+                self._replay_remove(parent, [ch for _, ch in channel_positions],
+                                    [g for _, _, g in group_positions])
+
+        cost = sum(len(c) + len(g) for _, c, g in records)
+        self._record(label, lambda: self._replay_restore(records), redo, cost)
+
+    def _group_by_parent(self, node_ids, skip=None):
+        """{id(parent): (parent, {id(channel)}, {id(group)})} for the given node IDs."""
+        index = self.index
+        targets = {}
+        for node_id in node_ids:
+            node = index.node(node_id)
+            parent = index.parent(node_id)
+            if node is None or parent is None or (skip and skip(node, parent)):
+                continue
+            entry = targets.get(id(parent))
+            if entry is None:
+                entry = targets[id(parent)] = (parent, set(), set())
+            entry[2 if index.is_group(node_id) else 1].add(id(node))
+        return targets
+
+    def _take_nodes(self, targets, forget=True):
+        channels, keys, groups, records = [], [], [], []
+        for parent, channel_ids, group_ids in targets.values():
+            removed = self._remove_from(parent, channel_ids, group_ids, forget)
+            channels += removed[0]
+            keys += removed[1]
+            groups += removed[2]
+            records.append(removed[3])
+        return channels, keys, groups, records
+
+    def move_nodes(self, node_ids, target):
+        """
+        Move the channels and groups with the given node IDs into the group
+        dict target by relinking them: nothing is copied and the nodes keep
+        their IDs. Groups get a unique key in target; a group is never moved
+        into itself or one of its subgroups. Returns the number of moved nodes.
+        """
+        index = self.index
+        self._path_of(target)
+        # target and its ancestors cannot be moved into target
+        blocked = set()
+        ref = target
+        while ref is not None:
+            blocked.add(id(ref))
+            ref = index.parent_of(ref)
+
+        sources = self._group_by_parent(
+            node_ids, skip=lambda node, parent: parent is target or id(node) in blocked)
+        if not sources:
+            return 0
+        channels, keys, groups, records = self._take_nodes(sources, forget=False)
+        single = records[0][0] if len(records) == 1 else None
+        self._notify(REMOVED, single, channels=channels, keys=keys, groups=groups)
+
+        # group-title is derived from the new position: nothing below is rewritten
+        new_keys = []
+        for key, group in zip(keys, groups):
+            key = unique_group_name(target, key)
+            target[key] = group
+            index.set_parent(group, target)
+            new_keys.append(key)
+        position = self._insert_into(target, channels, new_keys, groups)
+
+        if not self.journal.replaying:
+            items = list(target.items())
+            group_ids = {id(g) for g in groups}
+            placed = [(target, [(position + i, ch) for i, ch in enumerate(channels)],
+                       [(i, k, v) for i, (k, v) in enumerate(items) if id(v) in group_ids])]
+
+            def undo():
+                self._replay_remove(target, channels, groups, forget=False)
+                self._replay_restore(records)
+
+            def redo():
+                for parent, channel_positions, group_positions in records:
+                    self._replay_remove(parent, [ch for _, ch in channel_positions],
+                                        [g for _, _, g in group_positions], forget=False)
+                self._replay_restore(placed)
+
+            self._record("Move", undo, redo, 2 * (len(channels) + len(groups)))
+        return len(channels) + len(groups)
+
+    def copy_nodes(self, node_ids, target):
+        """
+        Copy the channels and groups with the given node IDs into target.
+        Channel copies are new dicts sharing the original values (strings
+        are not duplicated); copied groups get a unique key in target.
+        """
+        index = self.index
+        target_path = self._path_of(target)
+        title = "/".join(target_path)
+        channels, keys, groups = [], [], []
+        for node_id in node_ids:
+            node = index.node(node_id)
+            parent = index.parent(node_id)
+            if node is None or parent is None:
+                continue
+            if index.is_group(node_id):
+                key = next((k for k, v in parent.items() if v is node), None)
+                if key is None:
+                    continue
+                self.materialize_tree(node)
+                key = unique_group_name(target, key)
+                # Reserve the key so the next copy of the same name gets another one
+                target[key] = group = copy_group(node, target_path + [key])
+                keys.append(key)
+                groups.append(group)
+            else:
+                channels.append(copy_channel(node, title))
+        for group in groups:
+            index.add_group(target, group)
+        position = self._insert_into(target, channels, keys, groups)
+        self._record_insert("Copy", target, channels, groups, position)
+        return len(channels) + len(groups)
+
+    def _insert_into(self, target, channels, keys, groups):
+        """
+        Append channels to target (groups are already linked) and notify
+        once. Returns the position of the first appended channel.
+        """
+        self.materialize(target)
+        target_channels = channels_of(target, create=True)
+        position = len(target_channels)
+        if channels:
+            target_channels.extend(channels)
+            self.index.add_channels(target, channels)
+        if channels or keys:
+            self._notify(INSERTED, target, channels=channels, keys=keys, index=position, groups=groups)
+        return position
+
+    def _path_of(self, group):
+        path = self.index.path_of(group)
+        if path is None:
+            # The tree was changed outside the model; index it again
+            self.index.build(self.root)
+            path = self.index.path_of(group)
+        if path is None:
+            raise ValueError("The target group is not part of the playlist")
+        return path
+
+    def _remove_from(self, parent, channel_ids, group_ids, forget=True):
+        """
+        Filter the channels and groups (by id()) out of parent in one pass
+        each. With forget=False they keep their node IDs (moves).
+        Returns (channels, keys, groups, record); record holds the previous
+        positions for _restore.
+        """
+        removed_channels, channel_positions = [], []
+        if channel_ids:
+            target = channels_of(parent)
+            kept = []
+            for i, ch in enumerate(target):
+                if id(ch) in channel_ids:
+                    removed_channels.append(ch)
+                    channel_positions.append((i, ch))
+                else:
+                    kept.append(ch)
+            if removed_channels:
+                target[:] = kept
+                if forget:
+                    self.index.remove_channels(removed_channels)
+        removed_keys, removed_groups, group_positions = [], [], []
+        if group_ids and isinstance(parent, dict):
+            for i, (k, v) in enumerate(list(parent.items())):
+                if k != CHANNELS_KEY and id(v) in group_ids:
+                    del parent[k]
+                    if forget:
+                        self.index.remove_group(v)
+                    removed_keys.append(k)
+                    removed_groups.append(v)
+                    group_positions.append((i, k, v))
+        return removed_channels, removed_keys, removed_groups, (parent, channel_positions, group_positions)
+
+    def merge(self, target, incoming, key_field=None, drop_missing=False):
+        """
+        Merge the tree incoming into the group target (see app.playlist_merge)
+        as a single undoable step. Returns the MergeSummary.
+        """
+        self.materialize_tree(target)
+        plan = plan_merge(target, incoming, key_field, drop_missing)
+        old_values = [(ch, {k: ch.get(k, _MISSING) for k in fields}) for ch, fields in plan.updates]
+        for ch, fields in plan.updates:
+            ch.update(fields)
+        removed = [self._remove_from(group, {id(ch) for ch in channels}, ())[3]
+                   for group, channels in plan.removals]
+
+        created = []            # (parent, key, group) of the new groups, parents first
+        created_ids = set()
+        appended = []           # (group, [(position, channel)]) in groups that existed
+        for path, channels in plan.additions.items():
+            count = len(created)
+            group = ensure_group(target, path, created)
+            for parent, _, new_group in created[count:]:
+                self.index.add_group(parent, new_group)
+                created_ids.add(id(new_group))
+            if channels:
+                group_channels = channels_of(group, create=True)
+                position = len(group_channels)
+                group_channels.extend(channels)
+                self.index.add_channels(group, channels)
+                if id(group) not in created_ids:
+                    appended.append((group, [(position + i, ch) for i, ch in enumerate(channels)]))
+        # Undo only has to unlink the new groups whose parent existed before
+        top_groups = {}         # id(parent) -> (parent, [(position, key, group)])
+        for parent, _, _ in created:
+            if id(parent) not in created_ids and id(parent) not in top_groups:
+                top_groups[id(parent)] = (parent, [(i, k, v) for i, (k, v) in enumerate(parent.items())
+                                                   if id(v) in created_ids])
+        self._notify(RESET)
+
+        if not self.journal.replaying and (plan.updates or removed or created or appended):
+            def undo():
+                for group, positioned in appended:
+                    self._remove_from(group, {id(ch) for _, ch in positioned}, ())
+                for parent, positioned in top_groups.values():
+                    self._remove_from(parent, (), {id(g) for _, _, g in positioned})
+                for parent, channel_positions, group_positions in removed:
+                    self._restore(parent, channel_positions, group_positions)
+                for ch, values in old_values:
+                    _set_fields(ch, values)
+                self._notify(RESET)
+
+            def redo():
+                for ch, fields in plan.updates:
+                    ch.update(fields)
+                for parent, channel_positions, _ in removed:
+                    self._remove_from(parent, {id(ch) for _, ch in channel_positions}, ())
+                for parent, positioned in top_groups.values():
+                    self._restore(parent, (), positioned)
+                for group, positioned in appended:
+                    self._restore(group, positioned, ())
+                self._notify(RESET)
+
+            summary = plan.summary
+            cost = summary.channels_added + summary.channels_updated + summary.channels_removed + len(created)
+            self._record("Import", undo, redo, cost)
+        return plan.summary
+
+    def set_order(self, parent, channels=None, keys=None):
+        """Apply a new order to the channels and/or groups of parent."""
+        self.materialize(parent)
+        old_channels = list(channels_of(parent)) if channels is not None else None
+        old_items = list(parent.items()) if keys is not None else None
+        self._apply_order(parent, channels, keys)
+        self._notify(MOVED, parent)
+        if not self.journal.replaying:
+            new_channels = list(channels) if channels is not None else None
+            new_items = list(parent.items()) if keys is not None else None
+
+            def apply(channel_list, items):
+                if channel_list is not None:
+                    channels_of(parent, create=True)[:] = channel_list
+                if items is not None:
+                    parent.clear()
+                    parent.update(items)
+                self._notify(MOVED, parent)
+
+            cost = 2 * (len(old_channels or ()) + len(old_items or ()))
+            self._record("Reorder", lambda: apply(old_channels, old_items),
+                         lambda: apply(new_channels, new_items), cost)
+
+    def _apply_order(self, parent, channels, keys):
+        if channels is not None:
+            channels_of(parent, create=True)[:] = channels
+        if keys is not None:
+            reordered = {}
+            if CHANNELS_KEY in parent:
+                reordered[CHANNELS_KEY] = parent[CHANNELS_KEY]
+            for k in keys:
+                reordered[k] = parent[k]
+            parent.clear()
+            parent.update(reordered)
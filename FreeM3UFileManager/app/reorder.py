@@ -0,0 +1,75 @@
+﻿# app/reorder.py
+# -*- coding: utf-8 -*-
+"""
+Block reordering of the selected elements of a sequence.
+
+Every function builds the new order in one linear pass and keeps the
+relative order of the selected elements. key(element) gives the value that
+is looked up in the selected set (the element itself by default).
+"""
+MOVE_UP = "up"
+MOVE_DOWN = "down"
+MOVE_TOP = "top"
+MOVE_BOTTOM = "bottom"
+MOVE_TO_INDEX = "index"
+
+DIRECTIONS = (MOVE_UP, MOVE_DOWN, MOVE_TOP, MOVE_BOTTOM, MOVE_TO_INDEX)
+
+
+def reorder(items, selected, direction, index=0, key=None):
+    """
+    Return the reordered list, or None if nothing would change.
+    direction is one of DIRECTIONS; index is the target position of the
+    block for MOVE_TO_INDEX, counted among the unselected elements.
+    """
+    if not selected:
+        return None
+    key = key or _identity
+    if direction == MOVE_UP:
+        result = _move_up(items, selected, key)
+    elif direction == MOVE_DOWN:
+        result = _move_up(items[::-1], selected, key)[::-1]
+    else:
+        block, rest = [], []
+        for item in items:
+            (block if key(item) in selected else rest).append(item)
+        if direction == MOVE_TOP:
+            index = 0
+        elif direction == MOVE_BOTTOM:
+            index = len(rest)
+        elif direction != MOVE_TO_INDEX:
+            raise ValueError(f"Unknown direction: {direction}")
+        index = max(0, min(index, len(rest)))
+        result = rest[:index] + block + rest[index:]
+
+    if len(result) == len(items) and all(a is b for a, b in zip(result, items)):
+        return None
+    return result
+
+
+def _move_up(items, selected, key):
+    """
+    Every selected element swaps with the unselected element just above it;
+    consecutive selected elements move as a block. Elements already at the
+    top stay where they are.
+    """
+    result = []
+    append = result.append
+    pending = _NONE              # last unselected element, waiting for the block below it
+    for item in items:
+        if key(item) in selected:
+            append(item)
+        else:
+            if pending is not _NONE:
+                append(pending)
+            pending = item
+    if pending is not _NONE:
+        append(pending)
+    return result
+
+
+def _identity(item):
+    return item
+
+
+_NONE = object()
@@ -0,0 +1,420 @@
+﻿# app/search_index.py
+# -*- coding: utf-8 -*-
+"""
+Full-text channel search over the whole playlist tree.
+
+SearchIndex is an inverted index: token -> channel numbers for the name,
+tvg-id and tvg-name of every channel, and token -> groups for the group
+keys (a channel matches the tokens of every group in its path, so group
+postings are stored once per group, not per channel). Text is casefolded,
+accents are stripped and it is split in runs of letters and digits.
+
+Every query token is a prefix: the tokens of a table are kept sorted and
+bisect finds the range that starts with it, so "spo hd" finds "Sports HD"
+and the channels of "Deportes/Sports". All the query tokens must match;
+the sets of channel numbers are combined with C set operations. Channel
+numbers follow the tree order when the index is built (later channels get
+higher numbers) and results are returned in that order.
+
+The index follows a PlaylistModel: it is built once per tree (by the file
+loader thread, or on the first search) and INSERTED / REMOVED / UPDATED /
+MOVED / CHANGED events patch it. A RESET of the tree it indexed (merge,
+plugins...) makes it stale and the next search builds it again; code that
+changes the tree outside the model calls invalidate().
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import namedtuple
+from sys import intern
+
+from app.playlist_model import INSERTED, REMOVED, UPDATED, MOVED, CHANGED, RESET, CHANNELS_KEY
+
+SEARCH_FIELDS = ("name", "tvg-id", "tvg-name")
+DEFAULT_LIMIT = 500
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+_ABSENT = object()
+
+# total: number of matching channels; matches: [(channel, group)], at most limit
+SearchResult = namedtuple("SearchResult", "total matches")
+
+
+def normalize(text):
+    """Casefold text and strip its accents."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def channel_tokens(channel):
+    """Distinct interned tokens of the searchable fields of channel."""
+    get = channel.get
+    text = f"{get('name') or ''} {get('tvg-id') or ''} {get('tvg-name') or ''}"
+    return tuple(dict.fromkeys(map(intern, TOKEN_RE.findall(normalize(text)))))
+
+
+def key_tokens(key):
+    return tuple(dict.fromkeys(map(intern, tokenize(key)))) if key else ()
+
+
+class _TokenTable:
+    """
+    token -> channel numbers (or group ids), with the tokens sorted on demand
+    for prefix lookups. Most tokens (ids, numbers) belong to one channel: their
+    posting is the bare value and only grows into a set when shared.
+    """
+    __slots__ = ("postings", "sorted", "pending")
+
+    def __init__(self):
+        self.postings = {}
+        self.sorted = []
+        self.pending = []       # tokens not in self.sorted yet
+
+    def add(self, token, value):
+        postings = self.postings
+        values = postings.get(token, _ABSENT)
+        if values.__class__ is set:
+            values.add(value)
+        elif values is _ABSENT:
+            postings[token] = value
+            self.pending.append(token)
+        elif values == ():
+            postings[token] = value
+        elif values != value:
+            postings[token] = {values, value}
+
+    def discard(self, token, value):
+        # Emptied tokens stay (as ()): they match nothing and keep self.sorted valid
+        postings = self.postings
+        values = postings.get(token)
+        if values.__class__ is set:
+            values.discard(value)
+        elif values == value:
+            postings[token] = ()
+
+    def sort(self):
+        if self.pending:
+            if len(self.pending) > 1000:
+                self.sorted = sorted(self.postings)
+            else:
+                for token in self.pending:
+                    insort(self.sorted, token)
+            self.pending = []
+
+    def prefixed(self, prefix):
+        """Value sets of the tokens that start with prefix."""
+        self.sort()
+        tokens = self.sorted
+        postings = self.postings
+        found = []
+        single = []
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            values = postings[tokens[i]]
+            if values.__class__ is set:
+                if values:
+                    found.append(values)
+            elif values != ():
+                single.append(values)
+            i += 1
+        if single:
+            found.append(set(single))
+        return found
+
+
+class _GroupEntry:
+    __slots__ = ("group", "parent", "key", "tokens", "members", "children")
+
+    def __init__(self, group, parent, key):
+        self.group = group
+        self.parent = parent            # _GroupEntry, None for the root
+        self.key = key
+        self.tokens = key_tokens(key)
+        self.members = set()            # numbers of the channels of the group
+        self.children = {}              # id(subgroup) -> _GroupEntry
+
+    def path(self):
+        keys = []
+        entry = self
+        while entry.parent is not None:
+            keys.append(entry.key)
+            entry = entry.parent
+        keys.reverse()
+        return keys
+
+
+class SearchIndex:
+    def __init__(self, model=None):
+        self.model = None
+        self.root = None                # tree indexed, None when stale
+        self._seen_root = None
+        self._clear()
+        if model is not None:
+            self.attach(model)
+
+    def _clear(self):
+        self._channel_tokens = _TokenTable()     # token -> channel numbers
+        self._group_tokens = _TokenTable()       # token -> id(group)
+        self._numbers = {}                       # id(channel) -> number
+        # Indexed by channel number (None once removed)
+        self._channels = []
+        self._owners = []                        # _GroupEntry of each channel
+        self._tokens = []
+        self._groups = {}                        # id(group) -> _GroupEntry
+        self._next_number = 0
+
+    # -----------------------
+    # Model
+    # -----------------------
+    def attach(self, model):
+        self.model = model
+        self._seen_root = model.root
+        model.add_listener(self._on_model_change)
+
+    def detach(self):
+        if self.model is not None:
+            self.model.remove_listener(self._on_model_change)
+            self.model = None
+
+    @property
+    def ready(self):
+        return self.root is not None and (self.model is None or self.root is self.model.root)
+
+    def invalidate(self):
+        """The tree was changed outside the model: rebuild on the next search."""
+        self.root = None
+
+    def ensure_built(self):
+        if self.ready or self.model is None:
+            return
+        # A lazily loaded playlist is decoded first: search covers every channel
+        self.model.materialize_all()
+        self.build(self.model.root)
+
+    def build(self, root):
+        """Index every channel and group of root (may run on a worker thread)."""
+        self._clear()
+        self._add_group(None, None, root)
+        self._channel_tokens.sort()
+        self._group_tokens.sort()
+        self.root = root
+
+    def __len__(self):
+        return len(self._numbers)
+
+    # -----------------------
+    # Search
+    # -----------------------
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Channels matching every token of query (as prefixes). Returns a SearchResult."""
+        self.ensure_built()
+        terms = set(tokenize(query))
+        if not terms:
+            return SearchResult(0, [])
+        result = None
+        # Longer terms are usually more selective: intersect from them
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._match(term)
+            result = matches if result is None else result & matches
+            if not result:
+                return SearchResult(0, [])
+        numbers = heapq.nsmallest(limit, result) if len(result) > limit else sorted(result)
+        channels = self._channels
+        owners = self._owners
+        return SearchResult(len(result), [(channels[n], owners[n].group) for n in numbers])
+
+    def _match(self, term):
+        sets = self._channel_tokens.prefixed(term)
+        # Channels of the matching groups and of their subgroups
+        seen = set()
+        stack = [self._groups[gid] for ids in self._group_tokens.prefixed(term) for gid in ids if gid in self._groups]
+        while stack:
+            entry = stack.pop()
+            if id(entry) in seen:
+                continue
+            seen.add(id(entry))
+            if entry.members:
+                sets.append(entry.members)
+            stack.extend(entry.children.values())
+        if not sets:
+            return set()
+        if len(sets) == 1:
+            return sets[0]
+        return set().union(*sets)
+
+    def path_of(self, group):
+        """Keys from the root down to group, or None if group is not indexed."""
+        entry = self._groups.get(id(group))
+        return entry.path() if entry is not None else None
+
+    # -----------------------
+    # Maintenance
+    # -----------------------
+    def _add_group(self, parent, key, group):
+        """Index group (under the _GroupEntry parent) with its subgroups and channels."""
+        stack = [(parent, key, group)]
+        while stack:
+            parent, key, group = stack.pop()
+            entry = _GroupEntry(group, parent, key)
+            self._groups[id(group)] = entry
+            if parent is not None:
+                parent.children[id(group)] = entry
+            for token in entry.tokens:
+                self._group_tokens.add(token, id(group))
+            self._add_channels(entry, group.get(CHANNELS_KEY, ()))
+            # Reversed so groups are numbered in tree order
+            stack.extend((entry, k, v) for k, v in reversed(group.items())
+                         if k != CHANNELS_KEY and isinstance(v, dict))
+
+    def _add_channels(self, entry, channels):
+        numbers = self._numbers
+        table = self._channel_tokens
+        postings = table.postings
+        pending = table.pending
+        members = entry.members
+        number = len(self._channels)
+        added = []
+        for ch in channels:
+            if ch.__class__ is not dict:
+                continue
+            if id(ch) in numbers:
+                # Already indexed in another group: it moved here
+                self._set_owner(numbers[id(ch)], entry)
+                continue
+            tokens = channel_tokens(ch)
+            numbers[id(ch)] = number
+            members.add(number)
+            for token in tokens:
+                if token in postings:
+                    table.add(token, number)
+                else:
+                    postings[token] = number
+                    pending.append(token)
+            added.append((ch, tokens))
+            number += 1
+        if added:
+            self._channels.extend([ch for ch, _ in added])
+            self._tokens.extend([tokens for _, tokens in added])
+            self._owners.extend([entry] * len(added))
+
+    def _set_owner(self, number, entry):
+        owner = self._owners[number]
+        if owner is not entry:
+            owner.members.discard(number)
+            entry.members.add(number)
+            self._owners[number] = entry
+
+    def _drop_channel(self, number):
+        del self._numbers[id(self._channels[number])]
+        self._owners[number].members.discard(number)
+        for token in self._tokens[number]:
+            self._channel_tokens.discard(token, number)
+        self._channels[number] = self._owners[number] = self._tokens[number] = None
+
+    def _remove_channels(self, channels):
+        for ch in channels:
+            number = self._numbers.get(id(ch))
+            if number is not None:
+                self._drop_channel(number)
+
+    def _remove_group(self, entry):
+        """Forget entry, its subgroups and their channels."""
+        if entry.parent is not None:
+            entry.parent.children.pop(id(entry.group), None)
+        stack = [entry]
+        while stack:
+            ref = stack.pop()
+            self._groups.pop(id(ref.group), None)
+            for token in ref.tokens:
+                self._group_tokens.discard(token, id(ref.group))
+            for number in list(ref.members):
+                self._drop_channel(number)
+            stack.extend(ref.children.values())
+
+    def _update_channel(self, ch):
+        number = self._numbers.get(id(ch))
+        if number is None:
+            return
+        old_tokens = self._tokens[number]
+        tokens = channel_tokens(ch)
+        if tokens == old_tokens:
+            return
+        for token in old_tokens:
+            self._channel_tokens.discard(token, number)
+        for token in tokens:
+            self._channel_tokens.add(token, number)
+        self._tokens[number] = tokens
+
+    def _sync_level(self, entry):
+        """Index the subgroups and channels of entry.group again (renames, undo/redo)."""
+        group = entry.group
+        current = {id(v): (k, v) for k, v in group.items() if k != CHANNELS_KEY and isinstance(v, dict)}
+        for gid in [gid for gid in entry.children if gid not in current]:
+            self._remove_group(entry.children[gid])
+        for gid, (key, child) in current.items():
+            child_entry = entry.children.get(gid)
+            if child_entry is None:
+                moved = self._groups.get(gid)
+                if moved is not None:
+                    self._remove_group(moved)
+                self._add_group(entry, key, child)
+            elif child_entry.key != key:
+                for token in child_entry.tokens:
+                    self._group_tokens.discard(token, gid)
+                child_entry.key, child_entry.tokens = key, key_tokens(key)
+                for token in child_entry.tokens:
+                    self._group_tokens.add(token, gid)
+
+        channels = group.get(CHANNELS_KEY, ())
+        present = {id(ch) for ch in channels}
+        indexed = self._channels
+        for number in [n for n in entry.members if id(indexed[n]) not in present]:
+            self._drop_channel(number)
+        self._add_channels(entry, channels)
+
+    def _on_model_change(self, event):
+        if event.type == RESET:
+            root = self.model.root
+            if root is self._seen_root:
+                # Same tree changed in place
+                self.root = None
+            self._seen_root = root
+            return
+        if not self.ready:
+            return
+        if event.type == REMOVED:
+            self._remove_channels(event.channels)
+            for group in event.groups:
+                entry = self._groups.get(id(group))
+                if entry is not None:
+                    self._remove_group(entry)
+            return
+        if event.type == UPDATED:
+            # Channels are found by identity: parent may be None
+            for ch in event.channels:
+                self._update_channel(ch)
+
+        parent = self._groups.get(id(event.parent))
+        if parent is None:
+            # A group out of the tree (e.g. undo restores a subgroup before its
+            # parent): it is indexed with its contents when it is linked again
+            return
+        if event.type == INSERTED:
+            for key in event.keys:
+                group = event.parent.get(key)
+                if isinstance(group, dict) and id(group) not in self._groups:
+                    self._add_group(parent, key, group)
+            self._add_channels(parent, event.channels)
+        elif event.type == UPDATED and event.renamed:
+            self._sync_level(parent)
+        elif event.type in (MOVED, CHANGED):
+            # A new order can also drop or bring back channels and groups
+            self._sync_level(parent)
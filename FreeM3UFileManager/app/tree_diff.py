@@ -0,0 +1,152 @@
+﻿# app/tree_diff.py
+# -*- coding: utf-8 -*-
+"""
+Structural diff of two group trees.
+
+Channels are matched by key, not by name: the url plus its occurrence
+number (the n-th channel with that url in file order), so duplicated
+entries are compared one to one. With key_field="tvg-id" channels that
+have a tvg-id are matched by it instead (a changed url is then reported as
+a modification). Both trees are walked once and matched through a dict,
+so the diff is linear in the number of channels and groups; nothing is
+copied, the changes hold references to the channel dicts.
+
+Reported changes:
+    ADDED     channel or group only in the new tree
+    REMOVED   channel or group only in the old tree
+    MODIFIED  matched channel with different fields (fields lists them)
+    MOVED     matched channel in another group (old_path -> new_path)
+A channel both moved and modified gives one change of each type.
+"""
+from collections import namedtuple, Counter
+
+CHANNELS_KEY = "_channels"
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+MOVED = "moved"
+
+CHANNEL = "channel"
+GROUP = "group"
+
+# Fields that do not count as a modification: group-title follows the
+# group the channel is in (see MOVED), the rest is editor state.
+IGNORED_FIELDS = frozenset({"group-title", "item_type", "logo_valid"})
+
+Change = namedtuple("Change", "type kind old_path new_path old new fields")
+
+
+def iter_tree(data):
+    """
+    Yield (path, group, channels) for every group of a tree in file order;
+    path is a tuple of keys. A bare channel list gives ((), None, data).
+    """
+    if isinstance(data, list):
+        yield (), None, data
+        return
+    if not isinstance(data, dict):
+        return
+    stack = [((), data)]
+    while stack:
+        path, group = stack.pop()
+        yield path, group, group.get(CHANNELS_KEY, ())
+        children = [(path + (k,), v) for k, v in group.items()
+                    if k != CHANNELS_KEY and isinstance(v, dict)]
+        stack.extend(reversed(children))
+
+
+def channel_keys(data, key_field=None):
+    """
+    Yield (key, path, group, channel) for every channel of data. The key is
+    ("url", url, n) for the n-th channel with that url, or
+    (key_field, value, n) when key_field is given and the channel has it.
+    """
+    seen = {}
+    get = seen.get
+    for path, group, channels in iter_tree(data):
+        for ch in channels:
+            if not isinstance(ch, dict):
+                continue
+            value = ch.get(key_field) if key_field else None
+            base = (key_field, value) if value else ("url", ch.get("url", ""))
+            n = seen[base] = get(base, -1) + 1
+            yield base + (n,), path, group, ch
+
+
+def changed_fields(old, new):
+    """Names of the fields that differ between two channel dicts."""
+    if old == new:
+        return ()
+    fields = [k for k, v in new.items()
+              if k not in IGNORED_FIELDS and k[:1] != "_" and old.get(k, "") != v]
+    fields += [k for k, v in old.items()
+               if k not in new and v and k not in IGNORED_FIELDS and k[:1] != "_"]
+    return tuple(fields)
+
+
+def diff_trees(old, new, key_field=None):
+    """Return the list of Change between the trees (or channel lists) old and new."""
+    changes = []
+    append = changes.append
+
+    old_groups = {path for path, group, _ in iter_tree(old) if group is not None}
+    new_groups = set()
+    for path, group, _ in iter_tree(new):
+        if group is None:
+            continue
+        new_groups.add(path)
+        if path not in old_groups:
+            append(Change(ADDED, GROUP, None, path, None, group, ()))
+    for path in old_groups - new_groups:
+        append(Change(REMOVED, GROUP, path, None, None, None, ()))
+
+    old_channels = {key: (path, ch) for key, path, _, ch in channel_keys(old, key_field)}
+    for key, path, _, ch in channel_keys(new, key_field):
+        match = old_channels.pop(key, None)
+        if match is None:
+            append(Change(ADDED, CHANNEL, None, path, None, ch, ()))
+            continue
+        old_path, old_ch = match
+        if old_path != path:
+            append(Change(MOVED, CHANNEL, old_path, path, old_ch, ch, ()))
+        fields = changed_fields(old_ch, ch)
+        if fields:
+            append(Change(MODIFIED, CHANNEL, old_path, path, old_ch, ch, fields))
+    for path, ch in old_channels.values():
+        append(Change(REMOVED, CHANNEL, path, None, ch, None, ()))
+    return changes
+
+
+def summarize(changes):
+    """{(type, kind): count} of a change list."""
+    return Counter((c.type, c.kind) for c in changes)
+
+
+def change_path(change):
+    """Group where a change is shown: the new position, or the old one if removed."""
+    return change.new_path if change.new_path is not None else change.old_path
+
+
+def group_changes(changes):
+    """
+    Index a change list for display. Returns (by_path, children):
+    by_path maps a group path to the changes shown in it and children maps
+    a path to the sorted child names leading to other changes.
+    """
+    by_path = {}
+    for change in changes:
+        path = change_path(change)
+        if change.kind == GROUP:
+            # The group itself is listed in its parent
+            path = path[:-1]
+        by_path.setdefault(path, []).append(change)
+    children = {}
+    for path in list(by_path):
+        while path:
+            names = children.setdefault(path[:-1], set())
+            if path[-1] in names:
+                break
+            names.add(path[-1])
+            path = path[:-1]
+    return by_path, {path: sorted(names) for path, names in children.items()}
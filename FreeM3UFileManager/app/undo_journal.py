@@ -0,0 +1,87 @@
+﻿# app/undo_journal.py
+# -*- coding: utf-8 -*-
+"""
+Undo/redo history made of operation deltas.
+
+Each step stores the two functions that revert and re-apply one model
+operation, plus its cost: the number of node references the step keeps
+alive (removed channels, previous orders...). The history is bounded both
+in steps and in total cost; the oldest steps are dropped first.
+"""
+from collections import deque, namedtuple
+
+DEFAULT_MAX_STEPS = 100
+DEFAULT_MAX_COST = 2000000          # node references kept by the whole history
+
+UndoStep = namedtuple("UndoStep", "label undo redo cost")
+
+
+class UndoJournal:
+    def __init__(self, max_steps=DEFAULT_MAX_STEPS, max_cost=DEFAULT_MAX_COST):
+        self.max_steps = max_steps
+        self.max_cost = max_cost
+        self._undo = deque()
+        self._redo = []
+        self._cost = 0
+        self.replaying = False      # True while undo/redo functions run
+
+    def record(self, label, undo, redo, cost=1):
+        """Add a step; a new operation clears the redo history."""
+        if self.replaying or self.max_steps <= 0:
+            return
+        self._redo.clear()
+        self._undo.append(UndoStep(label, undo, redo, cost))
+        self._cost += cost
+        self._trim()
+
+    def _trim(self):
+        while self._undo and (len(self._undo) > self.max_steps
+                              or (self._cost > self.max_cost and len(self._undo) > 1)):
+            self._cost -= self._undo.popleft().cost
+        if not self._undo:
+            self._cost = 0
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._cost = 0
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def undo(self):
+        """Revert the last step. Returns its label or None."""
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._cost -= step.cost
+        self._replay(step.undo)
+        self._redo.append(step)
+        return step.label
+
+    def redo(self):
+        """Re-apply the last undone step. Returns its label or None."""
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._replay(step.redo)
+        self._undo.append(step)
+        self._cost += step.cost
+        self._trim()
+        return step.label
+
+    def _replay(self, func):
+        self.replaying = True
+        try:
+            func()
+        finally:
+            self.replaying = False
@@ -0,0 +1,143 @@
+﻿# app/xmltv.py
+# -*- coding: utf-8 -*-
+"""
+Streaming reader for the <channel> elements of XMLTV guides.
+
+A full guide is mostly <programme> elements, hundreds of MB of them, while
+the editor only uses the channels. The document is read in READ_CHUNK_SIZE
+blocks and fed to an expat XMLParser whose target builds the channel
+records directly: no Element is ever created, programme elements only cost
+the callbacks that ignore them, and memory does not grow with the guide.
+
+Sources are paths or http(s) URLs. URLs are streamed (requests with
+stream=True) instead of downloaded into memory, and gzip data is detected
+by its magic bytes and decompressed on the fly, whatever the file name.
+"""
+import gzip
+import io
+from contextlib import contextmanager
+import xml.etree.ElementTree as ET
+
+import requests
+
+READ_CHUNK_SIZE = 1024 * 1024
+REQUEST_TIMEOUT = 10
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_url(source):
+    return source.startswith(("http://", "https://"))
+
+
+@contextmanager
+def _decompressed(raw):
+    """Yield raw (a buffered binary stream), through gzip if it starts with the gzip magic."""
+    try:
+        if raw.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield stream
+        else:
+            yield raw
+    finally:
+        raw.close()
+
+
+def response_stream(response):
+    """Context manager for the decompressed body of a requests response opened with stream=True."""
+    # Undo a Content-Encoding applied by the server; .gz files are handled by _decompressed
+    response.raw.decode_content = True
+    # Keep the stream readable at EOF: BufferedReader and GzipFile read past it
+    response.raw.auto_close = False
+    return _decompressed(io.BufferedReader(response.raw, READ_CHUNK_SIZE))
+
+
+@contextmanager
+def open_xmltv(source, timeout=REQUEST_TIMEOUT):
+    """Binary stream of the guide at source (path or URL), decompressed if gzip."""
+    if is_url(source):
+        with requests.get(source, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            with response_stream(response) as stream:
+                yield stream
+    else:
+        with _decompressed(open(source, "rb", buffering=READ_CHUNK_SIZE)) as stream:
+            yield stream
+
+
+class _ChannelTarget:
+    """XMLParser target that keeps the <channel> records and ignores the rest."""
+
+    def __init__(self):
+        self.channels = []
+        self._channel = None
+        self._field = None          # "display-name" or "url" while reading its text
+        self._text = []
+
+    def start(self, tag, attrib):
+        channel = self._channel
+        if channel is None:
+            if tag == "channel":
+                channel_id = attrib.get("id", "")
+                self._channel = {
+                    "tvg-id": channel_id,
+                    "tvg-name": "",
+                    "tvg-logo": "",
+                    "tvg-url": "",
+                    "name": channel_id,
+                    "icon_url": None,
+                    "display-names": [],
+                }
+            return
+        if tag in ("display-name", "url"):
+            self._field = tag
+            self._text = []
+        elif tag == "icon" and not channel["tvg-logo"]:
+            channel["tvg-logo"] = attrib.get("src", "")
+            channel["icon_url"] = channel["tvg-logo"] or None
+
+    def data(self, text):
+        if self._field is not None:
+            self._text.append(text)
+
+    def end(self, tag):
+        channel = self._channel
+        if channel is None:
+            return
+        if tag == self._field:
+            text = "".join(self._text).strip()
+            self._field = None
+            if tag == "url":
+                channel["tvg-url"] = channel["tvg-url"] or text
+            elif text:
+                channel["display-names"].append(text)
+                channel["tvg-name"] = channel["tvg-name"] or text
+        elif tag == "channel":
+            self.channels.append(channel)
+            self._channel = None
+
+    def close(self):
+        return self.channels
+
+
+def read_xmltv_channels(stream, progress_callback=None):
+    """Channel records of the XMLTV document read from the binary stream."""
+    parser = ET.XMLParser(target=_ChannelTarget())
+    read_bytes = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        read_bytes += len(chunk)
+        if progress_callback:
+            progress_callback(read_bytes)
+    return parser.close()
+
+
+def load_xmltv_channels(source, progress_callback=None, timeout=REQUEST_TIMEOUT):
+    """
+    Channel records of the guide at source: tvg-id, tvg-name (first
+    display-name), display-names, tvg-logo / icon_url and tvg-url.
+    """
+    with open_xmltv(source, timeout) as stream:
+        return read_xmltv_channels(stream, progress_callback)
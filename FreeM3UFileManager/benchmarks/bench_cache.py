@@ -0,0 +1,64 @@
+﻿# benchmarks/bench_cache.py
+# -*- coding: utf-8 -*-
+"""
+Reopening a playlist through the parsed-tree cache (app.playlist_cache).
+
+    cold parse   parse_m3u_to_dict, no cache
+    first load   the parse plus store_cached (what the first open pays)
+    warm reopen  load_cached of the unchanged file
+
+The cache entries go to a temporary directory, not to the user's cache.
+
+    python benchmarks/bench_cache.py [--channels N [N ...]]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import synthetic
+from app.m3u_parser import parse_m3u_to_dict
+from app.m3u_writer import iter_m3u_chunks
+from app.playlist_cache import cache_entry_path, load_cached, store_cached
+
+
+def timed(action):
+    gc.collect()
+    start = time.perf_counter()
+    result = action()
+    return result, time.perf_counter() - start
+
+
+def bench(channels, cache_dir):
+    path = synthetic.playlist_path(channels)
+    tree, cold = timed(lambda: parse_m3u_to_dict(path))
+    del tree
+
+    def first_load():
+        parsed = parse_m3u_to_dict(path)
+        store_cached(path, parsed, cache_dir=cache_dir)
+        return parsed
+
+    parsed, first = timed(first_load)
+    cached, warm = timed(lambda: load_cached(path, cache_dir))
+    assert cached is not None, "cache entry not read back"
+    identical = "".join(iter_m3u_chunks(cached)) == "".join(iter_m3u_chunks(parsed))
+    entry_mb = os.path.getsize(cache_entry_path(path, cache_dir)) / 2 ** 20
+    source_mb = os.path.getsize(path) / 2 ** 20
+    print(f"  {channels:>9} channels ({source_mb:.0f} MB): cold {cold:6.2f} s, first load {first:6.2f} s, "
+          f"warm reopen {warm:6.2f} s, entry {entry_mb:.0f} MB, export identical: {identical}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, nargs="+", default=[200_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for channels in args.channels:
+            bench(channels, cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+﻿# benchmarks/bench_delete.py
+# -*- coding: utf-8 -*-
+"""
+Deleting a selection: 20k random channels of a 50k channel group.
+
+    model   PlaylistModel.remove_nodes alone, then undo and redo
+    rows    the same with the list helper showing the group, so the time
+            includes the row update (imports Kivy, no window is opened)
+
+    python benchmarks/bench_delete.py [--channels N] [--delete K] [--repeat R]
+"""
+import argparse
+import os
+import random
+import time
+
+import synthetic
+from app.channel_store import ChannelStore
+from app.playlist_model import PlaylistModel
+
+
+def make_tree(channels):
+    store = ChannelStore()
+    group = {"_channels": [store.make_channel({"name": f"Channel {i}", "url": synthetic.channel_url(i),
+                                                "group-title": "Big", "tvg-id": f"ch{i}"})
+                           for i in range(channels)]}
+    return {"Big": group}
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def run(variant, args, seed):
+    tree = make_tree(args.channels)
+    group = tree["Big"]
+    if variant == "rows":
+        os.environ.setdefault("KIVY_NO_ARGS", "1")
+        from app.editor_custom_listitems import EditorCustomQListItems, EditorRecycleView
+        from app.style_manager import style_manager
+        style_manager.set_style(True)
+        helper = EditorCustomQListItems(container=EditorRecycleView(), style=style_manager.get_style())
+        helper.load_data(tree)
+        helper.open_group(helper.items[0].data)
+        model = helper.model
+        assert len(helper.items) == args.channels + 1      # back row + channels
+    else:
+        model = PlaylistModel(tree)
+        model.index.load_channels(group)
+    chosen = random.Random(seed).sample(group["_channels"], args.delete)
+    ids = {model.index.id_of(ch) for ch in chosen}
+    delete = timed(lambda: model.remove_nodes(ids))
+    assert len(group["_channels"]) == args.channels - args.delete
+    undo = timed(model.undo)
+    redo = timed(model.redo)
+    return delete, undo, redo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, default=50_000)
+    parser.add_argument("--delete", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"delete {args.delete} random channels of {args.channels}, best of {args.repeat}")
+    for variant in ("model", "rows"):
+        results = [run(variant, args, seed) for seed in range(args.repeat)]
+        delete, undo, redo = (min(column) for column in zip(*results))
+        print(f"  {variant:<6}: delete {delete * 1000:7.1f} ms, undo {undo * 1000:7.1f} ms, "
+              f"redo {redo * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+﻿# benchmarks/bench_export.py
+# -*- coding: utf-8 -*-
+"""
+M3U export throughput in MB/s (of M3U text written).
+
+    line-by-line  the previous writer, kept here for reference: one
+                  f.write per line, fixed attribute list
+    m3u_writer    write_m3u_file, to .m3u and to .m3u.gz
+
+The line-by-line writer drops the attributes outside its fixed list, so
+its files are smaller: compare MB/s, not seconds.
+
+    python benchmarks/bench_export.py [--channels N] [--repeat R] [--out DIR]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import synthetic
+from app.m3u_parser import parse_m3u_to_dict
+from app.m3u_writer import write_m3u_file
+
+LEGACY_FIELDS = ("tvg-id", "tvg-name", "tvg-logo", "tvg-url", "tvg-shift", "radio", "catchup",
+                 "catchup-source", "catchup-days", "group-title")
+
+
+def legacy_extinf(ch):
+    attrs = []
+    for key in LEGACY_FIELDS:
+        val = ch.get(key)
+        if val:
+            attrs.append(f'{key}="{val}"')
+    return f'#EXTINF:-1 {" ".join(attrs)},{ch.get("name","")}'
+
+
+def legacy_write(ref, f):
+    for key, value in ref.items():
+        if key == "_channels":
+            for ch in value:
+                f.write(legacy_extinf(ch) + "\n")
+                f.write(ch.get("url", "") + "\n")
+        else:
+            legacy_write(value, f)
+
+
+def legacy_write_file(tree, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        legacy_write(tree, f)
+
+
+def timed(label, write, tree, path, repeat, text_bytes=None):
+    """Best time of repeat writes; MB/s counts the M3U text (uncompressed) written."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write(tree, path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    size = os.path.getsize(path)
+    text_mb = (text_bytes or size) / 2 ** 20
+    print(f"  {label:<18}: {best:6.2f} s, {text_mb / best:6.1f} MB/s, file {size / 2 ** 20:.0f} MB")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="directory for the exported files (default: a temp dir)")
+    args = parser.parse_args()
+
+    tree = parse_m3u_to_dict(synthetic.playlist_path(args.channels))
+    print(f"{args.channels} channels, best of {args.repeat}")
+    with tempfile.TemporaryDirectory(dir=args.out) as out:
+        timed("line-by-line", legacy_write_file, tree, os.path.join(out, "legacy.m3u"), args.repeat)
+        text_bytes = timed("m3u_writer", write_m3u_file, tree, os.path.join(out, "export.m3u"), args.repeat)
+        timed("m3u_writer (.gz)", write_m3u_file, tree, os.path.join(out, "export.m3u.gz"), args.repeat,
+              text_bytes)
+
+
+if __name__ == "__main__":
+    main()
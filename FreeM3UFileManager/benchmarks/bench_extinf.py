@@ -0,0 +1,64 @@
+﻿# benchmarks/bench_extinf.py
+# -*- coding: utf-8 -*-
+"""
+#EXTINF header tokenizing speed, in lines per second.
+
+Compares m3u_parser.parse_extinf (one precompiled scan that yields the
+attributes and the title) with the previous approach, re.findall of the
+attributes into a dict plus an rsplit for the title, kept here as
+findall_parse_extinf for reference.
+
+    python benchmarks/bench_extinf.py [--lines N] [--repeat R]
+"""
+import argparse
+import re
+import time
+
+import synthetic
+from app.channel_store import ChannelStore
+from app.m3u_parser import parse_extinf
+
+ATTRIBUTE_RE = re.compile(r'([\w-]+)="(.*?)"')
+FIELDS = ("tvg-id", "tvg-name", "tvg-logo", "tvg-shift", "tvg-url", "radio",
+          "catchup", "catchup-source", "catchup-days")
+
+
+def findall_parse_extinf(line):
+    """The tokenizer parse_extinf replaced."""
+    attrs = dict(ATTRIBUTE_RE.findall(line))
+    group = attrs.get("group-title", "") or ""
+    name = line.rsplit(",", 1)[-1].strip() if "," in line else attrs.get("tvg-id", "") or "Unknown"
+    channel = {"name": name, "group-title": group, "url": ""}
+    for key in FIELDS:
+        channel[key] = attrs.get(key, "")
+    return channel
+
+
+def best_rate(parse, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lines = [synthetic.extinf_line(i) for i in range(args.lines)]
+    store = ChannelStore()
+    new = best_rate(lambda line: parse_extinf(line, store), lines, args.repeat)
+    old = best_rate(findall_parse_extinf, lines, args.repeat)
+    print(f"{args.lines} lines, best of {args.repeat}")
+    print(f"  findall + rsplit : {old:>10,.0f} lines/s")
+    print(f"  parse_extinf     : {new:>10,.0f} lines/s  ({new / old:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+﻿# benchmarks/bench_json.py
+# -*- coding: utf-8 -*-
+"""
+JSON save and load of a parsed playlist (1M channels by default).
+
+    write   json.dump(indent=4), the previous save, vs write_json_file
+            (streamed, compact): time and file size
+    read    json.load + ChannelStore.compact_tree of the indented file vs
+            load_file (read_json_stream) of the compact one: time and
+            peak RSS, each in its own process
+
+    python benchmarks/bench_json.py [--channels N]
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+import synthetic
+from app.channel_store import ChannelStore
+from app.emw_file_utils import load_file, write_json_file
+from app.m3u_parser import parse_m3u_to_dict
+
+
+def json_paths(channels):
+    base = os.path.join(synthetic.DATA_DIR, f"synthetic_{channels}")
+    return base + ".indent.json", base + ".json"
+
+
+def timed(func):
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def dump_indented(tree, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tree, f, ensure_ascii=False, indent=4)
+
+
+def load_compacted(path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        tree = json.load(f)
+    ChannelStore().compact_tree(tree)
+    return tree
+
+
+def run_read(variant, channels):
+    indented, compact = json_paths(channels)
+    gc.collect()
+    before = synthetic.peak_rss_mb()
+    start = time.perf_counter()
+    if variant == "json.load":
+        tree = load_compacted(indented)
+    else:
+        tree = load_file(compact, False)
+    elapsed = time.perf_counter() - start
+    peak = synthetic.peak_rss_mb()
+    memory = f", peak RSS {peak:7.0f} MB (+{peak - before:.0f} MB)" if peak is not None else ""
+    print(f"  {variant:<11}: {elapsed:6.2f} s{memory}")
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, default=1_000_000)
+    parser.add_argument("--read", choices=("json.load", "stream"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.read:
+        run_read(args.read, args.channels)
+        return
+    path = synthetic.playlist_path(args.channels)
+    print(f"{args.channels} channels, {path}")
+    tree = parse_m3u_to_dict(path)
+    indented, compact = json_paths(args.channels)
+
+    print("write")
+    old = timed(lambda: dump_indented(tree, indented))
+    new = timed(lambda: write_json_file(tree, compact))
+    old_size = os.path.getsize(indented) / (1024 * 1024)
+    new_size = os.path.getsize(compact) / (1024 * 1024)
+    print(f"  json.dump  : {old:6.2f} s, {old_size:6.0f} MB")
+    print(f"  stream     : {new:6.2f} s, {new_size:6.0f} MB  ({old / new:.2f}x)")
+    del tree
+
+    print("read")
+    for variant in ("json.load", "stream"):
+        subprocess.run([sys.executable, __file__, "--channels", str(args.channels), "--read", variant],
+                       check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+﻿# benchmarks/bench_memory.py
+# -*- coding: utf-8 -*-
+"""
+Memory held by a parsed playlist (1M channels by default).
+
+Each variant runs in its own process so the peak RSS is its own:
+    store     the parser as shipped: ChannelStore pools the values of
+              low-cardinality fields and skips empty ones
+    unpooled  the same parse with every value kept as its own string
+
+    python benchmarks/bench_memory.py [--channels N]
+"""
+import argparse
+import gc
+import subprocess
+import sys
+import time
+
+import synthetic
+from app.channel_store import ChannelStore
+from app.m3u_parser import open_m3u_binary, parse_m3u_stream
+
+
+class UnpooledStore(ChannelStore):
+    def intern_value(self, key, value):
+        return value
+
+
+def run_variant(variant, path):
+    gc.collect()
+    before = synthetic.peak_rss_mb()
+    store = ChannelStore() if variant == "store" else UnpooledStore()
+    start = time.perf_counter()
+    with open_m3u_binary(path) as f:
+        tree = parse_m3u_stream(f, store=store)
+    elapsed = time.perf_counter() - start
+    peak = synthetic.peak_rss_mb()
+    print(f"  {variant:<9}: {elapsed:6.2f} s, peak RSS {peak:7.0f} MB "
+          f"(+{peak - before:.0f} MB over the interpreter)")
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--channels", type=int, default=1_000_000)
+    parser.add_argument("--variant", choices=("store", "unpooled"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    path = synthetic.playlist_path(args.channels)
+    if args.variant:
+        run_variant(args.variant, path)
+        return
+    if synthetic.peak_rss_mb() is None:
+        sys.exit("Peak RSS is not available on this platform")
+    print(f"{args.channels} channels, {path}")
+    for variant in ("store", "unpooled"):
+        subprocess.run([sys.executable, __file__, "--channels", str(args.channels), "--variant", variant],
+                       check=True)
+
+
+if __name__ == "__main__":
+    main()
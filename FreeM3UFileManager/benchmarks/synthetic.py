@@ -0,0 +1,80 @@
+﻿# benchmarks/synthetic.py
+# -*- coding: utf-8 -*-
+"""
+Synthetic playlists for the benchmarks.
+
+Channels look like a provider list: six attributes (tvg-id, tvg-name,
+tvg-logo, tvg-country, tvg-language, group-title), a title and a URL,
+spread over "CountryN/CatM" groups with a few ungrouped channels. The
+output only depends on the arguments, so runs on different machines
+parse the same file. Generated files are kept in DATA_DIR and reused.
+"""
+import os
+import sys
+import tempfile
+
+# Make `app` importable when a benchmark is run as a script
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+DATA_DIR = os.environ.get("FM3U_BENCH_DIR") or os.path.join(tempfile.gettempdir(), "fm3u_bench")
+
+COUNTRIES = 40
+CATEGORIES = 5
+UNGROUPED_EVERY = 97          # one channel in UNGROUPED_EVERY has no group-title
+LANGUAGES = ("English", "Spanish", "French", "German", "Italian", "Portuguese")
+
+
+def group_title(i):
+    if i % UNGROUPED_EVERY == 0:
+        return ""
+    return f"Country{i % COUNTRIES}/Cat{i // COUNTRIES % CATEGORIES}"
+
+
+def extinf_line(i):
+    country = i % COUNTRIES
+    return (f'#EXTINF:-1 tvg-id="ch{i}.c{country}" tvg-name="Channel {i} HD" '
+            f'tvg-logo="http://logos.example.com/c{country}/{i}.png" tvg-country="C{country}" '
+            f'tvg-language="{LANGUAGES[i % len(LANGUAGES)]}" group-title="{group_title(i)}",Channel {i} HD')
+
+
+def channel_url(i):
+    return f"http://stream.example.com:8080/live/user/pass/{i}.ts"
+
+
+def iter_playlist_lines(channels):
+    yield "#EXTM3U"
+    for i in range(channels):
+        yield extinf_line(i)
+        yield channel_url(i)
+
+
+def write_playlist(path, channels):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for line in iter_playlist_lines(channels):
+            f.write(line)
+            f.write("\n")
+    return path
+
+
+def playlist_path(channels):
+    """Path of a synthetic playlist with that many channels, generated on first use."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"synthetic_{channels}.m3u")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        write_playlist(tmp, channels)
+        os.replace(tmp, path)
+    return path
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -1,4 +1,6 @@
 ﻿# main.py
+import multiprocessing
+
 from kivy.app import App
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.core.window import Window
@@ -21,4 +23,6 @@ class M3UManagerApp(App):
         return sm
 
 if __name__ == "__main__": 
+    # Frozen builds: lets the parallel M3U parser start its worker processes
+    multiprocessing.freeze_support()
     M3UManagerApp().run()
\ No newline at end of file
@@ -0,0 +1,9 @@
+﻿# tests/conftest.py
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# The tests import the `app` package like main.py does
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
@@ -0,0 +1,60 @@
+﻿# tests/test_epg_cache.py
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app import epg_cache
+from app.epg_cache import LOADED, STALE, load_epg_channels
+
+SOURCE = "http://example.com/guide.xml"
+GUIDE = (b'<?xml version="1.0" encoding="UTF-8"?>\n<tv>'
+         b'<channel id="one.es"><display-name>One</display-name></channel>'
+         b'<programme channel="one.es"><title>News</title></programme></tv>')
+
+
+class FakeRaw(io.BytesIO):
+    decode_content = False
+    auto_close = True
+
+
+class FakeResponse:
+    def __init__(self, body, etag):
+        self.status_code = 200
+        self.headers = {"ETag": etag}
+        self.raw = FakeRaw(body)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def serve(monkeypatch, body, etag):
+    monkeypatch.setattr(epg_cache.requests, "get", lambda *args, **kwargs: FakeResponse(body, etag))
+
+
+@pytest.mark.parametrize("broken", [GUIDE[:90], b"not a guide", gzip.compress(GUIDE)[:60]],
+                         ids=["truncated", "not-xml", "truncated-gzip"])
+def test_unparsable_guide_keeps_the_stale_entry(tmp_path, monkeypatch, broken):
+    serve(monkeypatch, GUIDE, '"v1"')
+    channels, status = load_epg_channels(SOURCE, cache_dir=tmp_path)
+    assert status == LOADED
+    assert [ch["tvg-id"] for ch in channels] == ["one.es"]
+
+    serve(monkeypatch, broken, '"v2"')
+    stale, status = load_epg_channels(SOURCE, force=True, cache_dir=tmp_path)
+    assert status == STALE
+    assert stale == channels
+
+
+def test_unparsable_guide_without_entry_raises(tmp_path, monkeypatch):
+    serve(monkeypatch, GUIDE[:90], '"v1"')
+    with pytest.raises(ET.ParseError):
+        load_epg_channels(SOURCE, cache_dir=tmp_path)
@@ -0,0 +1,116 @@
+﻿# tests/test_lazy_playlist.py
+# -*- coding: utf-8 -*-
+"""The lazy backend builds the same tree as the sequential parser."""
+import json
+
+import pytest
+
+from app import lazy_playlist
+from app.lazy_playlist import LazyPlaylist
+from app.m3u_parser import parse_m3u_to_dict
+from app.m3u_writer import iter_m3u_chunks
+
+CHANNELS = 400
+
+
+def playlist_lines(channels=CHANNELS):
+    """Ungrouped channels (no group-title at all) first, between groups and
+    last, and groups spread over several index blocks."""
+    yield "#EXTM3U"
+    for i in range(channels):
+        if i % 45 == 0 or i == channels - 1:
+            yield f'#EXTINF:-1 tvg-id="id{i}",Root {i}'
+        elif i % 9 == 0:
+            yield f'#EXTINF:-1 tvg-id="id{i}" group-title="Spread",Channel {i}'
+        else:
+            yield f'#EXTINF:-1 tvg-id="id{i}" group-title="Run{i // 100}/Sub{i // 30 % 3}",Channel {i}'
+        yield f"http://example.com/{i}.ts"
+
+
+def export(tree):
+    return "".join(iter_m3u_chunks(tree))
+
+
+def order(tree):
+    return json.dumps(tree, sort_keys=False)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(lazy_playlist, "BLOCK_SIZE", 2048)
+
+
+@pytest.fixture
+def playlist(tmp_path):
+    path = tmp_path / "list.m3u"
+    path.write_text("\n".join(playlist_lines()) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_root_channels_before_a_later_group(tmp_path):
+    path = tmp_path / "list.m3u"
+    path.write_text('#EXTM3U\n#EXTINF:-1,Root1\nhttp://r1\n'
+                    '#EXTINF:-1 group-title="A",A1\nhttp://a1\n'
+                    '#EXTINF:-1,Root2\nhttp://r2\n', encoding="utf-8")
+    lazy = LazyPlaylist(str(path))
+    assert list(lazy.root) == list(parse_m3u_to_dict(str(path))) == ["_channels", "A"]
+    lazy.close()
+
+
+@pytest.mark.parametrize("header", ["", "#EXTM3U\n"])
+@pytest.mark.parametrize("first_group", ["", ' group-title="A"'])
+def test_bom_before_the_first_line(tmp_path, header, first_group):
+    path = tmp_path / "list.m3u"
+    path.write_bytes(b"\xef\xbb\xbf" + (header + f'#EXTINF:-1{first_group},First\nhttp://f\n'
+                     '#EXTINF:-1 group-title="B",B1\nhttp://b1\n').encode("utf-8"))
+    lazy = LazyPlaylist(str(path))
+    eager = parse_m3u_to_dict(str(path))
+    assert list(lazy.root) == list(eager)
+    first = lazy.root["A"] if first_group else lazy.root
+    assert [ch["name"] for ch in lazy.materialize(first)] == ["First"]
+    lazy.materialize(lazy.root["B"])
+    assert export(lazy.root) == export(eager)
+
+
+def layout(tree):
+    """Keys of every level in order, channels left out."""
+    return [(key, None if key == "_channels" else layout(value)) for key, value in tree.items()]
+
+
+def test_skeleton_has_the_parser_group_order(playlist):
+    lazy = LazyPlaylist(playlist)
+    assert layout(lazy.root) == layout(parse_m3u_to_dict(playlist))
+    lazy.close()
+
+
+def test_materialize_all_exports_like_the_parser(playlist):
+    lazy = LazyPlaylist(playlist)
+    lazy.materialize_all()
+    eager = parse_m3u_to_dict(playlist)
+    assert order(lazy.root) == order(eager)
+    assert export(lazy.root) == export(eager)
+
+
+def test_materialize_per_group_exports_like_the_parser(playlist):
+    lazy = LazyPlaylist(playlist)
+    pending = []
+
+    def collect(group):
+        pending.append(group)
+        for key, value in group.items():
+            if key != "_channels":
+                collect(value)
+    collect(lazy.root)
+    for group in reversed(pending):
+        lazy.materialize(group)
+    assert lazy.pending_count == 0
+    assert export(lazy.root) == export(parse_m3u_to_dict(playlist))
+
+
+def test_cached_index_gives_the_same_tree(playlist, tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy_playlist, "lazy_index_dir", lambda: tmp_path / "index")
+    first = LazyPlaylist(playlist, cache_max_bytes=1 << 20)
+    first.materialize_all()
+    second = LazyPlaylist(playlist, cache_max_bytes=1 << 20)
+    second.materialize_all()
+    assert export(second.root) == export(first.root) == export(parse_m3u_to_dict(playlist))
@@ -0,0 +1,95 @@
+﻿# tests/test_m3u_parser_parallel.py
+# -*- coding: utf-8 -*-
+"""Parity of the parallel chunked parser with the sequential one."""
+import gzip
+import json
+
+import pytest
+
+from app import m3u_parser
+from app.m3u_parser import parse_m3u_to_dict, split_m3u_ranges, _parse_m3u_range
+
+CHANNELS = 600
+
+
+def playlist_lines(channels=CHANNELS):
+    """Long runs of one group (cut by the chunk bounds), a group spread over
+    the whole file, and ungrouped channels before, between and after groups."""
+    yield "#EXTM3U"
+    for i in range(channels):
+        if i % 50 == 0 or i == channels - 1:
+            group = ""
+        elif i % 7 == 0:
+            group = "Spread/Everywhere"
+        else:
+            group = f"Run{i // 120}/Sub{i // 40 % 3}"
+        yield (f'#EXTINF:-1 tvg-id="id{i}" tvg-name="Name {i}" tvg-logo="http://l/{i}.png" '
+               f'group-title="{group}",Channel {i}')
+        if i % 11 == 0:
+            yield "#EXTVLCOPT:http-user-agent=Test"
+        yield f"http://example.com/{i}.ts"
+
+
+def write_playlist(path, newline="\n", bom=False, compress=False):
+    text = newline.join(playlist_lines()) + newline
+    data = (b"\xef\xbb\xbf" if bom else b"") + text.encode("utf-8")
+    if compress:
+        data = gzip.compress(data)
+    path.write_bytes(data)
+    return path
+
+
+def ordered(tree):
+    """Comparable form that also checks the order of groups and channels."""
+    return json.dumps(tree, ensure_ascii=False)
+
+
+@pytest.fixture(autouse=True)
+def parallel_small_files(monkeypatch):
+    monkeypatch.setattr(m3u_parser, "PARALLEL_MIN_SIZE", 0)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 4, 7])
+def test_parallel_matches_sequential(tmp_path, workers):
+    path = write_playlist(tmp_path / "list.m3u")
+    sequential = parse_m3u_to_dict(str(path))
+    parallel = parse_m3u_to_dict(str(path), workers=workers)
+    assert parallel == sequential
+    assert ordered(parallel) == ordered(sequential)
+
+
+def test_groups_are_split_across_chunks(tmp_path):
+    path = str(write_playlist(tmp_path / "list.m3u"))
+    ranges = split_m3u_ranges(path, 7)
+    assert len(ranges) == 7
+    parts = [_parse_m3u_range(path, start, end) for start, end in ranges]
+    # The same groups and the root channels show up in several partial trees
+    assert sum("Spread" in part for part in parts) > 1
+    assert sum("_channels" in part for part in parts) > 1
+    assert parse_m3u_to_dict(path, workers=7) == parse_m3u_to_dict(path)
+
+
+def test_ungrouped_channels_keep_their_place(tmp_path):
+    path = str(write_playlist(tmp_path / "list.m3u"))
+    tree = parse_m3u_to_dict(path, workers=4)
+    assert list(tree)[0] == "_channels"
+    assert [ch["tvg-id"] for ch in tree["_channels"]] == \
+        [ch["tvg-id"] for ch in parse_m3u_to_dict(path)["_channels"]]
+    assert len(tree["_channels"]) == CHANNELS // 50 + 1
+
+
+@pytest.mark.parametrize("bom", [False, True])
+def test_crlf_line_endings(tmp_path, bom):
+    lf = parse_m3u_to_dict(str(write_playlist(tmp_path / "lf.m3u")))
+    path = str(write_playlist(tmp_path / "crlf.m3u", newline="\r\n", bom=bom))
+    parallel = parse_m3u_to_dict(path, workers=3)
+    assert parallel == parse_m3u_to_dict(path)
+    assert ordered(parallel) == ordered(lf)
+
+
+def test_gzip_input(tmp_path):
+    plain = parse_m3u_to_dict(str(write_playlist(tmp_path / "list.m3u")))
+    path = str(write_playlist(tmp_path / "list.m3u.gz", compress=True))
+    parsed = parse_m3u_to_dict(path, workers=4)
+    assert parsed == parse_m3u_to_dict(path)
+    assert ordered(parsed) == ordered(plain)
@@ -0,0 +1,73 @@
+﻿# tests/test_name_matcher.py
+# -*- coding: utf-8 -*-
+import pytest
+
+from app.name_matcher import TIMESHIFT_MAX_SCORE, NameMatcher, normalize_name
+
+
+def epg(channel_id, *display_names):
+    return {"tvg-id": channel_id, "display-names": list(display_names)}
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Canal+ Acción HD (ES)", "canal accion"),
+    ("TÉLÉ Québec", "tele quebec"),
+    ("Sport 1 FHD [backup]", "sport 1"),
+    ("Cinema 4K HEVC", "cinema"),
+    ("Antena 3 +1", "antena 3"),
+    ("Antena 3 +2h", "antena 3"),
+])
+def test_normalize_name(name, expected):
+    assert normalize_name(name) == expected
+
+
+def test_accents_and_quality_tags_match_exactly():
+    entries = [epg("accion.es", "Canal+ Acción"), epg("news.es", "Noticias 24")]
+    matcher = NameMatcher(entries)
+    match, = matcher.match_many(["CANAL+ ACCION FHD"])
+    assert match.score == 1.0
+    assert match.entry is entries[0]
+    assert match.name == "Canal+ Acción"
+
+
+def test_exact_match_shortcut_agrees_with_scoring():
+    entries = [epg("one.uk", "Channel One"), epg("one.plus", "Channel One Plus")]
+    matcher = NameMatcher(entries)
+    shortcut = matcher.match("Channel One HD", limit=1)
+    scored = matcher.match("Channel One HD", limit=2)
+    assert shortcut == scored[:1]
+    assert shortcut[0].score == 1.0 and shortcut[0].entry is entries[0]
+
+
+def test_timeshift_is_not_an_exact_match():
+    entries = [epg("antena3.es", "Antena 3")]
+    matcher = NameMatcher(entries)
+    match, = matcher.match_many(["Antena 3 +1"])
+    assert match.entry is entries[0]
+    assert match.score == TIMESHIFT_MAX_SCORE
+    assert matcher.match("Antena 3 +1")[0].score == TIMESHIFT_MAX_SCORE
+
+
+def test_timeshift_prefers_the_same_tag():
+    entries = [epg("antena3.es", "Antena 3"), epg("antena3p1.es", "Antena 3 +1h")]
+    matcher = NameMatcher(entries)
+    plain, shifted = matcher.match_many(["Antena 3 HD", "Antena 3 +1"])
+    assert plain.entry is entries[0] and plain.score == 1.0
+    assert shifted.entry is entries[1] and shifted.score == 1.0
+
+
+def test_best_match_per_entry():
+    # Every display-name of an entry is indexed, but an entry is proposed once
+    entries = [epg("sport.one", "Sport One", "Sport 1", "Sport One HD"), epg("sport.two", "Sport Two")]
+    matcher = NameMatcher(entries)
+    found = matcher.match("Sport Onee", limit=3)
+    assert [m.entry["tvg-id"] for m in found] == ["sport.one", "sport.two"]
+    assert found[0].name == "Sport One"
+    assert found[0].score > found[1].score
+
+
+def test_match_many_keeps_order_and_misses():
+    entries = [epg("a", "Alpha"), epg("b", "Bravo")]
+    matcher = NameMatcher(entries)
+    found = matcher.match_many(["Bravo", "", "Alpha", "Bravo HD"], min_score=0.5)
+    assert [m and m.entry["tvg-id"] for m in found] == ["b", None, "a", "b"]
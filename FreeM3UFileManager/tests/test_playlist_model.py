@@ -0,0 +1,54 @@
+﻿# tests/test_playlist_model.py
+# -*- coding: utf-8 -*-
+from app.playlist_model import PlaylistModel, UPDATED
+
+
+def channel(name):
+    return {"name": name, "url": f"http://example.com/{name}", "group-title": ""}
+
+
+def make_tree():
+    return {
+        "_channels": [channel("root")],
+        "A": {"_channels": [channel("a1"), channel("a2")]},
+        "B": {"_channels": [channel("b1")]},
+    }
+
+
+def test_rename_group_keeps_position():
+    tree = make_tree()
+    model = PlaylistModel(tree)
+    assert model.rename_group(tree, "A", "Z") == "Z"
+    assert list(tree) == ["_channels", "Z", "B"]
+
+
+def test_rename_to_a_sibling_name_keeps_the_sibling():
+    tree = make_tree()
+    a, b = tree["A"], tree["B"]
+    model = PlaylistModel(tree)
+    events = []
+    model.add_listener(events.append)
+
+    assert model.rename_group(tree, "A", "B") == "B (1)"
+    assert list(tree) == ["_channels", "B (1)", "B"]
+    assert tree["B (1)"] is a and tree["B"] is b
+    assert model.index.id_of(b) is not None       # still indexed
+    assert events[-1].type == UPDATED and events[-1].renamed == [("A", "B (1)")]
+
+    model.undo()
+    assert list(tree) == ["_channels", "A", "B"]
+    assert tree["A"] is a and tree["B"] is b
+
+
+def test_rename_never_replaces_the_channel_list():
+    tree = make_tree()
+    model = PlaylistModel(tree)
+    assert model.rename_group(tree, "A", "_channels") == "_channels (1)"
+    assert [ch["name"] for ch in tree["_channels"]] == ["root"]
+
+
+def test_rename_to_the_same_name_does_nothing():
+    tree = make_tree()
+    model = PlaylistModel(tree)
+    assert model.rename_group(tree, "A", "A") is None
+    assert model.undo() is None
@@ -0,0 +1,48 @@
+﻿# tests/test_search_index.py
+# -*- coding: utf-8 -*-
+from app.playlist_model import PlaylistModel
+from app.search_index import SearchIndex
+
+
+def channel(name):
+    return {"name": name, "url": f"http://example.com/{name}", "group-title": ""}
+
+
+def make_model():
+    tree = {
+        "_channels": [channel("Root News")],
+        "Sports": {"_channels": [channel("Sports One"), channel("Sports Two")]},
+        "Movies": {"_channels": [channel("Movies One")]},
+    }
+    model = PlaylistModel(tree)
+    index = SearchIndex(model)
+    index.ensure_built()
+    return model, index
+
+
+def names(index, query):
+    return sorted(ch["name"] for ch, _ in index.search(query).matches)
+
+
+def test_reorder_keeps_every_channel_findable():
+    model, index = make_model()
+    sports = model.root["Sports"]
+    model.set_order(sports, channels=list(reversed(sports["_channels"])))
+    model.set_order(model.root, keys=["Movies", "Sports"])
+    assert names(index, "one") == ["Movies One", "Sports One"]
+    assert [group for _, group in index.search("two").matches] == [sports]
+
+
+def test_order_that_drops_nodes_updates_the_index():
+    model, index = make_model()
+    sports = model.root["Sports"]
+    model.set_order(sports, channels=sports["_channels"][1:])
+    model.set_order(model.root, keys=["Sports"])
+    assert names(index, "one") == []
+    assert names(index, "movies") == []
+
+    model.undo()
+    model.undo()
+    assert names(index, "one") == ["Movies One", "Sports One"]
+    model.redo()
+    assert names(index, "one") == ["Movies One"]
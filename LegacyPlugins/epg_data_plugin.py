@@ -1,5 +1,5 @@
 ﻿# plugins/epg_data_plugin_full.py
-import os, gzip, io, requests, xml.etree.ElementTree as ET
+import os, io
 from threading import Thread
 from kivy.uix.popup import Popup
 from kivy.uix.behaviors import ButtonBehavior
@@ -12,9 +12,18 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.checkbox import CheckBox
 from kivy.uix.label import Label
 from kivy.uix.image import AsyncImage
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.core.image import Image as CoreImage
 from kivy.clock import Clock
 from kivy.graphics import Color, Line
+from app.name_matcher import NameMatcher
+from app.download_scheduler import DownloadScheduler
+from app.epg_cache import DEFAULT_TTL, LOADED, STALE, load_epg_channels
+
+AUTO_MATCH_MIN_SCORE = 0.6      # proposals at or above this score start accepted
+AUTO_MATCH_FIELDS = ("tvg-id", "tvg-name", "tvg-logo")
 
 # --- utils ---
 def popup_message(title, text):
@@ -86,6 +95,39 @@ class ChannelButtonWithFallback(ButtonBehavior, FloatLayout):
         self._label_widget.text = self.fallback_text
 
 
+# --- fila de la revisión de auto-match ---
+class MatchRow(RecycleDataViewBehavior, BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", size_hint_y=None, height=32, spacing=5, **kwargs)
+        self.row = None
+        self.accept_cb = CheckBox(size_hint_x=None, width=40)
+        self.accept_cb.bind(active=self._on_active)
+        self.channel_label = Label(halign="left", valign="middle", shorten=True)
+        self.epg_label = Label(halign="left", valign="middle", shorten=True)
+        self.id_label = Label(halign="left", valign="middle", shorten=True, size_hint_x=0.6)
+        self.score_label = Label(size_hint_x=None, width=60)
+        for label in (self.channel_label, self.epg_label, self.id_label):
+            label.bind(size=lambda lbl, size: setattr(lbl, "text_size", size))
+        for widget in (self.accept_cb, self.channel_label, self.epg_label, self.id_label, self.score_label):
+            self.add_widget(widget)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.row = None
+        match = data["match"]
+        self.accept_cb.disabled = match is None
+        self.accept_cb.active = data["accepted"]
+        self.channel_label.text = data["channel"].get("name", "")
+        self.epg_label.text = match.entry.get("tvg-name", "") if match else "(no match)"
+        self.id_label.text = match.entry.get("tvg-id", "") if match else ""
+        self.score_label.text = f"{match.score:.0%}" if match else ""
+        self.row = data
+        return super().refresh_view_attrs(rv, index, data)
+
+    def _on_active(self, checkbox, value):
+        if self.row is not None:
+            self.row["accepted"] = value
+
+
 # --- plugin principal ---
 class EpgDataPlugin:
     name = "Legacy Plugins/EPG Data Plugin"
@@ -95,8 +137,13 @@ class EpgDataPlugin:
         self.epg_channels = []
         self.epg_source = ""
         self.load_on_start = False
+        self.cache_ttl_hours = DEFAULT_TTL / 3600
         self._cached_buttons = {}
         self._preloading = False
+        self._preload_batch = None
+        self._popup = None
+        self._downloads = None      # DownloadScheduler, created by the first preload
+        self._matcher = None
 
         plugin_cfg_key = f"plugin_{self.name.replace('/','_')}"
         if self.config:
@@ -105,6 +152,8 @@ class EpgDataPlugin:
                 self.config.save()
             self.epg_source = self.config.get("source", "", section=plugin_cfg_key)
             self.load_on_start = self.config.get_bool("load_on_start", False, section=plugin_cfg_key)
+            self.cache_ttl_hours = self._parse_ttl(
+                self.config.get("cache_ttl_hours", self.cache_ttl_hours, section=plugin_cfg_key))
 
         if check_init:
             return
@@ -130,6 +179,12 @@ class EpgDataPlugin:
         load_layout.add_widget(self.load_cb)
         layout.add_widget(load_layout)
 
+        ttl_layout = BoxLayout(orientation="horizontal", size_hint_y=None, height=40)
+        self.ttl_input = TextInput(text=f"{self.cache_ttl_hours:g}", multiline=False, input_filter="float")
+        ttl_layout.add_widget(Label(text="Check URL for changes every (hours)"))
+        ttl_layout.add_widget(self.ttl_input)
+        layout.add_widget(ttl_layout)
+
         btn_layout = BoxLayout(size_hint_y=None, height=40, spacing=10)
         btn_save = Button(text="Save")
         btn_cancel = Button(text="Cancel")
@@ -145,22 +200,33 @@ class EpgDataPlugin:
     def _save_config(self, popup):
         self.epg_source = self.url_input.text.strip()
         self.load_on_start = self.load_cb.active
+        self.cache_ttl_hours = self._parse_ttl(self.ttl_input.text)
         if self.config:
             plugin_cfg_key = f"plugin_{self.name.replace('/','_')}"
             if plugin_cfg_key not in self.config.config:
                 self.config.config[plugin_cfg_key] = {}
             self.config.set("source", self.epg_source, section=plugin_cfg_key)
             self.config.set("load_on_start", str(self.load_on_start), section=plugin_cfg_key)
+            self.config.set("cache_ttl_hours", f"{self.cache_ttl_hours:g}", section=plugin_cfg_key)
         popup.dismiss()
 
+    @staticmethod
+    def _parse_ttl(value):
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return DEFAULT_TTL / 3600
+
     def get_functions(self):
         return [
+            ("Auto-match selected...", self.auto_match_selected),
             ("Assign All", self.assign_all),
             ("Assign.../tvg-logo", self.assign_tvg_logo),
             ("Assign.../tvg-id", self.assign_tvg_id),
             ("Assign.../tvg-name", self.assign_tvg_name),
             ("Assign.../tvg-url", self.assign_tvg_url),
             ("Configure EPG Source", self.configure),
+            ("Refresh EPG now", self.refresh_epg),
         ]
 		
     def configure(self, editor_window):
@@ -183,106 +249,123 @@ class EpgDataPlugin:
             self.preload_buttons()
 
     # --- carga EPG ---
-    def load_epg_from_source(self):
+    def load_epg_from_source(self, force=False):
+        """Load the channel table, from the disk cache while it is valid (see app.epg_cache)."""
+        self.last_load_status = None
         if not self.epg_source:
             return False
-        try:
-            if self.epg_source.startswith("http"):
-                response = requests.get(self.epg_source, timeout=10)
-                content = response.content
-                if self.epg_source.endswith(".gz"):
-                    with gzip.GzipFile(fileobj=io.BytesIO(content)) as f:
-                        tree = ET.parse(f)
-                else:
-                    tree = ET.ElementTree(ET.fromstring(content))
-            else:
-                if self.epg_source.endswith(".gz"):
-                    with gzip.open(self.epg_source, "rb") as f:
-                        tree = ET.parse(f)
-                else:
-                    tree = ET.parse(self.epg_source)
+        return self._set_epg(self._fetch_epg(force))
 
-            root = tree.getroot()
-            self.epg_channels = []
-            for ch in root.findall("channel"):
-                ch_data = {
-                    "tvg-id": ch.attrib.get("id", ""),
-                    "tvg-name": "",
-                    "tvg-logo": "",
-                    "tvg-url": "",
-                    "name": ch.attrib.get("id", ""),
-                    "icon_url": None,
-                }
-                dn = ch.find("display-name")
-                if dn is not None:
-                    ch_data["tvg-name"] = dn.text or ""
-                icon = ch.find("icon")
-                if icon is not None:
-                    ch_data["tvg-logo"] = icon.attrib.get("src", "")
-                    if ch_data["tvg-logo"]:
-                        ch_data["icon_url"] = ch_data["tvg-logo"]
-                url = ch.find("url")
-                if url is not None:
-                    ch_data["tvg-url"] = url.text or ""
-                self.epg_channels.append(ch_data)
-            return True
+    def _fetch_epg(self, force=False):
+        """(channels, status) from app.epg_cache, or None if it failed. Does not touch the plugin state."""
+        try:
+            return load_epg_channels(self.epg_source, ttl=self.cache_ttl_hours * 3600, force=force)
         except Exception as e:
             print(f"[EPGDataPlugin] Failed to load EPG: {e}")
+            return None
+
+    def _set_epg(self, loaded):
+        """Keep a result of _fetch_epg; False if the load failed."""
+        if loaded is None:
+            self.last_load_status = None
             self.epg_channels = []
             return False
+        channels, self.last_load_status = loaded
+        # An unchanged guide keeps the loaded table (and the buttons and matcher built on it)
+        if self.last_load_status == LOADED or not self.epg_channels:
+            self.epg_channels = channels
+        return True
+
+    def refresh_epg(self, editor_window):
+        """Check the source now; the guide is only downloaded and parsed again if it changed."""
+        if not self.epg_source:
+            self.configure(editor_window)
+            return
+
+        progress = Popup(title="EPG", content=Label(text="Checking the EPG source..."),
+                         size_hint=(None, None), size=(360, 120), auto_dismiss=False)
+        progress.open()
+
+        def work():
+            loaded = self._fetch_epg(force=True)
+
+            def show(dt):
+                progress.dismiss()
+                if not self._set_epg(loaded):
+                    popup_message("EPG", "Failed to load the EPG source.")
+                    return
+                status = {
+                    LOADED: "EPG reloaded",
+                    STALE: "Source unreachable, cached EPG kept",
+                }.get(self.last_load_status, "EPG unchanged")
+                popup_message("EPG", f"{status}: {len(self.epg_channels)} channels")
+                if self.last_load_status == LOADED or not self._cached_buttons:
+                    self.preload_buttons()
+
+            Clock.schedule_once(show)
+
+        Thread(target=work, daemon=True).start()
 
     # --- preload botones ---
     def preload_buttons(self):
-        if self._preloading or not self.epg_channels:
+        """Build the channel buttons as their icons arrive (see app.download_scheduler)."""
+        if not self.epg_channels:
             return
+        if self._preload_batch is not None:
+            # A newer table replaces the one being loaded
+            self._cancel_preload()
         self._preloading = True
         self._cached_buttons.clear()
-        self._preload_index = 0
-        self._total = len(self.epg_channels)
-        self._popup_label = Label(text=f"Preparing 0/{self._total}")
+        channels = self.epg_channels
+        total = len(channels)
+
+        content = BoxLayout(orientation="vertical", padding=10, spacing=10)
+        self._popup_label = Label(text=f"Preparing 0/{total}")
+        btn_cancel = Button(text="Cancel", size_hint_y=None, height=40)
+        content.add_widget(self._popup_label)
+        content.add_widget(btn_cancel)
         self._popup = Popup(
             title="Loading channels...",
-            content=self._popup_label,
+            content=content,
             size_hint=(None, None),
-            size=(320, 120),
+            size=(320, 160),
             auto_dismiss=False,
         )
+        btn_cancel.bind(on_release=lambda *a: self._cancel_preload())
         self._popup.open()
 
-        def load_next_channel(dt=None):
-            if self._preload_index >= self._total:
-                self._preloading = False
-                self._popup.dismiss()
-                return False
-            ch = self.epg_channels[self._preload_index]
+        def on_result(index, data):
+            # Main thread, in channel order
+            ch = channels[index]
             btn = ChannelButtonWithFallback(epg_channel=ch, fallback_text=ch.get("tvg-name", ""))
             btn.size_hint = (None, None)   # no queremos que el GridLayout lo escale automáticamente
             btn.width = 150
             btn.height = 150
+            if data:
+                btn.texture_update_from_data(data)
             self._cached_buttons[ch["name"]] = (btn, ch)
 
-            def download_image():
-                url = ch.get("icon_url")
-                try:
-                    if url:
-                        r = requests.get(url, timeout=5)
-                        if r.status_code == 200:
-                            data = r.content
-                            Clock.schedule_once(lambda dt: btn.texture_update_from_data(data))
-                        else:
-                            Clock.schedule_once(lambda dt: btn.set_fallback_text())
-                    else:
-                        Clock.schedule_once(lambda dt: btn.set_fallback_text())
-                except:
-                    Clock.schedule_once(lambda dt: btn.set_fallback_text())
-                finally:
-                    self._preload_index += 1
-                    self._popup_label.text = f"Preparing {self._preload_index}/{self._total}"
-
-            Thread(target=download_image, daemon=True).start()
-            return True
-
-        Clock.schedule_interval(load_next_channel, 0.1)
+        def on_progress(done, total):
+            self._popup_label.text = f"Preparing {done}/{total}"
+
+        def on_finished():
+            self._preloading = False
+            self._preload_batch = None
+            self._popup.dismiss()
+
+        if self._downloads is None:
+            self._downloads = DownloadScheduler()
+        self._preload_batch = self._downloads.download(
+            [ch.get("icon_url") for ch in channels], on_result, on_progress, on_finished)
+
+    def _cancel_preload(self):
+        """Stop the icon downloads; the buttons built so far are kept."""
+        if self._preload_batch is not None:
+            self._preload_batch.cancel()
+            self._preload_batch = None
+        self._preloading = False
+        if self._popup is not None:
+            self._popup.dismiss()
 
     # --- ventana mosaico ---
     class EpgMosaicWindow(Popup):
@@ -376,6 +459,158 @@ class EpgDataPlugin:
                 self.on_select(self.selected_channel)
             self.dismiss()
 
+    # --- auto-match ---
+    def get_matcher(self):
+        """n-gram index of the EPG names, built once per loaded EPG."""
+        if self._matcher is None or self._matcher.entries is not self.epg_channels:
+            self._matcher = NameMatcher(self.epg_channels)
+        return self._matcher
+
+    def _selected_channels(self, editor_window):
+        """Channel dicts of the selected rows; a selected group gives all its channels."""
+        helper = editor_window.editor_helper
+        get_node = getattr(helper, "get_node", None)
+        channels = []
+        seen = set()
+        for item in helper.items:
+            if not getattr(item, "selected", False):
+                continue
+            node = get_node(item) if get_node else None
+            if getattr(item, "item_type", None) == "group":
+                stack = [node if node is not None else item.data.get("children")]
+                found = []
+                while stack:
+                    ref = stack.pop()
+                    if isinstance(ref, dict):
+                        found.extend(ref.get("_channels", []))
+                        stack.extend(v for k, v in ref.items() if k != "_channels")
+                    elif isinstance(ref, list):
+                        found.extend(ref)
+            else:
+                found = [node if node is not None else item.data]
+            for ch in found:
+                if isinstance(ch, dict) and id(ch) not in seen:
+                    seen.add(id(ch))
+                    channels.append(ch)
+        return channels
+
+    def auto_match_selected(self, editor_window):
+        if not self.epg_channels:
+            popup_message("EPG Plugin", "❌ No EPG loaded.")
+            return
+        channels = self._selected_channels(editor_window)
+        if not channels:
+            popup_message("Sin selección", "Selecciona canales o grupos en el editor.")
+            return
+
+        progress = Popup(title="EPG auto-match", content=Label(text=f"Matching {len(channels)} channels..."),
+                         size_hint=(None, None), size=(360, 120), auto_dismiss=False)
+        progress.open()
+
+        def work():
+            try:
+                matches = self.get_matcher().match_many([ch.get("name", "") for ch in channels])
+            except Exception as e:
+                print(f"[EPGDataPlugin] Auto-match failed: {e}")
+                matches = None
+
+            def show(dt):
+                progress.dismiss()
+                if matches is None:
+                    popup_message("EPG Plugin", "❌ Auto-match failed.")
+                    return
+                rows = [{"channel": ch, "match": m, "accepted": bool(m and m.score >= AUTO_MATCH_MIN_SCORE)}
+                        for ch, m in zip(channels, matches)]
+                self.AutoMatchWindow(rows, editor_window).open()
+
+            Clock.schedule_once(show)
+
+        Thread(target=work, daemon=True).start()
+
+    class AutoMatchWindow(Popup):
+        """Review table of the proposed assignments; only the checked rows are applied."""
+
+        def __init__(self, rows, editor_window, **kwargs):
+            super().__init__(**kwargs)
+            self.title = "EPG auto-match"
+            self.size_hint = (0.95, 0.95)
+            self.auto_dismiss = False
+            self.rows = rows
+            self.editor_window = editor_window
+
+            main_layout = BoxLayout(orientation='vertical', spacing=5, padding=5)
+            accepted = sum(1 for row in rows if row["accepted"])
+            matched = sum(1 for row in rows if row["match"])
+            main_layout.add_widget(Label(
+                size_hint_y=None, height=30,
+                text=f"{len(rows)} channels, {matched} with a proposal, {accepted} above {AUTO_MATCH_MIN_SCORE:.0%}"))
+
+            fields_layout = BoxLayout(size_hint_y=None, height=30, spacing=5)
+            self.field_cbs = {}
+            for field in AUTO_MATCH_FIELDS:
+                cb = CheckBox(active=True, size_hint_x=None, width=40)
+                self.field_cbs[field] = cb
+                fields_layout.add_widget(cb)
+                fields_layout.add_widget(Label(text=field, halign="left"))
+            main_layout.add_widget(fields_layout)
+
+            header = BoxLayout(size_hint_y=None, height=30, spacing=5)
+            header.add_widget(Label(text="", size_hint_x=None, width=40))
+            header.add_widget(Label(text="Channel"))
+            header.add_widget(Label(text="EPG display-name"))
+            header.add_widget(Label(text="tvg-id", size_hint_x=0.6))
+            header.add_widget(Label(text="Score", size_hint_x=None, width=60))
+            main_layout.add_widget(header)
+
+            # Recycled rows: thousands of proposals only create the visible widgets
+            self.table = RecycleView()
+            self.table.viewclass = MatchRow
+            table_layout = RecycleBoxLayout(orientation="vertical", size_hint_y=None, default_size=(None, 32),
+                                            default_size_hint=(1, None), spacing=2)
+            table_layout.bind(minimum_height=table_layout.setter("height"))
+            self.table.add_widget(table_layout)
+            self.table.data = rows
+            main_layout.add_widget(self.table)
+
+            btn_layout = BoxLayout(size_hint_y=None, height=40, spacing=5)
+            for text, callback in (("Select all", lambda *a: self.set_all(True)),
+                                   ("Select none", lambda *a: self.set_all(False)),
+                                   ("Apply", self._apply),
+                                   ("Cancel", self.dismiss)):
+                btn = Button(text=text)
+                btn.bind(on_release=callback)
+                btn_layout.add_widget(btn)
+            main_layout.add_widget(btn_layout)
+            self.add_widget(main_layout)
+
+        def set_all(self, value):
+            for row in self.rows:
+                row["accepted"] = value and row["match"] is not None
+            self.table.refresh_from_data()
+
+        def _apply(self, *args):
+            fields = [field for field, cb in self.field_cbs.items() if cb.active]
+            updates = []
+            for row in self.rows:
+                if not row["accepted"] or row["match"] is None:
+                    continue
+                ch, epg = row["channel"], row["match"].entry
+                changed = {f: epg[f] for f in fields if epg.get(f) and ch.get(f) != epg[f]}
+                if changed:
+                    updates.append((ch, changed))
+            self.dismiss()
+
+            helper = self.editor_window.editor_helper
+            model = getattr(helper, "model", None)
+            if model is not None and hasattr(model, "update_channels"):
+                # One undoable step for the whole batch
+                model.update_channels(updates, label="EPG auto-match")
+            else:
+                for ch, changed in updates:
+                    ch.update(changed)
+                helper.populate_list()
+            popup_message("Éxito" if updates else "Sin cambios", f"{len(updates)} channels updated.")
+
     # --- assign ---
     def assign_field(self, editor_window, field_names):
         if not self.epg_channels:
@@ -394,6 +629,11 @@ class EpgDataPlugin:
                     return None
             return ref
 
+        def get_channel_node(node):
+            # Real channel dict of a row by its node ID (editors with a node index)
+            get_node = getattr(editor_window.editor_helper, "get_node", None)
+            return get_node(node) if get_node else None
+
         def apply_to_node(node_ref, ch, field):
             if not node_ref:
                 return False
@@ -444,6 +684,12 @@ class EpgDataPlugin:
 
                 # caso: canal dict
                 elif isinstance(node, dict):
+                    real_node = get_channel_node(node)
+                    if real_node is not None:
+                        for field in field_names:
+                            if apply_to_node(real_node, ch, field):
+                                updated = True
+                        continue
                     parent_node = find_real_node(editor_window.data, editor_window.editor_helper.current_path)
                     if parent_node and "_channels" in parent_node:
                         for c in parent_node["_channels"]:
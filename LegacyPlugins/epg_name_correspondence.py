@@ -84,6 +84,18 @@ class EpgNameCorrespondence:
                 return None
         return ref
 
+    def _find_channels(self, editor_window, node):
+        """Real channel dicts of a selected row: by node ID, else by name in the current level."""
+        get_node = getattr(editor_window.editor_helper, "get_node", None)
+        real = get_node(node) if get_node else None
+        if real is not None:
+            return [real]
+        parent_node = self._find_real_node(editor_window, editor_window.editor_helper.current_path)
+        if not parent_node or "_channels" not in parent_node:
+            return []
+        name = node.get("name")
+        return [c for c in parent_node["_channels"] if c is node or c.get("name") == name]
+
     # ---------------------- Guardar ----------------------
     def save_selected_channels(self, editor_window=None):
         if not editor_window:
@@ -99,16 +111,13 @@ class EpgNameCorrespondence:
             if isinstance(node, dict) and node.get("item_type") == "channel":
                 name = node.get("name")
                 if name:
-                    parent_node = self._find_real_node(editor_window, editor_window.editor_helper.current_path)
-                    if parent_node and "_channels" in parent_node:
-                        for c in parent_node["_channels"]:
-                            if c is node or c.get("name") == name:
-                                # guardamos todo menos name/url básicos
-                                self.data[name] = {
-                                    k: v for k, v in c.items()
-                                    if k not in ("type", "name", "group-title", "url", "_unique_id")
-                                }
-                                count += 1
+                    for c in self._find_channels(editor_window, node):
+                        # guardamos todo menos name/url básicos
+                        self.data[name] = {
+                            k: v for k, v in c.items()
+                            if k not in ("type", "name", "group-title", "url", "_unique_id")
+                        }
+                        count += 1
         self._save_data()
         popup_message("EpgNameCorrespondence", f"Guardados {count} canales.")
 
@@ -127,14 +136,11 @@ class EpgNameCorrespondence:
             if isinstance(node, dict) and node.get("item_type") == "channel":
                 name = node.get("name")
                 if name and name in self.data:
-                    parent_node = self._find_real_node(editor_window, editor_window.editor_helper.current_path)
-                    if parent_node and "_channels" in parent_node:
-                        for c in parent_node["_channels"]:
-                            if c is node or c.get("name") == name:
-                                for k, v in self.data[name].items():
-                                    if k not in ("name", "group-title", "url", "_unique_id"):
-                                        c[k] = v
-                                count += 1
+                    for c in self._find_channels(editor_window, node):
+                        for k, v in self.data[name].items():
+                            if k not in ("name", "group-title", "url", "_unique_id"):
+                                c[k] = v
+                        count += 1
 
         editor_window.editor_helper.populate_list()
         popup_message("EpgNameCorrespondence", f"Datos cargados en {count} canales.")
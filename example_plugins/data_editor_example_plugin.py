@@ -161,6 +161,11 @@ class DataEditorExamplePlugin:
                     return None
             return ref
 
+        def get_channel_node(node):
+            # Real channel dict of a row by its node ID (editors with a node index)
+            get_node = getattr(editor_window.editor_helper, "get_node", None)
+            return get_node(node) if get_node else None
+
         for item in selected_items:
             node = getattr(item, "node", None)
             if not node:
@@ -183,6 +188,10 @@ class DataEditorExamplePlugin:
 
             # Case 3: node is a channel dictionary
             elif isinstance(node, dict):
+                real_node = get_channel_node(node)
+                if real_node is not None:
+                    apply_to_node(real_node)
+                    continue
                 parent_node = find_real_node(editor_window.data, editor_window.editor_helper.current_path)
                 if parent_node and "_channels" in parent_node:
                     for ch in parent_node["_channels"]:
@@ -95,8 +95,7 @@ class ImportDataExamplePlugin:
                     else:
                         current_group[group_name] = deepcopy(group_data)
 
-                from app.emw_items_utils import update_group_title_recursive
-                update_group_title_recursive(root_data, [])
+                # group-title is derived from the group path when the playlist is saved
 
                 self._show_info(f"✅ Groups imported into '{group_title or 'Root'}' successfully.")
 